@@ -0,0 +1,100 @@
+"""lexeme dict tables
+
+Revision ID: 5bcbe23f6c70
+Revises: 6a97af9e5058
+Create Date: 2019-11-21 11:02:43.117904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5bcbe23f6c70'
+down_revision = '6a97af9e5058'
+branch_labels = None
+depends_on = None
+
+# (table name, entity id column, gin index name)
+lexeme_dicts = [
+    ("user_lexeme_dict", "user_id", "user_words_idx"),
+    ("track_lexeme_dict", "track_id", "track_words_idx"),
+    ("playlist_lexeme_dict", "playlist_id", "playlist_words_idx"),
+    ("album_lexeme_dict", "playlist_id", "album_words_idx"),
+]
+
+
+def upgrade():
+    connection = op.get_bind()
+
+    # Replace each search materialized view with a regular table holding the same rows,
+    # so the indexer can update words for changed entities only (see src/tasks/lexeme_dicts.py)
+    for (table_name, id_column, index_name) in lexeme_dicts:
+        connection.execute(f'''
+          CREATE TABLE {table_name}_tmp AS SELECT {id_column}, word FROM {table_name};
+          DROP MATERIALIZED VIEW {table_name};
+          ALTER TABLE {table_name}_tmp RENAME TO {table_name};
+
+          CREATE INDEX {index_name} ON {table_name} USING gin(word gin_trgm_ops);
+          -- incremental updates delete and reinsert rows by entity id
+          CREATE INDEX {table_name}_{id_column}_idx ON {table_name} ({id_column});
+        ''')
+
+
+def downgrade():
+    connection = op.get_bind()
+    for (table_name, _, _) in lexeme_dicts:
+        connection.execute(f'DROP TABLE {table_name};')
+
+    connection.execute('''
+      CREATE MATERIALIZED VIEW user_lexeme_dict as
+      SELECT * FROM (
+        SELECT
+          u.user_id,
+          unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(u."name", ''), '&', 'and')) ||
+          to_tsvector('audius_ts_config', COALESCE(u."handle", '')))) as word
+        FROM
+            "users" u
+        WHERE u."is_current" = true and u."is_ready" = true
+        GROUP BY u."user_id", u."name", u."handle"
+      ) AS words;
+      CREATE INDEX user_words_idx ON user_lexeme_dict USING gin(word gin_trgm_ops);
+
+      CREATE MATERIALIZED VIEW track_lexeme_dict as
+      SELECT * FROM (
+        SELECT
+          t.track_id,
+          unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(t."title", ''), '&', 'and'))))
+            as word
+        FROM
+            "tracks" t
+        INNER JOIN "users" u ON t."owner_id" = u."user_id"
+        WHERE t."is_current" = true and u."is_ready" = true and u."is_current" = true
+        GROUP BY t."track_id", t."title", t."tags"
+      ) AS words;
+      CREATE INDEX track_words_idx ON track_lexeme_dict USING gin(word gin_trgm_ops);
+
+      CREATE MATERIALIZED VIEW playlist_lexeme_dict as
+      SELECT * FROM (
+        SELECT
+          p.playlist_id,
+          unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(p."playlist_name", ''), '&', 'and')))) as word
+        FROM
+            "playlists" p
+        WHERE p."is_current" = true and p."is_album" = false and p."is_private" = false
+        GROUP BY p."playlist_id", p."playlist_name"
+      ) AS words;
+      CREATE INDEX playlist_words_idx ON playlist_lexeme_dict USING gin(word gin_trgm_ops);
+
+      CREATE MATERIALIZED VIEW album_lexeme_dict as
+      SELECT * FROM (
+        SELECT
+          p.playlist_id,
+          unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(p."playlist_name", ''), '&', 'and')))) as word
+        FROM
+            "playlists" p
+        WHERE p."is_current" = true and p."is_album" = true and p."is_private" = false
+        GROUP BY p."playlist_id", p."playlist_name"
+      ) AS words;
+      CREATE INDEX album_words_idx ON album_lexeme_dict USING gin(word gin_trgm_ops);
+    ''')
@@ -0,0 +1,105 @@
+"""aggregate tables
+
+Revision ID: 7a2c3bd8e9f1
+Revises: 5bcbe23f6c70
+Create Date: 2019-11-25 15:21:08.342117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a2c3bd8e9f1'
+down_revision = '5bcbe23f6c70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Per-id lookups used to recompute aggregates for changed ids
+    op.create_index(op.f('ix_tracks_owner_id'), 'tracks', ['owner_id'], unique=False)
+    op.create_index(op.f('ix_playlists_playlist_owner_id'), 'playlists', ['playlist_owner_id'], unique=False)
+    op.create_index(op.f('ix_reposts_repost_item_id'), 'reposts', ['repost_item_id'], unique=False)
+    op.create_index(op.f('ix_saves_save_item_id'), 'saves', ['save_item_id'], unique=False)
+
+    op.create_table('user_aggregates',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('track_count', sa.Integer(), nullable=False),
+    sa.Column('playlist_count', sa.Integer(), nullable=False),
+    sa.Column('album_count', sa.Integer(), nullable=False),
+    sa.Column('follower_count', sa.Integer(), nullable=False),
+    sa.Column('following_count', sa.Integer(), nullable=False),
+    sa.Column('repost_count', sa.Integer(), nullable=False),
+    sa.Column('track_blocknumber', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('track_aggregates',
+    sa.Column('track_id', sa.Integer(), nullable=False),
+    sa.Column('repost_count', sa.Integer(), nullable=False),
+    sa.Column('save_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('track_id')
+    )
+    op.create_table('playlist_aggregates',
+    sa.Column('playlist_id', sa.Integer(), nullable=False),
+    sa.Column('repost_count', sa.Integer(), nullable=False),
+    sa.Column('save_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('playlist_id')
+    )
+
+    # Backfill from the current state of the indexed tables
+    connection = op.get_bind()
+    connection.execute('''
+      INSERT INTO user_aggregates (
+        user_id, track_count, playlist_count, album_count,
+        follower_count, following_count, repost_count, track_blocknumber
+      )
+      SELECT
+        u.user_id,
+        (SELECT count(*) FROM tracks t WHERE t.owner_id = u.user_id
+          and t.is_current = true and t.is_delete = false and t.is_unlisted = false),
+        (SELECT count(*) FROM playlists p WHERE p.playlist_owner_id = u.user_id
+          and p.is_current = true and p.is_album = false and p.is_private = false and p.is_delete = false),
+        (SELECT count(*) FROM playlists p WHERE p.playlist_owner_id = u.user_id
+          and p.is_current = true and p.is_album = true and p.is_private = false and p.is_delete = false),
+        (SELECT count(*) FROM follows f WHERE f.followee_user_id = u.user_id
+          and f.is_current = true and f.is_delete = false),
+        (SELECT count(*) FROM follows f WHERE f.follower_user_id = u.user_id
+          and f.is_current = true and f.is_delete = false),
+        (SELECT count(*) FROM reposts r WHERE r.user_id = u.user_id
+          and r.is_current = true and r.is_delete = false),
+        (SELECT max(t.blocknumber) FROM tracks t WHERE t.owner_id = u.user_id
+          and t.is_current = true and t.is_delete = false)
+      FROM users u
+      WHERE u.is_current = true;
+
+      INSERT INTO track_aggregates (track_id, repost_count, save_count)
+      SELECT
+        t.track_id,
+        (SELECT count(*) FROM reposts r WHERE r.repost_item_id = t.track_id and r.repost_type = 'track'
+          and r.is_current = true and r.is_delete = false),
+        (SELECT count(*) FROM saves s WHERE s.save_item_id = t.track_id and s.save_type = 'track'
+          and s.is_current = true and s.is_delete = false)
+      FROM tracks t
+      WHERE t.is_current = true;
+
+      INSERT INTO playlist_aggregates (playlist_id, repost_count, save_count)
+      SELECT
+        p.playlist_id,
+        (SELECT count(*) FROM reposts r WHERE r.repost_item_id = p.playlist_id
+          and r.repost_type in ('playlist', 'album') and r.is_current = true and r.is_delete = false),
+        (SELECT count(*) FROM saves s WHERE s.save_item_id = p.playlist_id
+          and s.save_type in ('playlist', 'album') and s.is_current = true and s.is_delete = false)
+      FROM playlists p
+      WHERE p.is_current = true;
+    ''')
+
+
+def downgrade():
+    op.drop_table('playlist_aggregates')
+    op.drop_table('track_aggregates')
+    op.drop_table('user_aggregates')
+    op.drop_index(op.f('ix_saves_save_item_id'), table_name='saves')
+    op.drop_index(op.f('ix_reposts_repost_item_id'), table_name='reposts')
+    op.drop_index(op.f('ix_playlists_playlist_owner_id'), table_name='playlists')
+    op.drop_index(op.f('ix_tracks_owner_id'), table_name='tracks')
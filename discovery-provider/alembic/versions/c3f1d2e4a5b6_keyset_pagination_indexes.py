@@ -0,0 +1,49 @@
+"""keyset pagination indexes
+
+Revision ID: c3f1d2e4a5b6
+Revises: 7a2c3bd8e9f1
+Create Date: 2019-11-27 10:42:51.204133
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f1d2e4a5b6'
+down_revision = '7a2c3bd8e9f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Indexes matching the sort order of cursor paginated endpoints, so a page is read
+    # with an index range scan starting at the cursor position
+    connection = op.get_bind()
+    connection.execute('''
+      -- /feed/reposts/<user_id>
+      CREATE INDEX ix_reposts_user_id_created_at ON reposts
+        (user_id, created_at DESC, repost_item_id DESC, repost_type DESC)
+        WHERE is_current = true and is_delete = false;
+
+      -- /saves/<save_type>
+      CREATE INDEX ix_saves_user_id_save_type_created_at ON saves
+        (user_id, save_type, created_at DESC, save_item_id DESC)
+        WHERE is_current = true and is_delete = false;
+
+      -- /tracks?sort=created_at / blocknumber, sorting by track_id uses the primary key
+      CREATE INDEX ix_tracks_created_at ON tracks (created_at, track_id)
+        WHERE is_current = true and is_unlisted = false;
+      CREATE INDEX ix_tracks_blocknumber ON tracks (blocknumber, track_id)
+        WHERE is_current = true and is_unlisted = false;
+    ''')
+
+
+def downgrade():
+    connection = op.get_bind()
+    connection.execute('''
+      DROP INDEX IF EXISTS ix_tracks_blocknumber;
+      DROP INDEX IF EXISTS ix_tracks_created_at;
+      DROP INDEX IF EXISTS ix_saves_user_id_save_type_created_at;
+      DROP INDEX IF EXISTS ix_reposts_user_id_created_at;
+    ''')
@@ -0,0 +1,45 @@
+"""track listen counts
+
+Revision ID: d8e2f4a6b1c3
+Revises: c3f1d2e4a5b6
+Create Date: 2019-12-02 14:08:37.518294
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8e2f4a6b1c3'
+down_revision = 'c3f1d2e4a5b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('track_listen_counts',
+    sa.Column('track_id', sa.Integer(), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('listens', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('track_id', 'hour')
+    )
+    op.create_index(op.f('ix_track_listen_counts_hour'), 'track_listen_counts', ['hour'], unique=False)
+
+    op.create_table('track_trending_scores',
+    sa.Column('time_range', sa.String(), nullable=False),
+    sa.Column('track_id', sa.Integer(), nullable=False),
+    sa.Column('listens', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('time_range', 'track_id')
+    )
+    # /trending reads a time range in score order
+    connection = op.get_bind()
+    connection.execute('''
+      CREATE INDEX ix_track_trending_scores_listens ON track_trending_scores
+        (time_range, listens DESC, track_id DESC);
+    ''')
+
+
+def downgrade():
+    op.drop_table('track_trending_scores')
+    op.drop_index(op.f('ix_track_listen_counts_hour'), table_name='track_listen_counts')
+    op.drop_table('track_listen_counts')
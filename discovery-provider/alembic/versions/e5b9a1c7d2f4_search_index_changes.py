@@ -0,0 +1,32 @@
+"""search index changes
+
+Revision ID: e5b9a1c7d2f4
+Revises: d8e2f4a6b1c3
+Create Date: 2019-12-05 11:42:19.160237
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9a1c7d2f4'
+down_revision = 'd8e2f4a6b1c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('search_index_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity_type', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_search_index_changes_created_at'), 'search_index_changes', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_search_index_changes_created_at'), table_name='search_index_changes')
+    op.drop_table('search_index_changes')
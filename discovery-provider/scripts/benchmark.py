@@ -0,0 +1,70 @@
+# Audius Discovery Provider / Benchmark
+# Measures requests/sec and latency percentiles for a discovery provider route.
+#
+# Usage (against a running server, e.g. scripts/prod-server.sh):
+#   python3 scripts/benchmark.py --url http://localhost:5000/tracks --requests 2000 --concurrency 16
+#
+# Run once on the baseline and once on the change under test, against the same DB
+# snapshot, and compare the reported requests/sec and p50/p95/p99 latencies.
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def run_benchmark(url, num_requests, concurrency, headers=None):
+    latencies = []
+    errors = 0
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    def timed_request(_):
+        start = time.time()
+        resp = session.get(url, headers=headers, timeout=60)
+        return time.time() - start, resp.status_code
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency, status_code in executor.map(timed_request, range(num_requests)):
+            latencies.append(latency)
+            if status_code != 200:
+                errors += 1
+    total_duration = time.time() - start
+
+    latencies.sort()
+    def percentile(pct):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * pct))]
+
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "duration_sec": total_duration,
+        "requests_per_sec": num_requests / total_duration,
+        "p50_ms": percentile(0.50) * 1000,
+        "p95_ms": percentile(0.95) * 1000,
+        "p99_ms": percentile(0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a discovery provider route")
+    parser.add_argument("--url", default="http://localhost:5000/tracks")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--user-id", type=int, default=None, help="sent as X-User-ID")
+    args = parser.parse_args()
+
+    headers = {"X-User-ID": str(args.user_id)} if args.user_id else None
+    # Warm up connections / caches before measuring
+    run_benchmark(args.url, min(args.requests, args.concurrency * 4), args.concurrency, headers)
+    results = run_benchmark(args.url, args.requests, args.concurrency, headers)
+    for key, value in results.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
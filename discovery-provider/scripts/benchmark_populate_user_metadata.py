@@ -0,0 +1,140 @@
+# Audius Discovery Provider / Benchmark populate_user_metadata
+# Compares the single-query populate_user_metadata against the previous one-query-per-field
+# implementation (reproduced below) for 10, 100 and 500 user ids.
+#
+# Usage (from the discovery-provider directory, against a populated db):
+#   python3 -m scripts.benchmark_populate_user_metadata --iterations 20 --current-user-id 1
+import argparse
+import ast
+import time
+import sqlalchemy
+from src.models import User
+from src.queries.query_helpers import populate_user_metadata
+from src.utils import helpers
+from src.utils.config import shared_config
+from src.utils.db_session import get_session_manager
+
+user_id_counts = [10, 100, 500]
+
+# Each query returns (user_id, value) rows for the requested :user_ids
+legacy_count_queries = {
+    "track_count": """
+        SELECT owner_id, count(*) FROM tracks
+        WHERE is_current = true and is_delete = false and is_unlisted = false and owner_id = ANY(:user_ids)
+        GROUP BY owner_id
+    """,
+    "playlist_count": """
+        SELECT playlist_owner_id, count(*) FROM playlists
+        WHERE is_current = true and is_album = false and is_private = false and is_delete = false
+          and playlist_owner_id = ANY(:user_ids)
+        GROUP BY playlist_owner_id
+    """,
+    "album_count": """
+        SELECT playlist_owner_id, count(*) FROM playlists
+        WHERE is_current = true and is_album = true and is_private = false and is_delete = false
+          and playlist_owner_id = ANY(:user_ids)
+        GROUP BY playlist_owner_id
+    """,
+    "follower_count": """
+        SELECT followee_user_id, count(*) FROM follows
+        WHERE is_current = true and is_delete = false and followee_user_id = ANY(:user_ids)
+        GROUP BY followee_user_id
+    """,
+    "followee_count": """
+        SELECT follower_user_id, count(*) FROM follows
+        WHERE is_current = true and is_delete = false and follower_user_id = ANY(:user_ids)
+        GROUP BY follower_user_id
+    """,
+    "repost_count": """
+        SELECT user_id, count(*) FROM reposts
+        WHERE is_current = true and is_delete = false and user_id = ANY(:user_ids)
+        GROUP BY user_id
+    """,
+    "track_blocknumber": """
+        SELECT owner_id, max(blocknumber) FROM tracks
+        WHERE is_current = true and is_delete = false and owner_id = ANY(:user_ids)
+        GROUP BY owner_id
+    """,
+}
+
+legacy_current_user_queries = {
+    "does_current_user_follow": """
+        SELECT followee_user_id, true FROM follows
+        WHERE is_current = true and is_delete = false
+          and followee_user_id = ANY(:user_ids) and follower_user_id = :current_user_id
+    """,
+    "current_user_followee_follow_count": """
+        SELECT followee_user_id, count(*) FROM follows
+        WHERE is_current = true and is_delete = false and followee_user_id = ANY(:user_ids)
+          and follower_user_id IN (
+            SELECT followee_user_id FROM follows
+            WHERE is_current = true and is_delete = false and follower_user_id = :current_user_id
+          )
+        GROUP BY followee_user_id
+    """,
+}
+
+
+def legacy_populate_user_metadata(session, user_ids, users, current_user_id):
+    """Previous implementation, one round trip per field"""
+    params = {"user_ids": list(user_ids), "current_user_id": current_user_id}
+    queries = dict(legacy_count_queries)
+    if current_user_id:
+        queries.update(legacy_current_user_queries)
+    results = {
+        field: dict(session.execute(sqlalchemy.text(query), params).fetchall())
+        for (field, query) in queries.items()
+    }
+    for user in users:
+        for field in list(legacy_count_queries) + list(legacy_current_user_queries):
+            default = {"track_blocknumber": -1, "does_current_user_follow": False}.get(field, 0)
+            user[field] = results.get(field, {}).get(user["user_id"], default)
+    return users
+
+
+def time_populate(populate, session, user_ids, users, current_user_id, iterations):
+    latencies = []
+    for _ in range(iterations):
+        start = time.time()
+        populate(session, user_ids, [dict(user) for user in users], current_user_id)
+        latencies.append(time.time() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark populate_user_metadata")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--current-user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    db = get_session_manager(
+        shared_config["db"]["url"],
+        ast.literal_eval(shared_config["db"]["engine_args_literal"])
+    )
+    with db.scoped_session() as session:
+        for num_user_ids in user_id_counts:
+            users = (
+                session.query(User)
+                .filter(User.is_current == True)
+                .order_by(User.user_id)
+                .limit(num_user_ids)
+                .all()
+            )
+            users = helpers.query_result_to_list(users)
+            user_ids = [user["user_id"] for user in users]
+
+            for (name, populate) in (
+                    ("legacy", legacy_populate_user_metadata),
+                    ("single_query", populate_user_metadata)
+            ):
+                # Warm up the db cache before measuring
+                populate(session, user_ids, [dict(user) for user in users], args.current_user_id)
+                (p50_ms, max_ms) = time_populate(
+                    populate, session, user_ids, users, args.current_user_id, args.iterations
+                )
+                print(f"user_ids={len(user_ids)} {name}: p50_ms={p50_ms:.2f} max_ms={max_ms:.2f}")
+
+
+if __name__ == "__main__":
+    main()
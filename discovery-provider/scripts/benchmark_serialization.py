@@ -0,0 +1,114 @@
+# Audius Discovery Provider / Benchmark serialization
+# Compares loading, serializing and JSON encoding a 500 row /tracks response the previous way
+# (ORM instances, per column getattr model_to_dictionary and jsonify's TimestampJSONEncoder,
+# reproduced below) against column rows, the precompiled row serializer and the success
+# response encoder.
+#
+# Usage (from the discovery-provider directory, against a populated db):
+#   python3 -m scripts.benchmark_serialization --iterations 20 --num-tracks 500
+import argparse
+import ast
+import datetime
+import json
+import time
+from flask.json import JSONEncoder
+from src.api_helpers import response_json_encoder
+from src.models import Track
+from src.queries.query_helpers import entity_columns
+from src.utils import helpers
+from src.utils.config import shared_config
+from src.utils.db_session import get_session_manager
+
+
+class LegacyTimestampJSONEncoder(JSONEncoder):
+    # pylint: disable=E0202
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.strftime("%Y-%m-%dT%H:%M:%S Z")
+        return JSONEncoder.default(self, o)
+
+
+def legacy_model_to_dictionary(db_model_obj, exclude_keys=None):
+    """Previous implementation, one getattr per column per row"""
+    model_dict = {}
+    if exclude_keys is None:
+        exclude_keys = []
+    possible_keys = db_model_obj.__table__.columns.keys()
+    assert set(exclude_keys).issubset(set(possible_keys))
+    for column_name in possible_keys:
+        if column_name in exclude_keys:
+            continue
+        model_dict[column_name] = getattr(db_model_obj, column_name)
+    return model_dict
+
+
+def legacy_encode(response_dictionary):
+    # jsonify with jsonify_prettyprint_regular = true and the default JSON_SORT_KEYS
+    return json.dumps(response_dictionary, cls=LegacyTimestampJSONEncoder, indent=2, sort_keys=True) + "\n"
+
+
+def fast_encode(response_dictionary):
+    return response_json_encoder.encode(response_dictionary) + "\n"
+
+
+def legacy_load(session, num_tracks):
+    return get_tracks_query(session.query(Track), num_tracks).all()
+
+
+def fast_load(session, num_tracks):
+    return get_tracks_query(session.query(*entity_columns(Track)), num_tracks).all()
+
+
+def get_tracks_query(base_query, num_tracks):
+    return (
+        base_query
+        .filter(Track.is_current == True, Track.is_unlisted == False)
+        .order_by(Track.track_id)
+        .limit(num_tracks)
+    )
+
+
+def time_steps(session, num_tracks, load, serialize, encode):
+    # returns the (load, serialize, encode) latencies of a single run in ms
+    start = time.time()
+    rows = load(session, num_tracks)
+    loaded = time.time()
+    tracks = [serialize(row) for row in rows] if serialize else helpers.query_result_to_list(rows)
+    serialized = time.time()
+    body = encode({"data": tracks, "success": True})
+    encoded = time.time()
+    # drop the loaded instances so every run builds them again
+    session.expunge_all()
+    return ((loaded - start) * 1000, (serialized - loaded) * 1000, (encoded - serialized) * 1000, len(body))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /tracks response serialization")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--num-tracks", type=int, default=500)
+    args = parser.parse_args()
+
+    db = get_session_manager(
+        shared_config["db"]["url"],
+        ast.literal_eval(shared_config["db"]["engine_args_literal"])
+    )
+    with db.scoped_session() as session:
+        for (name, load, serialize, encode) in (
+                ("legacy", legacy_load, legacy_model_to_dictionary, legacy_encode),
+                ("precompiled", fast_load, None, fast_encode)
+        ):
+            # Warm up the db cache before measuring
+            time_steps(session, args.num_tracks, load, serialize, encode)
+            runs = [
+                time_steps(session, args.num_tracks, load, serialize, encode)
+                for _ in range(args.iterations)
+            ]
+            p50s = [sorted(step)[len(runs) // 2] for step in zip(*runs)]
+            print(
+                f"tracks={args.num_tracks} {name}: load_p50_ms={p50s[0]:.2f} serialize_p50_ms={p50s[1]:.2f} "
+                f"encode_p50_ms={p50s[2]:.2f} total_p50_ms={sum(p50s[:3]):.2f} bytes={runs[0][3]}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Audius Discovery Provider / Rebuild aggregate counts
+# The indexer keeps user/track/playlist_aggregates up to date for the ids touched by each
+# block. This recomputes every row from scratch in a single transaction, e.g. after
+# restoring a db snapshot or changing the count queries in src/tasks/aggregates.py.
+#
+# Usage (from the discovery-provider directory):
+#   python3 -m scripts.rebuild_aggregates
+import ast
+import time
+from src.tasks.aggregates import rebuild_aggregates
+from src.utils.config import shared_config
+from src.utils.db_session import get_session_manager
+
+
+def main():
+    db = get_session_manager(
+        shared_config["db"]["url"],
+        ast.literal_eval(shared_config["db"]["engine_args_literal"])
+    )
+    start = time.time()
+    with db.scoped_session() as session:
+        rebuild_aggregates(session)
+    print(f"Rebuilt aggregate counts in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Audius Discovery Provider / Rebuild search lexeme dictionaries
+# The indexer keeps user/track/playlist/album_lexeme_dict up to date incrementally.
+# This recomputes them from scratch in a single transaction, e.g. to backfill after
+# restoring a db snapshot or changing the lexeme queries in src/tasks/lexeme_dicts.py.
+#
+# Usage (from the discovery-provider directory):
+#   python3 -m scripts.rebuild_lexeme_dicts
+import ast
+import time
+from src.tasks.lexeme_dicts import rebuild_lexeme_dicts
+from src.utils.config import shared_config
+from src.utils.db_session import get_session_manager
+
+
+def main():
+    db = get_session_manager(
+        shared_config["db"]["url"],
+        ast.literal_eval(shared_config["db"]["engine_args_literal"])
+    )
+    start = time.time()
+    with db.scoped_session() as session:
+        rebuild_lexeme_dicts(session)
+    print(f"Rebuilt lexeme dictionaries in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
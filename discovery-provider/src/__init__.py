@@ -2,7 +2,6 @@ from __future__ import absolute_import
 import os
 import logging
 import ast
-import datetime
 import time
 
 from web3 import HTTPProvider, Web3
@@ -13,18 +12,19 @@ from celery.schedules import timedelta
 
 import redis
 from flask import Flask
-from flask.json import JSONEncoder
 from flask_cors import CORS
 
 import alembic
 import alembic.config  # pylint: disable=E0611
 
 from src import exceptions
+from src.api_helpers import TimestampJSONEncoder
 from src.queries import queries, search, health_check, trending, notifications
 from src.utils import helpers, config
-from src.utils.db_session import SessionManager
+from src.utils.db_session import get_session_manager
 from src.utils.config import config_files, shared_config, ConfigIni
 from src.utils.ipfs_lib import IPFSClient
+from src.utils.metadata_cache import MetadataCache
 from src.tasks import celery_app
 
 # these global vars will be set in create_celery function
@@ -183,13 +183,6 @@ def configure_flask(test_config, app, mode="app"):
         app.iniconfig.read(config_files)
 
     # custom JSON serializer for timestamps
-    class TimestampJSONEncoder(JSONEncoder):
-        # pylint: disable=E0202
-        def default(self, o):
-            if isinstance(o, datetime.datetime):
-                # ISO-8601 timestamp format
-                return o.strftime("%Y-%m-%dT%H:%M:%S Z")
-            return JSONEncoder.default(self, o)
     app.json_encoder = TimestampJSONEncoder
 
     database_url = app.config["db"]["url"]
@@ -232,6 +225,12 @@ def configure_flask(test_config, app, mode="app"):
         # load the test config if passed in
         app.config.update(test_config)
 
+    # Initialize the process-wide DB engine + connection pool shared by all requests
+    app.db_session_manager = get_session_manager(
+        app.config["db"]["url"],
+        ast.literal_eval(app.config["db"]["engine_args_literal"])
+    )
+
     exceptions.register_exception_handlers(app)
     app.register_blueprint(queries.bp)
     app.register_blueprint(trending.bp)
@@ -241,6 +240,19 @@ def configure_flask(test_config, app, mode="app"):
     return app
 
 
+def get_metadata_cache(dir_key, max_size_mb_key):
+    # The cache is disabled when its directory is not configured or can't be created,
+    # e.g. the default container data dir when running outside the container
+    cache_dir = shared_config["ipfs"][dir_key]
+    if not cache_dir:
+        return None
+    try:
+        return MetadataCache(cache_dir, int(shared_config["ipfs"][max_size_mb_key]) * 1024 * 1024)
+    except OSError as e:
+        logger.warning(f"__init__.py | get_metadata_cache | {dir_key} {cache_dir} disabled: {e}")
+        return None
+
+
 def configure_celery(flask_app, celery, test_config=None):
     database_url = shared_config["db"]["url"]
     engine_args_literal = ast.literal_eval(shared_config["db"]["engine_args_literal"])
@@ -253,7 +265,10 @@ def configure_celery(flask_app, celery, test_config=None):
 
     # Update celery configuration
     celery.conf.update(
-        imports=["src.tasks.index", "src.tasks.index_blacklist", "src.tasks.index_cache"],
+        imports=[
+            "src.tasks.index", "src.tasks.index_blacklist", "src.tasks.index_cache", "src.tasks.index_listen_counts",
+            "src.tasks.index_play_counts"
+        ],
         beat_schedule={
             "update_discovery_provider": {
                 "task": "update_discovery_provider",
@@ -266,6 +281,15 @@ def configure_celery(flask_app, celery, test_config=None):
             "update_cache": {
                 "task": "update_discovery_cache",
                 "schedule": timedelta(seconds=60)
+            },
+            "update_listen_counts": {
+                "task": "update_listen_counts",
+                "schedule": timedelta(seconds=60)
+            },
+            "update_play_counts": {
+                "task": "update_play_counts",
+                # well within play_count_cache_ttl_sec, so hot tracks never expire
+                "schedule": timedelta(seconds=30)
             }
         },
         task_serializer="json",
@@ -274,14 +298,21 @@ def configure_celery(flask_app, celery, test_config=None):
     )
 
     # Initialize DB object for celery task context
-    db = SessionManager(database_url, engine_args_literal)
+    db = get_session_manager(database_url, engine_args_literal)
 
     # Initialize IPFS client for celery task context
     gateway_addrs = shared_config["ipfs"]["gateway_hosts"].split(',')
     gateway_addrs.append(shared_config["discprov"]["user_metadata_service_url"])
     logger.warning(f"__init__.py | {gateway_addrs}")
+    # Persistent metadata / multihash type caches are disabled when no directory is configured
+    metadata_cache = get_metadata_cache("metadata_cache_dir", "metadata_cache_max_size_mb")
+    multihash_type_cache = get_metadata_cache("multihash_type_cache_dir", "multihash_type_cache_max_size_mb")
     ipfs_client = IPFSClient(
-        shared_config["ipfs"]["host"], shared_config["ipfs"]["port"], gateway_addrs
+        shared_config["ipfs"]["host"], shared_config["ipfs"]["port"], gateway_addrs,
+        metadata_cache=metadata_cache,
+        gateway_hedge_count=int(shared_config["ipfs"]["gateway_hedge_count"]),
+        gateway_hedge_delay=int(shared_config["ipfs"]["gateway_hedge_delay_ms"]) / 1000,
+        multihash_type_cache=multihash_type_cache
     )
 
     # Initialize Redis connection
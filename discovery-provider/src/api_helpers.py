@@ -1,4 +1,6 @@
-from flask import jsonify
+import datetime
+from flask import current_app, jsonify
+from flask.json import JSONEncoder
 import redis
 from src.utils.config import shared_config
 from src.utils.redis_constants import latest_block_redis_key, most_recent_indexed_block_redis_key
@@ -7,15 +9,44 @@ redis_url = shared_config["redis"]["url"]
 redis = redis.Redis.from_url(url=redis_url)
 
 
+# API timestamp format, ISO-8601 "%Y-%m-%dT%H:%M:%S Z"
+def format_timestamp(timestamp):
+    # isoformat is several times faster than strftime and matches it for naive timestamps,
+    # which is what the db returns
+    if timestamp.tzinfo is None and timestamp.year >= 1000:
+        return timestamp.isoformat(timespec="seconds") + " Z"
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%S Z")
+
+
+# custom JSON serializer for timestamps, used by jsonify and success responses
+class TimestampJSONEncoder(JSONEncoder):
+    # pylint: disable=E0202
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return format_timestamp(o)
+        return JSONEncoder.default(self, o)
+
+
+# Encoder for success responses, the hot path of every list endpoint.
+# jsonify sorts keys and, per the [flask] config, pretty prints, which forces the pure python
+# encoder. Success responses are instead encoded compact and unsorted by the stdlib C encoder,
+# without the circular reference check the plain response trees don't need.
+response_json_encoder = TimestampJSONEncoder(separators=(",", ":"), check_circular=False)
+
+
 def error_response(error, error_code=500):
     return jsonify({'success': False, 'error': error}), error_code
 
 
-def success_response(response_entity=None, status=200):
+def success_response(response_entity=None, status=200, next_cursor=None):
     response_dictionary = {
         'data': response_entity
     }
 
+    # set by endpoints supporting cursor pagination when there may be another page
+    if next_cursor is not None:
+        response_dictionary['next_cursor'] = next_cursor
+
     response_dictionary['success'] = True
 
     latest_indexed_block = redis.get(most_recent_indexed_block_redis_key)
@@ -24,4 +55,8 @@ def success_response(response_entity=None, status=200):
     response_dictionary['latest_indexed_block'] = (int(latest_indexed_block) if latest_indexed_block else None)
     response_dictionary['latest_chain_block'] = (int(latest_chain_block) if latest_chain_block else None)
 
-    return jsonify(response_dictionary), status
+    response = current_app.response_class(
+        response_json_encoder.encode(response_dictionary) + "\n",
+        mimetype=current_app.config["JSONIFY_MIMETYPE"]
+    )
+    return response, status
@@ -123,7 +123,7 @@ class Track(Base):
     track_id = Column(Integer, nullable=False)
     is_current = Column(Boolean, nullable=False)
     is_delete = Column(Boolean, nullable=False)
-    owner_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=False, index=True)
     route_id = Column(String, nullable=False)
     title = Column(Text)
     length = Column(Integer)
@@ -190,7 +190,7 @@ class Playlist(Base):
     blockhash = Column(String, ForeignKey("blocks.blockhash"), nullable=False)
     blocknumber = Column(Integer, ForeignKey("blocks.number"), nullable=False)
     playlist_id = Column(Integer, nullable=False)
-    playlist_owner_id = Column(Integer, nullable=False)
+    playlist_owner_id = Column(Integer, nullable=False, index=True)
     is_album = Column(Boolean, nullable=False)
     is_private = Column(Boolean, nullable=False)
     playlist_name = Column(String)
@@ -237,7 +237,7 @@ class Repost(Base):
     blockhash = Column(String, ForeignKey("blocks.blockhash"), nullable=False)
     blocknumber = Column(Integer, ForeignKey("blocks.number"), nullable=False)
     user_id = Column(Integer, nullable=False)
-    repost_item_id = Column(Integer, nullable=False)
+    repost_item_id = Column(Integer, nullable=False, index=True)
     repost_type = Column(Enum(RepostType), nullable=False)
     is_current = Column(Boolean, nullable=False)
     is_delete = Column(Boolean, nullable=False)
@@ -292,7 +292,7 @@ class Save(Base):
     blockhash = Column(String, ForeignKey("blocks.blockhash"), nullable=False)
     blocknumber = Column(Integer, ForeignKey("blocks.number"), nullable=False)
     user_id = Column(Integer, nullable=False)
-    save_item_id = Column(Integer, nullable=False)
+    save_item_id = Column(Integer, nullable=False, index=True)
     save_type = Column(Enum(SaveType), nullable=False)
     created_at = Column(DateTime, nullable=False)
     is_current = Column(Boolean, nullable=False)
@@ -309,3 +309,104 @@ created_at={self.created_at},\
 save_type={self.save_type},\
 is_current={self.is_current},\
 is_delete={self.is_delete}>"
+
+
+# Aggregate counts maintained by the indexer, see src/tasks/aggregates.py
+class UserAggregates(Base):
+    __tablename__ = "user_aggregates"
+
+    user_id = Column(Integer, primary_key=True)
+    track_count = Column(Integer, nullable=False)
+    playlist_count = Column(Integer, nullable=False)
+    album_count = Column(Integer, nullable=False)
+    follower_count = Column(Integer, nullable=False)
+    following_count = Column(Integer, nullable=False)
+    repost_count = Column(Integer, nullable=False)
+    track_blocknumber = Column(Integer, nullable=True)
+
+    def __repr__(self):
+        return f"<UserAggregates(user_id={self.user_id},\
+track_count={self.track_count},\
+playlist_count={self.playlist_count},\
+album_count={self.album_count},\
+follower_count={self.follower_count},\
+following_count={self.following_count},\
+repost_count={self.repost_count},\
+track_blocknumber={self.track_blocknumber})>"
+
+
+class TrackAggregates(Base):
+    __tablename__ = "track_aggregates"
+
+    track_id = Column(Integer, primary_key=True)
+    repost_count = Column(Integer, nullable=False)
+    save_count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<TrackAggregates(track_id={self.track_id},\
+repost_count={self.repost_count},\
+save_count={self.save_count})>"
+
+
+class PlaylistAggregates(Base):
+    __tablename__ = "playlist_aggregates"
+
+    playlist_id = Column(Integer, primary_key=True)
+    repost_count = Column(Integer, nullable=False)
+    save_count = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<PlaylistAggregates(playlist_id={self.playlist_id},\
+repost_count={self.repost_count},\
+save_count={self.save_count})>"
+
+
+class TrackListenCount(Base):
+    __tablename__ = "track_listen_counts"
+
+    # listens of track_id in the bucket starting at hour, ingested from identity service
+    # buckets older than a couple of days may span a whole day, see src/tasks/index_listen_counts.py
+    track_id = Column(Integer, nullable=False)
+    hour = Column(DateTime, nullable=False, index=True)
+    listens = Column(Integer, nullable=False)
+
+    PrimaryKeyConstraint(track_id, hour)
+
+    def __repr__(self):
+        return f"<TrackListenCount(track_id={self.track_id},\
+hour={self.hour},\
+listens={self.listens})>"
+
+
+class TrackTrendingScore(Base):
+    __tablename__ = "track_trending_scores"
+
+    # total listens of track_id within time_range (day, week, month, year), served by /trending
+    time_range = Column(String, nullable=False)
+    track_id = Column(Integer, nullable=False)
+    listens = Column(Integer, nullable=False)
+
+    PrimaryKeyConstraint(time_range, track_id)
+
+    def __repr__(self):
+        return f"<TrackTrendingScore(time_range={self.time_range},\
+track_id={self.track_id},\
+listens={self.listens})>"
+
+
+class SearchIndexChange(Base):
+    __tablename__ = "search_index_changes"
+
+    # entity whose search lexeme entries were recomputed by the indexer, read by the in-process
+    # search index of each API process, see src/utils/search_index.py
+    # entity_type is user, track or playlist (albums included), or all after a full rebuild
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SearchIndexChange(id={self.id},\
+entity_type={self.entity_type},\
+entity_id={self.entity_id},\
+created_at={self.created_at})>"
@@ -9,6 +9,8 @@ from web3 import HTTPProvider, Web3
 from src.models import Block
 from src.utils import helpers
 from src.utils.db_session import get_db
+from src.utils.http_session import get_http_session
+from src.utils.autocomplete_cache import get_autocomplete_cache_metrics
 from src.utils.config import shared_config
 from src.utils.redis_constants import latest_block_redis_key, latest_block_hash_redis_key
 
@@ -72,7 +74,11 @@ def _get_db_conn_state():
         ).fetchall()
         connection_info = [dict(row) for row in connection_info]
 
-    return {"open_connections": num_connections, "connection_info": connection_info}
+    return {
+        "open_connections": num_connections,
+        "connection_info": connection_info,
+        "pool": db.pool_metrics()
+    }
 
 
 #### ROUTES ####
@@ -108,6 +114,10 @@ def health_check():
     if verbose:
         # DB connections check
         health_results["db_connections"] = _get_db_conn_state()
+        # Outbound http connection reuse for this process
+        health_results["http_connections"] = get_http_session().pool_metrics()
+        # Hit rate of the /search/autocomplete result cache
+        health_results["autocomplete_cache"] = get_autocomplete_cache_metrics(redis)
 
     if health_results["block_difference"] > HEALTHY_BLOCK_DIFF:
         return jsonify(health_results), 500
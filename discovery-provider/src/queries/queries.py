@@ -7,18 +7,22 @@ from sqlalchemy.orm import aliased
 from flask import Blueprint, request
 
 from src import api_helpers, exceptions
-from src.models import User, Track, Repost, RepostType, Follow, Playlist, Save, SaveType
+from src.models import User, Track, Repost, RepostType, Follow, Playlist, Save, SaveType, UserAggregates
 from src.utils import helpers
 from src.utils.db_session import get_db
 from src.queries import response_name_constants
-from src.queries.query_helpers import get_current_user_id, parse_sort_param, populate_user_metadata, \
-    populate_track_metadata, populate_playlist_metadata, get_repost_counts, get_save_counts, \
-    get_pagination_vars, paginate_query
+from src.queries.query_helpers import get_current_user_id, parse_sort_columns, populate_user_metadata, \
+    populate_track_metadata, populate_playlist_metadata, get_track_aggregate_counts, \
+    get_playlist_aggregate_counts, get_followee_user_ids, get_pagination_vars, paginate_query, maxLimit, REDIS, \
+    paginate_query_with_cursor, get_next_cursor, entity_columns, get_entities_by_id, hydrate_entities
+from src.utils.feed_timeline import feed_timeline_enabled, get_feed_timeline, seed_feed_timeline, \
+    start_feed_timeline_seed, get_feed_item_member, parse_feed_item_member, score_to_datetime, get_celebrity_user_ids, \
+    track_dedupe_max_minutes
 
 logger = logging.getLogger(__name__)
 bp = Blueprint("queries", __name__)
 
-trackDedupeMaxMinutes = 10
+trackDedupeMaxMinutes = track_dedupe_max_minutes
 
 
 ######## ROUTES ########
@@ -32,7 +36,7 @@ def get_users():
     db = get_db()
     with db.scoped_session() as session:
         # Create initial query
-        base_query = session.query(User)
+        base_query = session.query(*entity_columns(User))
         # Don't return the user if they have no wallet or handle (user creation did not finish properly on chain)
         base_query = base_query.filter(User.is_current == True, User.wallet != None, User.handle != None)
 
@@ -44,13 +48,13 @@ def get_users():
             wallet = request.args.get("wallet")
             wallet = wallet.lower()
             if len(wallet) == 42:
-                base_query = base_query.filter_by(wallet=wallet)
+                base_query = base_query.filter(User.wallet == wallet)
                 base_query = base_query.order_by(asc(User.created_at))
             else:
                 logger.warning("Invalid wallet length")
         if "handle" in request.args:
             handle = request.args.get("handle").lower()
-            base_query = base_query.filter_by(handle_lc=handle)
+            base_query = base_query.filter(User.handle_lc == handle)
 
         # Conditionally process an array of users
         if "id" in request.args:
@@ -87,7 +91,7 @@ def get_tracks():
     db = get_db()
     with db.scoped_session() as session:
         # Create initial query
-        base_query = session.query(Track)
+        base_query = session.query(*entity_columns(Track))
         base_query = base_query.filter(Track.is_current == True, Track.is_unlisted == False)
 
         # Conditionally process an array of tracks
@@ -128,8 +132,20 @@ def get_tracks():
             )
 
         whitelist_params = ['created_at', 'create_date', 'release_date', 'blocknumber', 'track_id']
-        base_query = parse_sort_param(base_query, Track, whitelist_params)
-        query_results = paginate_query(base_query).all()
+        sort_columns = parse_sort_columns(Track, whitelist_params)
+        # create_date and release_date are nullable, which keyset comparisons can't page through
+        supports_cursor = not any(
+            column is Track.create_date or column is Track.release_date for (column, _) in sort_columns
+        )
+        if "cursor" in request.args and not supports_cursor:
+            raise exceptions.ArgumentError("cursor is not supported when sorting by create_date or release_date")
+        # track_id breaks ties so every track has a distinct position for cursor pagination
+        if not any(column is Track.track_id for (column, _) in sort_columns):
+            sort_columns.append((Track.track_id, False))
+        query_results = paginate_query_with_cursor(base_query, sort_columns).all()
+        next_cursor = get_next_cursor(
+            query_results, lambda track: [getattr(track, column.key) for (column, _) in sort_columns]
+        ) if supports_cursor else None
         tracks = helpers.query_result_to_list(query_results)
 
         track_ids = list(map(lambda track: track["track_id"], tracks))
@@ -139,7 +155,7 @@ def get_tracks():
         # bundle peripheral info into track results
         tracks = populate_track_metadata(session, track_ids, tracks, current_user_id)
 
-    return api_helpers.success_response(tracks)
+    return api_helpers.success_response(tracks, next_cursor=next_cursor)
 
 
 # Get all tracks matching a route_id and track_id.
@@ -154,7 +170,7 @@ def get_tracks_including_unlisted():
 
     db = get_db()
     with db.scoped_session() as session:
-        base_query = session.query(Track)
+        base_query = session.query(*entity_columns(Track))
         filter_cond = []
 
         # Create filter conditions as a list of `and` clauses
@@ -189,7 +205,7 @@ def get_playlists():
     with db.scoped_session() as session:
         try:
             playlist_query = (
-                session.query(Playlist)
+                session.query(*entity_columns(Playlist))
                 .filter(Playlist.is_current == True)
             )
 
@@ -271,194 +287,16 @@ def get_feed():
 
     # Current user - user for whom feed is being generated
     current_user_id = get_current_user_id()
+    (limit, _) = get_pagination_vars()
     with db.scoped_session() as session:
         # Generate list of users followed by current user, i.e. 'followees'
-        followee_user_ids = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.follower_user_id == current_user_id,
-                Follow.is_current == True,
-                Follow.is_delete == False
-            )
-            .all()
-        )
-        followee_user_ids = [f[0] for f in followee_user_ids]
-
-        # Fetch followee creations if requested
-        if feed_filter in ["original", "all"]:
-            # Query playlists posted by followees, sorted and paginated by created_at desc
-            created_playlists_query = (
-                session.query(Playlist)
-                .filter(
-                    Playlist.is_current == True,
-                    Playlist.is_private == False,
-                    Playlist.playlist_owner_id.in_(followee_user_ids)
-                )
-                .order_by(desc(Playlist.created_at))
-            )
-            created_playlists = paginate_query(created_playlists_query, False).all()
-
-            # get track ids for all tracks in playlists
-            playlist_track_ids = set()
-            for playlist in created_playlists:
-                for track in playlist.playlist_contents["track_ids"]:
-                    playlist_track_ids.add(track["track"])
-
-            # get all track objects for track ids
-            playlist_tracks = (
-                session.query(Track)
-                .filter(
-                    Track.is_current == True,
-                    Track.track_id.in_(playlist_track_ids)
-                )
-                .all()
-            )
-            playlist_tracks_dict = {track.track_id: track for track in playlist_tracks}
-
-            # get all track ids that have same owner as playlist and created in "same action"
-            # "same action": track created within [x time] before playlist creation
-            tracks_to_dedupe = set()
-            for playlist in created_playlists:
-                for track_entry in playlist.playlist_contents["track_ids"]:
-                    track = playlist_tracks_dict.get(track_entry["track"])
-                    if not track:
-                        return api_helpers.error_response("Something caused the server to crash.")
-                    max_timedelta = datetime.timedelta(minutes=trackDedupeMaxMinutes)
-                    if (track.owner_id == playlist.playlist_owner_id) and \
-                        (track.created_at <= playlist.created_at) and \
-                        (playlist.created_at - track.created_at <= max_timedelta):
-                        tracks_to_dedupe.add(track.track_id)
-            tracks_to_dedupe = list(tracks_to_dedupe)
-
-            # Query tracks posted by followees, sorted & paginated by created_at desc
-            # exclude tracks that were posted in "same action" as playlist
-            created_tracks_query = (
-                session.query(Track)
-                .filter(
-                    Track.is_current == True,
-                    Track.is_unlisted == False,
-                    Track.owner_id.in_(followee_user_ids),
-                    Track.track_id.notin_(tracks_to_dedupe)
-                )
-                .order_by(desc(Track.created_at))
-            )
-            created_tracks = paginate_query(created_tracks_query, False).all()
-
-            # extract created_track_ids and created_playlist_ids
-            created_track_ids = [track.track_id for track in created_tracks]
-            created_playlist_ids = [playlist.playlist_id for playlist in created_playlists]
-
-        # Fetch followee reposts if requested
-        if feed_filter in ["repost", "all"]:
-            # query items reposted by followees, sorted by oldest followee repost of item;
-            # paginated by most recent repost timestamp
-            repost_subquery = (
-                session.query(Repost)
-                .filter(
-                    Repost.is_current == True,
-                    Repost.is_delete == False,
-                    Repost.user_id.in_(followee_user_ids)
-                )
-            )
-            # exclude items also created by followees to guarantee order determinism, in case of "all" filter
-            if feed_filter == "all":
-                repost_subquery = (
-                    repost_subquery
-                    .filter(
-                        or_(
-                            and_(
-                                Repost.repost_type == RepostType.track,
-                                Repost.repost_item_id.notin_(created_track_ids)
-                            ),
-                            and_(
-                                Repost.repost_type != RepostType.track,
-                                Repost.repost_item_id.notin_(created_playlist_ids)
-                            )
-                        )
-                    )
-                )
-            repost_subquery = repost_subquery.subquery()
-
-            repost_query = (
-                session.query(
-                    repost_subquery.c.repost_item_id,
-                    repost_subquery.c.repost_type,
-                    func.min(repost_subquery.c.created_at).label("min_created_at")
-                )
-                .group_by(repost_subquery.c.repost_item_id, repost_subquery.c.repost_type)
-                .order_by(desc("min_created_at"))
-            )
-            followee_reposts = paginate_query(repost_query, False).all()
-
-            # build dict of track_id / playlist_id -> oldest followee repost timestamp from followee_reposts above
-            track_repost_timestamp_dict = {}
-            playlist_repost_timestamp_dict = {}
-            for (repost_item_id, repost_type, oldest_followee_repost_timestamp) in followee_reposts:
-                if repost_type == RepostType.track:
-                    track_repost_timestamp_dict[repost_item_id] = oldest_followee_repost_timestamp
-                elif repost_type in (RepostType.playlist, RepostType.album):
-                    playlist_repost_timestamp_dict[repost_item_id] = oldest_followee_repost_timestamp
-
-            # extract reposted_track_ids and reposted_playlist_ids
-            reposted_track_ids = list(track_repost_timestamp_dict.keys())
-            reposted_playlist_ids = list(playlist_repost_timestamp_dict.keys())
-
-            # Query tracks reposted by followees
-            reposted_tracks = session.query(Track).filter(
-                Track.is_current == True,
-                Track.is_unlisted == False,
-                Track.track_id.in_(reposted_track_ids)
-            )
-            # exclude tracks already fetched from above, in case of "all" filter
-            if feed_filter == "all":
-                reposted_tracks = reposted_tracks.filter(
-                    Track.track_id.notin_(created_track_ids)
-                )
-            reposted_tracks = reposted_tracks.order_by(
-                desc(Track.created_at)
-            ).all()
+        followee_user_ids = get_followee_user_ids(session, current_user_id)
 
-            # Query playlists reposted by followees, excluding playlists already fetched from above
-            reposted_playlists = session.query(Playlist).filter(
-                Playlist.is_current == True,
-                Playlist.is_private == False,
-                Playlist.playlist_id.in_(reposted_playlist_ids)
-            )
-            # exclude playlists already fetched from above, in case of "all" filter
-            if feed_filter == "all":
-                reposted_playlists = reposted_playlists.filter(
-                    Playlist.playlist_id.notin_(created_playlist_ids)
-                )
-            reposted_playlists = reposted_playlists.order_by(
-                desc(Playlist.created_at)
-            ).all()
-
-        if feed_filter == "original":
-            tracks_to_process = created_tracks
-            playlists_to_process = created_playlists
-        elif feed_filter == "repost":
-            tracks_to_process = reposted_tracks
-            playlists_to_process = reposted_playlists
+        # read filter=all feeds from the fan-out-on-write timeline store if enabled
+        if feed_filter == "all" and feed_timeline_enabled():
+            (tracks, playlists) = get_timeline_feed_items(session, current_user_id, followee_user_ids, limit)
         else:
-            tracks_to_process = created_tracks + reposted_tracks
-            playlists_to_process = created_playlists + reposted_playlists
-
-        tracks = helpers.query_result_to_list(tracks_to_process)
-        playlists = helpers.query_result_to_list(playlists_to_process)
-
-        # define top level feed activity_timestamp to enable sorting
-        # activity_timestamp: created_at if item created by followee, else reposted_at
-        for track in tracks:
-            if track["owner_id"] in followee_user_ids:
-                track[response_name_constants.activity_timestamp] = track["created_at"]
-            else:
-                track[response_name_constants.activity_timestamp] = track_repost_timestamp_dict[track["track_id"]]
-        for playlist in playlists:
-            if playlist["playlist_owner_id"] in followee_user_ids:
-                playlist[response_name_constants.activity_timestamp] = playlist["created_at"]
-            else:
-                playlist[response_name_constants.activity_timestamp] = \
-                    playlist_repost_timestamp_dict[playlist["playlist_id"]]
+            (tracks, playlists) = get_followee_feed_items(session, followee_user_ids, feed_filter, limit)
 
         # bundle peripheral info into track and playlist objects
         track_ids = list(map(lambda track: track["track_id"], tracks))
@@ -484,12 +322,257 @@ def get_feed():
         )
 
         # truncate feed to requested limit
-        (limit, _) = get_pagination_vars()
         feed_results = sorted_feed[0:limit]
 
     return api_helpers.success_response(feed_results)
 
 
+# Returns the (tracks, playlists) created and / or reposted by followee_user_ids, as dicts with
+# activity_timestamp set, newest up to limit of each of created playlists, created tracks and reposts
+def get_followee_feed_items(session, followee_user_ids, feed_filter, limit):
+    # Fetch followee creations if requested
+    if feed_filter in ["original", "all"]:
+        # Query playlists posted by followees, sorted and paginated by created_at desc
+        created_playlists_query = (
+            session.query(*entity_columns(Playlist))
+            .filter(
+                Playlist.is_current == True,
+                Playlist.is_private == False,
+                Playlist.playlist_owner_id.in_(followee_user_ids)
+            )
+            .order_by(desc(Playlist.created_at))
+        )
+        created_playlists = created_playlists_query.limit(limit).all()
+
+        # get track ids for all tracks in playlists
+        playlist_track_ids = set()
+        for playlist in created_playlists:
+            for track in playlist.playlist_contents["track_ids"]:
+                playlist_track_ids.add(track["track"])
+
+        # get the columns needed for deduping for all track ids
+        playlist_tracks = (
+            session.query(Track.track_id, Track.owner_id, Track.created_at)
+            .filter(
+                Track.is_current == True,
+                Track.track_id.in_(playlist_track_ids)
+            )
+            .all()
+        )
+        playlist_tracks_dict = {track.track_id: track for track in playlist_tracks}
+
+        # get all track ids that have same owner as playlist and created in "same action"
+        # "same action": track created within [x time] before playlist creation
+        tracks_to_dedupe = set()
+        for playlist in created_playlists:
+            for track_entry in playlist.playlist_contents["track_ids"]:
+                track = playlist_tracks_dict.get(track_entry["track"])
+                if not track:
+                    raise Exception(
+                        f"Playlist {playlist.playlist_id} references missing track {track_entry['track']}"
+                    )
+                max_timedelta = datetime.timedelta(minutes=trackDedupeMaxMinutes)
+                if (track.owner_id == playlist.playlist_owner_id) and \
+                    (track.created_at <= playlist.created_at) and \
+                    (playlist.created_at - track.created_at <= max_timedelta):
+                    tracks_to_dedupe.add(track.track_id)
+        tracks_to_dedupe = list(tracks_to_dedupe)
+
+        # Query tracks posted by followees, sorted & paginated by created_at desc
+        # exclude tracks that were posted in "same action" as playlist
+        created_tracks_query = (
+            session.query(*entity_columns(Track))
+            .filter(
+                Track.is_current == True,
+                Track.is_unlisted == False,
+                Track.owner_id.in_(followee_user_ids),
+                Track.track_id.notin_(tracks_to_dedupe)
+            )
+            .order_by(desc(Track.created_at))
+        )
+        created_tracks = created_tracks_query.limit(limit).all()
+
+        # extract created_track_ids and created_playlist_ids
+        created_track_ids = [track.track_id for track in created_tracks]
+        created_playlist_ids = [playlist.playlist_id for playlist in created_playlists]
+
+    # Fetch followee reposts if requested
+    if feed_filter in ["repost", "all"]:
+        # query items reposted by followees, sorted by oldest followee repost of item;
+        # paginated by most recent repost timestamp
+        repost_subquery = (
+            session.query(Repost)
+            .filter(
+                Repost.is_current == True,
+                Repost.is_delete == False,
+                Repost.user_id.in_(followee_user_ids)
+            )
+        )
+        # exclude items also created by followees to guarantee order determinism, in case of "all" filter
+        if feed_filter == "all":
+            repost_subquery = (
+                repost_subquery
+                .filter(
+                    or_(
+                        and_(
+                            Repost.repost_type == RepostType.track,
+                            Repost.repost_item_id.notin_(created_track_ids)
+                        ),
+                        and_(
+                            Repost.repost_type != RepostType.track,
+                            Repost.repost_item_id.notin_(created_playlist_ids)
+                        )
+                    )
+                )
+            )
+        repost_subquery = repost_subquery.subquery()
+
+        repost_query = (
+            session.query(
+                repost_subquery.c.repost_item_id,
+                repost_subquery.c.repost_type,
+                func.min(repost_subquery.c.created_at).label("min_created_at")
+            )
+            .group_by(repost_subquery.c.repost_item_id, repost_subquery.c.repost_type)
+            .order_by(desc("min_created_at"))
+        )
+        followee_reposts = repost_query.limit(limit).all()
+
+        # build dict of track_id / playlist_id -> oldest followee repost timestamp from followee_reposts above
+        track_repost_timestamp_dict = {}
+        playlist_repost_timestamp_dict = {}
+        for (repost_item_id, repost_type, oldest_followee_repost_timestamp) in followee_reposts:
+            if repost_type == RepostType.track:
+                track_repost_timestamp_dict[repost_item_id] = oldest_followee_repost_timestamp
+            elif repost_type in (RepostType.playlist, RepostType.album):
+                playlist_repost_timestamp_dict[repost_item_id] = oldest_followee_repost_timestamp
+
+        # extract reposted_track_ids and reposted_playlist_ids
+        reposted_track_ids = list(track_repost_timestamp_dict.keys())
+        reposted_playlist_ids = list(playlist_repost_timestamp_dict.keys())
+
+        # Query tracks reposted by followees
+        reposted_tracks = session.query(*entity_columns(Track)).filter(
+            Track.is_current == True,
+            Track.is_unlisted == False,
+            Track.track_id.in_(reposted_track_ids)
+        )
+        # exclude tracks already fetched from above, in case of "all" filter
+        if feed_filter == "all":
+            reposted_tracks = reposted_tracks.filter(
+                Track.track_id.notin_(created_track_ids)
+            )
+        reposted_tracks = reposted_tracks.order_by(
+            desc(Track.created_at)
+        ).all()
+
+        # Query playlists reposted by followees, excluding playlists already fetched from above
+        reposted_playlists = session.query(*entity_columns(Playlist)).filter(
+            Playlist.is_current == True,
+            Playlist.is_private == False,
+            Playlist.playlist_id.in_(reposted_playlist_ids)
+        )
+        # exclude playlists already fetched from above, in case of "all" filter
+        if feed_filter == "all":
+            reposted_playlists = reposted_playlists.filter(
+                Playlist.playlist_id.notin_(created_playlist_ids)
+            )
+        reposted_playlists = reposted_playlists.order_by(
+            desc(Playlist.created_at)
+        ).all()
+
+    if feed_filter == "original":
+        tracks_to_process = created_tracks
+        playlists_to_process = created_playlists
+    elif feed_filter == "repost":
+        tracks_to_process = reposted_tracks
+        playlists_to_process = reposted_playlists
+    else:
+        tracks_to_process = created_tracks + reposted_tracks
+        playlists_to_process = created_playlists + reposted_playlists
+
+    tracks = helpers.query_result_to_list(tracks_to_process)
+    playlists = helpers.query_result_to_list(playlists_to_process)
+
+    # define top level feed activity_timestamp to enable sorting
+    # activity_timestamp: created_at if item created by followee, else reposted_at
+    for track in tracks:
+        if track["owner_id"] in followee_user_ids:
+            track[response_name_constants.activity_timestamp] = track["created_at"]
+        else:
+            track[response_name_constants.activity_timestamp] = track_repost_timestamp_dict[track["track_id"]]
+    for playlist in playlists:
+        if playlist["playlist_owner_id"] in followee_user_ids:
+            playlist[response_name_constants.activity_timestamp] = playlist["created_at"]
+        else:
+            playlist[response_name_constants.activity_timestamp] = \
+                playlist_repost_timestamp_dict[playlist["playlist_id"]]
+
+    return (tracks, playlists)
+
+
+# Returns the feed=all (tracks, playlists) from current_user_id's fan-out-on-write timeline,
+# seeding the timeline from get_followee_feed_items if it isn't materialized yet.
+# Activity of followees over feed_fanout_max_followers isn't fanned out and is merged in here.
+def get_timeline_feed_items(session, current_user_id, followee_user_ids, limit):
+    timeline = get_feed_timeline(REDIS, current_user_id, limit * 2)
+    if timeline is None:
+        # create the timeline first so activity indexed during the seed query is pushed into it
+        start_feed_timeline_seed(REDIS, current_user_id)
+        (tracks, playlists) = get_followee_feed_items(session, followee_user_ids, "all", maxLimit)
+        seed_feed_timeline(
+            REDIS,
+            current_user_id,
+            [(get_feed_item_member("track", track["track_id"]), track[response_name_constants.activity_timestamp])
+             for track in tracks] +
+            [(get_feed_item_member("playlist", playlist["playlist_id"]),
+              playlist[response_name_constants.activity_timestamp])
+             for playlist in playlists]
+        )
+        return (tracks, playlists)
+
+    # build dicts of track / playlist id --> activity timestamp
+    track_timestamp_dict = {}
+    playlist_timestamp_dict = {}
+    for (member, score) in timeline:
+        (item_type, item_id) = parse_feed_item_member(member)
+        if item_type == "track":
+            track_timestamp_dict[item_id] = score_to_datetime(score)
+        else:
+            playlist_timestamp_dict[item_id] = score_to_datetime(score)
+
+    # merge in activity of followees whose activity isn't fanned out, keeping the earliest timestamp
+    celebrity_followee_ids = get_celebrity_user_ids(session, followee_user_ids)
+    if celebrity_followee_ids:
+        (celebrity_tracks, celebrity_playlists) = \
+            get_followee_feed_items(session, celebrity_followee_ids, "all", limit)
+        for track in celebrity_tracks:
+            timestamp = track[response_name_constants.activity_timestamp]
+            track_timestamp_dict[track["track_id"]] = \
+                min(timestamp, track_timestamp_dict.get(track["track_id"], timestamp))
+        for playlist in celebrity_playlists:
+            timestamp = playlist[response_name_constants.activity_timestamp]
+            playlist_timestamp_dict[playlist["playlist_id"]] = \
+                min(timestamp, playlist_timestamp_dict.get(playlist["playlist_id"], timestamp))
+
+    # hydrate timeline items, entities that are no longer visible are dropped
+    tracks = list(get_entities_by_id(
+        session, Track, Track.track_id, track_timestamp_dict.keys(),
+        Track.is_current == True,
+        Track.is_unlisted == False
+    ).values())
+    playlists = list(get_entities_by_id(
+        session, Playlist, Playlist.playlist_id, playlist_timestamp_dict.keys(),
+        Playlist.is_current == True,
+        Playlist.is_private == False
+    ).values())
+    for track in tracks:
+        track[response_name_constants.activity_timestamp] = track_timestamp_dict[track["track_id"]]
+    for playlist in playlists:
+        playlist[response_name_constants.activity_timestamp] = playlist_timestamp_dict[playlist["playlist_id"]]
+    return (tracks, playlists)
+
+
 # user repost feed steps
 # - get all reposts by user
 # - get all track and public playlist reposts by user, ordered by timestamp
@@ -504,15 +587,18 @@ def get_repost_feed_for_user(user_id):
     with db.scoped_session() as session:
         # query all reposts by user
         repost_query = (
-            session.query(Repost)
+            session.query(*entity_columns(Repost))
             .filter(
                 Repost.is_current == True,
                 Repost.is_delete == False,
                 Repost.user_id == user_id
             )
-            .order_by(desc(Repost.created_at))
         )
-        reposts = paginate_query(repost_query).all()
+        repost_sort_columns = [(Repost.created_at, True), (Repost.repost_item_id, True), (Repost.repost_type, True)]
+        reposts = paginate_query_with_cursor(repost_query, repost_sort_columns).all()
+        next_cursor = get_next_cursor(
+            reposts, lambda repost: [repost.created_at, repost.repost_item_id, repost.repost_type]
+        )
 
         # get track reposts from above
         track_reposts = [r for r in reposts if r.repost_type == RepostType.track]
@@ -536,63 +622,30 @@ def get_repost_feed_for_user(user_id):
         track_repost_dict = {repost["repost_item_id"] : repost for repost in track_reposts}
         playlist_repost_dict = {repost["repost_item_id"] : repost for repost in playlist_reposts}
 
-        # query tracks for repost_track_ids
-        track_query = (
-            session.query(Track)
-            .filter(
-                Track.is_current == True,
-                Track.is_unlisted == False,
-                Track.track_id.in_(repost_track_ids)
-            )
-            .order_by(desc(Track.created_at))
+        # hydrate tracks for repost_track_ids, in repost order
+        # repost_track_ids is already a single page, offset / cursor only apply to the reposts query
+        tracks = hydrate_entities(
+            session, Track, Track.track_id, repost_track_ids,
+            Track.is_current == True,
+            Track.is_unlisted == False
         )
-        tracks = paginate_query(track_query).all()
-        tracks = helpers.query_result_to_list(tracks)
 
         # get track ids
         track_ids = [track["track_id"] for track in tracks]
 
-        # query playlists for repost_playlist_ids
-        playlist_query = (
-            session.query(Playlist)
-            .filter(
-                Playlist.is_current == True,
-                Playlist.is_private == False,
-                Playlist.playlist_id.in_(repost_playlist_ids)
-            )
-            .order_by(desc(Playlist.created_at))
+        # hydrate playlists for repost_playlist_ids, in repost order
+        playlists = hydrate_entities(
+            session, Playlist, Playlist.playlist_id, repost_playlist_ids,
+            Playlist.is_current == True,
+            Playlist.is_private == False
         )
-        playlists = paginate_query(playlist_query).all()
-        playlists = helpers.query_result_to_list(playlists)
 
         # get playlist ids
         playlist_ids = [playlist["playlist_id"] for playlist in playlists]
 
-        # get repost counts by track and playlist IDs
-        repost_counts = get_repost_counts(session, False, True, track_ids + playlist_ids, None)
-        track_repost_counts = {
-            repost_item_id: repost_count
-            for (repost_item_id, repost_count, repost_type) in repost_counts
-            if repost_type == RepostType.track
-        }
-        playlist_repost_counts = {
-            repost_item_id: repost_count
-            for (repost_item_id, repost_count, repost_type) in repost_counts
-            if repost_type in (RepostType.playlist, RepostType.album)
-        }
-
-        # get save counts for tracks and playlists
-        save_counts = get_save_counts(session, False, True, track_ids + playlist_ids, None)
-        track_save_counts = {
-            save_item_id: save_count
-            for (save_item_id, save_count, save_type) in save_counts
-            if save_type == SaveType.track
-        }
-        playlist_save_counts = {
-            save_item_id: save_count
-            for (save_item_id, save_count, save_type) in save_counts
-            if save_type in (SaveType.playlist, SaveType.album)
-        }
+        # get repost and save counts for tracks and playlists from the aggregate tables
+        (track_repost_counts, track_save_counts) = get_track_aggregate_counts(session, track_ids)
+        (playlist_repost_counts, playlist_save_counts) = get_playlist_aggregate_counts(session, playlist_ids)
 
         current_user_id = get_current_user_id(required=False)
         requested_user_is_current_user = False
@@ -657,20 +710,11 @@ def get_repost_feed_for_user(user_id):
             }
 
             # query current user's followees
-            followee_user_ids = (
-                session.query(Follow.followee_user_id)
-                .filter(
-                    Follow.follower_user_id == current_user_id,
-                    Follow.is_current == True,
-                    Follow.is_delete == False
-                )
-                .all()
-            )
-            followee_user_ids = [f[0] for f in followee_user_ids]
+            followee_user_ids = get_followee_user_ids(session, current_user_id)
 
             # query all followees' reposts
             followee_repost_query = (
-                session.query(Repost)
+                session.query(*entity_columns(Repost))
                 .filter(
                     Repost.is_current == True,
                     Repost.is_delete == False,
@@ -729,7 +773,7 @@ def get_repost_feed_for_user(user_id):
         feed_results = sorted(
             unsorted_feed, key=lambda entry: entry[response_name_constants.activity_timestamp], reverse=True)
 
-    return api_helpers.success_response(feed_results)
+    return api_helpers.success_response(feed_results, next_cursor=next_cursor)
 
 
 # intersection of user1's followers and user2's followees
@@ -741,7 +785,7 @@ def get_follow_intersection_users(followee_user_id, follower_user_id):
     db = get_db()
     with db.scoped_session() as session:
         query = (
-            session.query(User)
+            session.query(*entity_columns(User))
             .filter(
                 User.is_current == True,
                 User.user_id.in_(
@@ -798,7 +842,7 @@ def get_track_repost_intersection_users(repost_track_id, follower_user_id):
             return api_helpers.error_response('Resource not found for provided track id', 404)
 
         query = (
-            session.query(User)
+            session.query(*entity_columns(User))
             .filter(
                 User.is_current == True,
                 User.user_id.in_(
@@ -844,7 +888,7 @@ def get_playlist_repost_intersection_users(repost_playlist_id, follower_user_id)
             return api_helpers.error_response('Resource not found for provided playlist id', 404)
 
         query = (
-            session.query(User)
+            session.query(*entity_columns(User))
             .filter(
                 User.is_current == True,
                 User.user_id.in_(
@@ -878,57 +922,35 @@ def get_followers_for_user(followee_user_id):
     users = []
     db = get_db()
     with db.scoped_session() as session:
-        # correlated subquery sqlalchemy code:
-        # https://groups.google.com/forum/#!topic/sqlalchemy/WLIy8jxD7qg
-        inner_follow = aliased(Follow)
-        outer_follow = aliased(Follow)
-
-        # subquery to get a user's follower count
-        inner_select = (
-            session.query(
-                func.count(inner_follow.followee_user_id)
-            )
-            .filter(
-                inner_follow.is_current == True,
-                inner_follow.is_delete == False,
-                inner_follow.followee_user_id == outer_follow.follower_user_id
-            )
-            .correlate(outer_follow)
-        )
-
         # get all users that follow input user, sorted by their follower count desc
-        outer_select = (
+        # follower counts are maintained by the indexer in user_aggregates
+        follower_count = func.coalesce(UserAggregates.follower_count, 0)
+        follower_query = (
             session.query(
-                outer_follow.follower_user_id,
-                inner_select.as_scalar().label(response_name_constants.follower_count)
+                Follow.follower_user_id,
+                follower_count.label(response_name_constants.follower_count)
             )
+            .outerjoin(UserAggregates, UserAggregates.user_id == Follow.follower_user_id)
             .filter(
-                outer_follow.followee_user_id == followee_user_id,
-                outer_follow.is_current == True,
-                outer_follow.is_delete == False
-            )
-            .group_by(outer_follow.follower_user_id)
-            .order_by(
-                desc(response_name_constants.follower_count),
-                # secondary sort to guarantee determinism as explained here:
-                # https://stackoverflow.com/questions/13580826/postgresql-repeating-rows-from-limit-offset
-                asc(outer_follow.follower_user_id)
+                Follow.followee_user_id == followee_user_id,
+                Follow.is_current == True,
+                Follow.is_delete == False
             )
         )
-        follower_user_ids_by_follower_count = paginate_query(outer_select).all()
+        # secondary sort to guarantee determinism as explained here:
+        # https://stackoverflow.com/questions/13580826/postgresql-repeating-rows-from-limit-offset
+        follower_sort_columns = [(follower_count, True), (Follow.follower_user_id, False)]
+        follower_user_ids_by_follower_count = \
+            paginate_query_with_cursor(follower_query, follower_sort_columns).all()
+        next_cursor = get_next_cursor(
+            follower_user_ids_by_follower_count,
+            lambda row: [row[1], row[0]]
+        )
 
-        user_ids = [user_id for (user_id, follower_count) in follower_user_ids_by_follower_count]
+        user_ids = [user_id for (user_id, _) in follower_user_ids_by_follower_count]
 
-        # get all users for above user_ids
-        users = (
-            session.query(User)
-            .filter(
-                User.is_current == True,
-                User.user_id.in_(user_ids)
-            )
-            .all()
-        )
-        users = helpers.query_result_to_list(users)
+        # get all users for above user_ids, in user_ids order
+        users = hydrate_entities(session, User, User.user_id, user_ids, User.is_current == True)
 
         current_user_id = get_current_user_id(required=False)
 
@@ -941,7 +963,7 @@ def get_followers_for_user(followee_user_id):
             key=lambda user: (user[response_name_constants.follower_count], (user['user_id'])*(-1)),
             reverse=True
         )
-    return api_helpers.success_response(users)
+    return api_helpers.success_response(users, next_cursor=next_cursor)
 
 
 # Get paginated users that are followed by provided follower_user_id, sorted by their follower count descending.
@@ -986,16 +1008,8 @@ def get_followees_for_user(follower_user_id):
 
         user_ids = [user_id for (user_id, follower_count) in followee_user_ids_by_follower_count]
 
-        # get all users for above user_ids
-        users = (
-            session.query(User)
-            .filter(
-                User.is_current == True,
-                User.user_id.in_(user_ids)
-            )
-            .all()
-        )
-        users = helpers.query_result_to_list(users)
+        # get all users for above user_ids, in user_ids order
+        users = hydrate_entities(session, User, User.user_id, user_ids, User.is_current == True)
 
         current_user_id = get_current_user_id(required=False)
 
@@ -1287,7 +1301,7 @@ def get_saves(save_type):
     db = get_db()
     with db.scoped_session() as session:
         query = (
-            session.query(Save)
+            session.query(*entity_columns(Save))
             .filter(
                 Save.user_id == current_user_id,
                 Save.is_current == True,
@@ -1323,6 +1337,8 @@ def get_saves(save_type):
                 )
             )
 
-        query_results = paginate_query(query).all()
+        save_sort_columns = [(Save.created_at, True), (Save.save_item_id, True)]
+        query_results = paginate_query_with_cursor(query, save_sort_columns).all()
+        next_cursor = get_next_cursor(query_results, lambda save: [save.created_at, save.save_item_id])
         save_results = helpers.query_result_to_list(query_results)
-    return api_helpers.success_response(save_results)
+    return api_helpers.success_response(save_results, next_cursor=next_cursor)
@@ -1,19 +1,27 @@
 import logging # pylint: disable=C0302
 import json
-import requests
-from sqlalchemy import func, desc
-from urllib.parse import urljoin
+import base64
+from datetime import datetime
+import sqlalchemy
+from sqlalchemy import func, desc, asc, and_, or_, tuple_, literal
+import redis
 
-from flask import request
+from flask import request, g, has_request_context
 
 from src import exceptions
 from src.queries import response_name_constants
-from src.models import Track, Repost, RepostType, Follow, Playlist, Save, SaveType
+from src.models import Track, Repost, RepostType, Follow, Playlist, Save, SaveType, \
+    UserAggregates, TrackAggregates, PlaylistAggregates
 from src.utils import helpers
 from src.utils.config import shared_config
+from src.utils.followee_cache import get_followee_ids
+from src.utils.play_count_cache import get_play_counts
 
 logger = logging.getLogger(__name__)
 
+REDIS_URL = shared_config["redis"]["url"]
+REDIS = redis.Redis.from_url(url=REDIS_URL)
+
 
 ######## VARS ########
 
@@ -64,206 +72,110 @@ def get_current_user_id(required=True):
     return uid
 
 
+def get_followee_user_ids(session, user_id):
+    # returns the list of user ids followed by user_id
+    # memoized in flask g for the rest of the request, backed by a short-TTL Redis cache
+    # the indexer evicts when user_id's follows change, see src/utils/followee_cache.py
+    if not has_request_context():
+        return get_followee_ids(session, REDIS, user_id)
+    if "followee_user_ids" not in g:
+        g.followee_user_ids = {}
+    if user_id not in g.followee_user_ids:
+        g.followee_user_ids[user_id] = get_followee_ids(session, REDIS, user_id)
+    return g.followee_user_ids[user_id]
+
+
 def parse_sort_param(base_query, model, whitelist_sort_params):
+    sort_columns = parse_sort_columns(model, whitelist_sort_params)
+    if not sort_columns:
+        return base_query
+    return base_query.order_by(
+        *[column.desc() if descending else column.asc() for (column, descending) in sort_columns]
+    )
+
+
+def parse_sort_columns(model, whitelist_sort_params):
+    # returns the sort request arg as a list of (model column, descending) pairs
     sort = request.args.get("sort")
     if not sort:
-        return base_query
+        return []
 
     params = sort.split(',')
     try:
         params = {param[0]: param[1] for param in [p.split(':') for p in params]}
     except IndexError:
         raise exceptions.ArgumentError("Need to specify :asc or :desc on all parameters")
-    order_bys = []
+    sort_columns = []
     for field in params.keys():
         if field not in whitelist_sort_params:
             raise exceptions.ArgumentError('Parameter %s is invalid in sort' % field)
-        attr = getattr(model, field)
-        if params[field] == 'desc':
-            attr = attr.desc()
-        else:
-            attr = attr.asc()
-        order_bys.append(attr)
-
-    return base_query.order_by(*order_bys)
+        sort_columns.append((getattr(model, field), params[field] == 'desc'))
+
+    return sort_columns
+
+
+# Returns every populate_user_metadata field for the requested user ids in one round trip.
+# Counts come from user_aggregates (maintained by the indexer), current user fields from follows.
+# :current_user_followee_ids is empty when there is no current user.
+populate_user_metadata_query = """
+    WITH requested_users AS (
+      SELECT DISTINCT unnest(CAST(:user_ids AS integer[])) AS user_id
+    ),
+    current_user_followees AS (
+      SELECT unnest(CAST(:current_user_followee_ids AS integer[])) AS user_id
+    ),
+    followee_follow_counts AS (
+      SELECT f.followee_user_id AS user_id, count(*) AS followee_follow_count
+      FROM follows f
+      JOIN current_user_followees cuf ON cuf.user_id = f.follower_user_id
+      WHERE f.followee_user_id IN (SELECT user_id FROM requested_users)
+        and f.is_current = true and f.is_delete = false
+      GROUP BY f.followee_user_id
+    )
+    SELECT
+      ru.user_id,
+      coalesce(ua.track_count, 0) AS track_count,
+      coalesce(ua.playlist_count, 0) AS playlist_count,
+      coalesce(ua.album_count, 0) AS album_count,
+      coalesce(ua.follower_count, 0) AS follower_count,
+      coalesce(ua.following_count, 0) AS followee_count,
+      coalesce(ua.repost_count, 0) AS repost_count,
+      coalesce(ua.track_blocknumber, -1) AS track_blocknumber,
+      (cuf.user_id IS NOT NULL) AS does_current_user_follow,
+      coalesce(ffc.followee_follow_count, 0) AS current_user_followee_follow_count
+    FROM requested_users ru
+    LEFT JOIN user_aggregates ua ON ua.user_id = ru.user_id
+    LEFT JOIN current_user_followees cuf ON cuf.user_id = ru.user_id
+    LEFT JOIN followee_follow_counts ffc ON ffc.user_id = ru.user_id
+"""
 
 
 # given list of user ids and corresponding users, populates each user object with:
 #   track_count, playlist_count, album_count, follower_count, followee_count, repost_count
 #   if current_user_id available, populates does_current_user_follow, followee_follows
 def populate_user_metadata(session, user_ids, users, current_user_id):
-    # build dict of user id --> track count
-    track_counts = (
-        session.query(
-            Track.owner_id,
-            func.count(Track.owner_id)
-        )
-        .filter(
-            Track.is_current == True,
-            Track.is_delete == False,
-            Track.is_unlisted == False,
-            Track.owner_id.in_(user_ids)
-        )
-        .group_by(Track.owner_id)
-        .all()
-    )
-    track_count_dict = {user_id: track_count for (user_id, track_count) in track_counts}
-
-    # build dict of user id --> playlist count
-    playlist_counts = (
-        session.query(
-            Playlist.playlist_owner_id,
-            func.count(Playlist.playlist_owner_id)
-        )
-        .filter(
-            Playlist.is_current == True,
-            Playlist.is_album == False,
-            Playlist.is_private == False,
-            Playlist.is_delete == False,
-            Playlist.playlist_owner_id.in_(user_ids)
-        )
-        .group_by(Playlist.playlist_owner_id)
-        .all()
-    )
-    playlist_count_dict = {user_id: playlist_count for (user_id, playlist_count) in playlist_counts}
-
-    # build dict of user id --> album count
-    album_counts = (
-        session.query(
-            Playlist.playlist_owner_id,
-            func.count(Playlist.playlist_owner_id)
-        )
-        .filter(
-            Playlist.is_current == True,
-            Playlist.is_album == True,
-            Playlist.is_private == False,
-            Playlist.is_delete == False,
-            Playlist.playlist_owner_id.in_(user_ids)
-        )
-        .group_by(Playlist.playlist_owner_id)
-        .all()
-    )
-    album_count_dict = {user_id: album_count for (user_id, album_count) in album_counts}
-
-    # build dict of user id --> follower count
-    follower_counts = (
-        session.query(
-            Follow.followee_user_id,
-            func.count(Follow.followee_user_id)
-        )
-        .filter(
-            Follow.is_current == True,
-            Follow.is_delete == False,
-            Follow.followee_user_id.in_(user_ids)
-        )
-        .group_by(Follow.followee_user_id)
-        .all()
-    )
-    follower_count_dict = {user_id: follower_count for (user_id, follower_count) in follower_counts}
-
-    # build dict of user id --> followee count
-    followee_counts = (
-        session.query(
-            Follow.follower_user_id,
-            func.count(Follow.follower_user_id)
-        )
-        .filter(
-            Follow.is_current == True,
-            Follow.is_delete == False,
-            Follow.follower_user_id.in_(user_ids)
-        )
-        .group_by(Follow.follower_user_id)
-        .all()
-    )
-    followee_count_dict = {user_id: followee_count for (user_id, followee_count) in followee_counts}
-
-    # build dict of user id --> repost count
-    repost_counts = (
-        session.query(
-            Repost.user_id,
-            func.count(Repost.user_id)
-        )
-        .filter(
-            Repost.is_current == True,
-            Repost.is_delete == False,
-            Repost.user_id.in_(user_ids)
-        )
-        .group_by(Repost.user_id)
-        .all()
-    )
-    repost_count_dict = {user_id: repost_count for (user_id, repost_count) in repost_counts}
-
-    # build dict of user id --> track blocknumber
-    track_blocknumbers = (
-        session.query(
-            Track.owner_id,
-            func.max(Track.blocknumber)
-        )
-        .filter(
-            Track.is_current == True,
-            Track.is_delete == False,
-            Track.owner_id.in_(user_ids)
-        )
-        .group_by(Track.owner_id)
-        .all()
-    )
-    track_blocknumber_dict = {user_id: track_blocknumber for (user_id, track_blocknumber) in track_blocknumbers}
-
-    current_user_followed_user_ids = {}
-    current_user_followee_follow_count_dict = {}
-    if current_user_id:
-        # does current user follow any of requested user ids
-        current_user_followed_user_ids = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.followee_user_id.in_(user_ids),
-                Follow.follower_user_id == current_user_id
-            )
-            .all()
-        )
-        current_user_followed_user_ids = {r[0]: True for r in current_user_followed_user_ids}
-
-        # build dict of user id --> followee follow count
-        current_user_followees = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.follower_user_id == current_user_id
-            )
-        )
-        current_user_followees = {r[0]: True for r in current_user_followees}
-
-        current_user_followee_follow_counts = (
-            session.query(
-                Follow.followee_user_id,
-                func.count(Follow.followee_user_id)
-            )
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.follower_user_id.in_(current_user_followees),
-                Follow.followee_user_id.in_(user_ids)
-            )
-            .group_by(Follow.followee_user_id)
-            .all()
-        )
-        current_user_followee_follow_count_dict = {user_id: followee_follow_count for (user_id, followee_follow_count) in current_user_followee_follow_counts}
+    current_user_followee_ids = get_followee_user_ids(session, current_user_id) if current_user_id else []
+    user_metadata = session.execute(
+        sqlalchemy.text(populate_user_metadata_query),
+        {"user_ids": list(user_ids), "current_user_followee_ids": current_user_followee_ids}
+    ).fetchall()
+    user_metadata_dict = {row["user_id"]: row for row in user_metadata}
 
     for user in users:
         user_id = user["user_id"]
-        user[response_name_constants.track_count] = track_count_dict.get(user_id, 0)
-        user[response_name_constants.playlist_count] = playlist_count_dict.get(user_id, 0)
-        user[response_name_constants.album_count] = album_count_dict.get(user_id, 0)
-        user[response_name_constants.follower_count] = follower_count_dict.get(user_id, 0)
-        user[response_name_constants.followee_count] = followee_count_dict.get(user_id, 0)
-        user[response_name_constants.repost_count] = repost_count_dict.get(user_id, 0)
-        user[response_name_constants.track_blocknumber] = track_blocknumber_dict.get(user_id, -1)
+        metadata = user_metadata_dict.get(user_id)
+        user[response_name_constants.track_count] = metadata["track_count"] if metadata else 0
+        user[response_name_constants.playlist_count] = metadata["playlist_count"] if metadata else 0
+        user[response_name_constants.album_count] = metadata["album_count"] if metadata else 0
+        user[response_name_constants.follower_count] = metadata["follower_count"] if metadata else 0
+        user[response_name_constants.followee_count] = metadata["followee_count"] if metadata else 0
+        user[response_name_constants.repost_count] = metadata["repost_count"] if metadata else 0
+        user[response_name_constants.track_blocknumber] = metadata["track_blocknumber"] if metadata else -1
         # current user specific
-        user[response_name_constants.does_current_user_follow] = current_user_followed_user_ids.get(user_id, False)
-        user[response_name_constants.current_user_followee_follow_count] = current_user_followee_follow_count_dict.get(user_id, 0)
+        user[response_name_constants.does_current_user_follow] = \
+            metadata["does_current_user_follow"] if metadata else False
+        user[response_name_constants.current_user_followee_follow_count] = \
+            metadata["current_user_followee_follow_count"] if metadata else 0
 
     return users
 
@@ -272,39 +184,8 @@ def populate_user_metadata(session, user_ids, users, current_user_id):
 #   repost_count, save_count
 #   if current_user_id available, populates followee_reposts, has_current_user_reposted, has_current_user_saved
 def populate_track_metadata(session, track_ids, tracks, current_user_id):
-    # build dict of track id --> repost count
-    repost_counts = (
-        session.query(
-            Repost.repost_item_id,
-            func.count(Repost.repost_item_id)
-        )
-        .filter(
-            Repost.is_current == True,
-            Repost.is_delete == False,
-            Repost.repost_item_id.in_(track_ids),
-            Repost.repost_type == RepostType.track
-        )
-        .group_by(Repost.repost_item_id)
-        .all()
-    )
-    repost_count_dict = {track_id: repost_count for (track_id, repost_count) in repost_counts}
-
-    # build dict of track id --> save count
-    save_counts = (
-        session.query(
-            Save.save_item_id,
-            func.count(Save.save_item_id)
-        )
-        .filter(
-            Save.is_current == True,
-            Save.is_delete == False,
-            Save.save_type == SaveType.track,
-            Save.save_item_id.in_(track_ids)
-        )
-        .group_by(Save.save_item_id)
-        .all()
-    )
-    save_count_dict = {track_id: save_count for (track_id, save_count) in save_counts}
+    # build dicts of track id --> repost count / save count from track_aggregates
+    (repost_count_dict, save_count_dict) = get_track_aggregate_counts(session, track_ids)
 
     user_reposted_track_dict = {}
     user_saved_track_dict = {}
@@ -342,14 +223,7 @@ def populate_track_metadata(session, track_ids, tracks, current_user_id):
         user_saved_track_dict = {save[0]: True for save in user_saved_tracks_query}
 
         # Get current user's followees.
-        followees = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.follower_user_id == current_user_id,
-                Follow.is_current == True,
-                Follow.is_delete == False
-            )
-        )
+        followees = get_followee_user_ids(session, current_user_id)
 
         # build dict of track id --> followee reposts
         followee_track_reposts = (
@@ -402,11 +276,9 @@ def populate_track_metadata(session, track_ids, tracks, current_user_id):
 #   repost_count, save_count
 #   if current_user_id available, populates followee_reposts, has_current_user_reposted, has_current_user_saved
 def populate_playlist_metadata(session, playlist_ids, playlists, repost_types, save_types, current_user_id):
-    # build dict of playlist id --> repost count
-    playlist_repost_counts = dict(get_repost_counts(session, False, False, playlist_ids, repost_types))
-
-    # build dict of playlist id --> save count
-    playlist_save_counts = dict(get_save_counts(session, False, False, playlist_ids, save_types))
+    # build dicts of playlist id --> repost count / save count from playlist_aggregates
+    # playlist_aggregates counts both playlist and album reposts / saves of each playlist id
+    (playlist_repost_counts, playlist_save_counts) = get_playlist_aggregate_counts(session, playlist_ids)
 
     user_reposted_playlist_dict = {}
     user_saved_playlist_dict = {}
@@ -442,15 +314,7 @@ def populate_playlist_metadata(session, playlist_ids, playlists, repost_types, s
         user_saved_playlist_dict = {save[0]: True for save in user_saved_playlists_query}
 
         # Get current user's followees.
-        followee_user_ids = (
-            session.query(Follow.followee_user_id)
-            .filter(
-                Follow.follower_user_id == current_user_id,
-                Follow.is_current == True,
-                Follow.is_delete == False
-            )
-            .all()
-        )
+        followee_user_ids = get_followee_user_ids(session, current_user_id)
         
         # Build dict of playlist id --> followee reposts.
         followee_playlist_reposts = (
@@ -502,6 +366,34 @@ def populate_playlist_metadata(session, playlist_ids, playlists, repost_types, s
     return playlists
 
 
+def get_track_aggregate_counts(session, track_ids):
+    # returns (dict of track id --> repost count, dict of track id --> save count)
+    if not track_ids:
+        return ({}, {})
+    track_aggregates = (
+        session.query(TrackAggregates.track_id, TrackAggregates.repost_count, TrackAggregates.save_count)
+        .filter(TrackAggregates.track_id.in_(track_ids))
+        .all()
+    )
+    repost_count_dict = {track_id: repost_count for (track_id, repost_count, _) in track_aggregates}
+    save_count_dict = {track_id: save_count for (track_id, _, save_count) in track_aggregates}
+    return (repost_count_dict, save_count_dict)
+
+
+def get_playlist_aggregate_counts(session, playlist_ids):
+    # returns (dict of playlist id --> repost count, dict of playlist id --> save count)
+    if not playlist_ids:
+        return ({}, {})
+    playlist_aggregates = (
+        session.query(PlaylistAggregates.playlist_id, PlaylistAggregates.repost_count, PlaylistAggregates.save_count)
+        .filter(PlaylistAggregates.playlist_id.in_(playlist_ids))
+        .all()
+    )
+    repost_count_dict = {playlist_id: repost_count for (playlist_id, repost_count, _) in playlist_aggregates}
+    save_count_dict = {playlist_id: save_count for (playlist_id, _, save_count) in playlist_aggregates}
+    return (repost_count_dict, save_count_dict)
+
+
 def get_repost_counts(session, query_by_user_flag, query_repost_type_flag, filter_ids, repost_types, max_block_number=None):
     query_col = Repost.user_id if query_by_user_flag else Repost.repost_item_id
 
@@ -600,16 +492,8 @@ def get_save_counts(session, query_by_user_flag, query_save_type_flag, filter_id
 def get_followee_count_dict(session, user_ids):
     # build dict of user id --> followee count
     followee_counts = (
-        session.query(
-            Follow.follower_user_id,
-            func.count(Follow.follower_user_id)
-        )
-        .filter(
-            Follow.is_current == True,
-            Follow.is_delete == False,
-            Follow.follower_user_id.in_(user_ids)
-        )
-        .group_by(Follow.follower_user_id)
+        session.query(UserAggregates.user_id, UserAggregates.following_count)
+        .filter(UserAggregates.user_id.in_(user_ids))
         .all()
     )
     followee_count_dict = {user_id: followee_count for (user_id, followee_count) in followee_counts}
@@ -641,42 +525,46 @@ def get_follower_count_dict(session, user_ids, max_block_number=None):
 
 
 def get_track_play_counts(track_ids):
-    track_listen_counts = {}
+    """Return a dict of track id --> play count, tracks without plays may be left out"""
+    return get_play_counts(REDIS, track_ids)
+
+
+######## HYDRATION ########
+# Entities are loaded as plain column rows rather than ORM instances, skipping the identity
+# map and instance state bookkeeping of the session, and are looked up by id through a dict
+# so callers re-impose their own ordering in linear time.
+#
+# columns is the list of model columns the caller reads, every column of the table by default.
+# Endpoints serialize entities whole, callers that only read some fields pass just those.
+
+def entity_columns(model):
+    # the columns of model's table, for session.query(*entity_columns(model))
+    return [getattr(model, column_name) for column_name in model.__table__.columns.keys()]
+
+
+def get_entities_by_id(session, model, id_column, ids, *filters, columns=None):
+    """Return a dict of id --> row dict of the model rows with id_column in ids matching filters,
+    with the given columns (which must include id_column) or all of them"""
+    if not ids:
+        return {}
+    rows = (
+        session.query(*(columns or entity_columns(model)))
+        .filter(id_column.in_(list(ids)), *filters)
+        .all()
+    )
+    return {row[id_column.key]: row for row in helpers.query_result_to_list(rows)}
 
-    if not track_ids:
-        return track_listen_counts
 
-    identity_url = shared_config['discprov']['identity_service_url']
-    # Create and query identity service endpoint
-    identity_tracks_endpoint = urljoin(identity_url, 'tracks/listens')
+def order_by_ids(entities_by_id, ids):
+    # the entities of ids in ids order, ids without an entity are skipped
+    return [entities_by_id[entity_id] for entity_id in ids if entity_id in entities_by_id]
+
+
+def hydrate_entities(session, model, id_column, ids, *filters, columns=None):
+    """Return the row dicts of the model rows with id_column in ids matching filters, in ids order,
+    with the given columns (which must include id_column) or all of them"""
+    return order_by_ids(get_entities_by_id(session, model, id_column, ids, *filters, columns=columns), ids)
 
-    post_body = {}
-    post_body['track_ids'] = track_ids
-    try:
-        resp = requests.post(identity_tracks_endpoint, json=post_body)
-    except Exception as e:
-        logger.error(
-            f'Error retrieving play count - {identity_tracks_endpoint}, {e}'
-        )
-        return track_listen_counts
-
-    json_resp = resp.json()
-    keys = list(resp.json().keys())
-    if not keys:
-        return track_listen_counts
-
-    # Scenario should never arise, since we don't impose date parameter on initial query
-    if len(keys) != 1:
-        raise Exception('Invalid number of keys')
-
-    # Parse listen query results into track listen count dictionary
-    date_key = keys[0]
-    listen_count_json = json_resp[date_key]
-    if 'listenCounts' in listen_count_json:
-        for listen_info in listen_count_json['listenCounts']:
-            current_id = listen_info['trackId']
-            track_listen_counts[current_id] = listen_info['listens']
-    return track_listen_counts
 
 def get_pagination_vars():
     limit = min(
@@ -692,6 +580,72 @@ def paginate_query(query_obj, apply_offset=True):
     query_obj = query_obj.limit(limit)
     return query_obj.offset(offset) if apply_offset else query_obj
 
+
+# Keyset pagination
+# sort_columns is a list of (column, descending) pairs, the last of which must be unique
+# within the query results so every row has a distinct position.
+# A cursor is the opaque encoding of the sort column values of the last row of a page,
+# the next page is fetched with a WHERE on those values instead of an OFFSET so it can
+# start from an index range scan, page N costs the same as page 1.
+
+def paginate_query_with_cursor(query_obj, sort_columns):
+    # orders query_obj by sort_columns and applies limit and the `cursor` request arg
+    # from a previous page's next_cursor, or `offset` if no cursor is given
+    (limit, offset) = get_pagination_vars()
+    cursor = request.args.get("cursor")
+    if cursor:
+        query_obj = query_obj.filter(get_keyset_filter(sort_columns, decode_cursor(cursor, sort_columns)))
+    query_obj = query_obj.order_by(
+        *[desc(column) if descending else asc(column) for (column, descending) in sort_columns]
+    ).limit(limit)
+    return query_obj if cursor else query_obj.offset(offset)
+
+
+def get_keyset_filter(sort_columns, values):
+    # rows strictly after values in sort_columns order
+    directions = set(descending for (_, descending) in sort_columns)
+    if len(directions) == 1:
+        # single direction, compare as a row value so postgres can use a composite index
+        columns = tuple_(*[column for (column, _) in sort_columns])
+        values = tuple_(*[literal(value, column.type) for ((column, _), value) in zip(sort_columns, values)])
+        return columns < values if directions.pop() else columns > values
+
+    # mixed directions: (c1 after v1) or (c1 = v1 and c2 after v2) or ...
+    clauses = []
+    for i, (column, descending) in enumerate(sort_columns):
+        equal_prefix = [sort_columns[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column < values[i] if descending else column > values[i]))
+    return or_(*clauses)
+
+
+def get_next_cursor(results, sort_values):
+    # returns the cursor for the page after results, or None if results is the last page
+    # sort_values(row) returns the sort column values of a row of results
+    (limit, _) = get_pagination_vars()
+    if len(results) < limit:
+        return None
+    return encode_cursor(sort_values(results[-1]))
+
+
+def encode_cursor(values):
+    # opaque cursor for the sort column values of a row, as read by decode_cursor
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("utf-8")
+
+
+def decode_cursor(cursor, sort_columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")).decode("utf-8"))
+        if not isinstance(values, list) or len(values) != len(sort_columns):
+            raise ValueError("cursor does not match sort")
+        return [
+            datetime.fromisoformat(value) if isinstance(column.type, sqlalchemy.DateTime) else value
+            for ((column, _), value) in zip(sort_columns, values)
+        ]
+    except (ValueError, TypeError) as e:
+        raise exceptions.ArgumentError(f"Invalid cursor: {e}")
+
+
 def get_genre_list(genre):
     genre_list = []
     genre_list.append(genre)
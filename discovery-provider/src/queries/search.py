@@ -1,23 +1,35 @@
 import logging # pylint: disable=C0302
+import os
+import time
+import threading
+import concurrent.futures
+import redis
 import sqlalchemy
 
 from flask import Blueprint, request
 from enum import Enum
 
 from src import api_helpers, exceptions
-from src.models import User, Track, RepostType, Playlist, Save, SaveType, Follow
-from src.utils import helpers
+from src.models import User, Track, RepostType, Playlist, Save, SaveType
 from src.utils.config import shared_config
 from src.utils.db_session import get_db
+from src.utils.search_index import get_search_index, load_lexemes
+from src.utils.autocomplete_cache import autocomplete_cache_enabled, autocomplete_prefix_hits_enabled, \
+    autocomplete_result_kinds, get_autocomplete_cache_generations, get_autocomplete_ids, \
+    set_autocomplete_results, is_exhaustive
 from src.queries import response_name_constants
 
 from src.queries.query_helpers import get_current_user_id, populate_user_metadata, \
     populate_track_metadata, populate_playlist_metadata, get_pagination_vars, \
-    get_followee_count_dict, get_track_play_counts
+    get_followee_count_dict, get_followee_user_ids, get_track_play_counts, get_entities_by_id, \
+    hydrate_entities
 
 logger = logging.getLogger(__name__)
 bp = Blueprint("search_queries", __name__)
 
+REDIS_URL = shared_config["redis"]["url"]
+REDIS = redis.Redis.from_url(url=REDIS_URL)
+
 
 ######## VARS ########
 
@@ -26,6 +38,13 @@ trackTitleWeight = 0.7
 userNameWeight = 0.7
 playlistNameWeight = 0.7
 minSearchSimilarity = 0.1
+# result key --> (in-process search index kind, name weight)
+search_index_kinds = {
+    "tracks": ("track", trackTitleWeight),
+    "users": ("user", userNameWeight),
+    "playlists": ("playlist", playlistNameWeight),
+    "albums": ("album", playlistNameWeight),
+}
 class SearchKind(Enum):
     all = 1
     tracks = 2
@@ -33,6 +52,12 @@ class SearchKind(Enum):
     playlists = 4
     albums = 5
 
+# Process-wide thread pool running the sub-queries of /search/full and /search/autocomplete,
+# keyed by pid so worker threads are never shared across a fork. Each sub-query checks out
+# its own pooled db connection, so the pool size bounds the connections search holds at once.
+_search_executors = {}
+_search_executors_lock = threading.Lock()
+
 
 ######## ROUTES ########
 
@@ -112,18 +137,12 @@ def search_tags():
             # track_ids is list of tuples - simplify to 1-D list
             track_ids = [i[0] for i in track_ids]
 
-            tracks = (
-                session.query(Track)
-                .filter(
-                    Track.is_current == True,
-                    Track.is_delete == False,
-                    Track.is_unlisted == False,
-                    Track.track_id.in_(track_ids),
-                )
-                .all()
+            tracks = hydrate_entities(
+                session, Track, Track.track_id, track_ids,
+                Track.is_current == True,
+                Track.is_delete == False,
+                Track.is_unlisted == False
             )
-
-            tracks = helpers.query_result_to_list(tracks)
             track_play_counts = get_track_play_counts(track_ids)
 
             tracks = populate_track_metadata(session, track_ids, tracks, current_user_id)
@@ -188,15 +207,7 @@ def search_tags():
             # user_ids is list of tuples - simplify to 1-D list
             user_ids = [i[1] for i in user_ids]
 
-            users = (
-                session.query(User)
-                .filter(
-                    User.is_current == True,
-                    User.user_id.in_(user_ids)
-                )
-                .all()
-            )
-            users = helpers.query_result_to_list(users)
+            users = hydrate_entities(session, User, User.user_id, user_ids, User.is_current == True)
 
             users = populate_user_metadata(session, user_ids, users, current_user_id)
 
@@ -225,17 +236,12 @@ def search_tags():
                 .all()
             )
             saved_track_ids = [i[0] for i in saves_query]
-            saved_tracks = (
-                session.query(Track)
-                .filter(
-                    Track.is_current == True,
-                    Track.is_delete == False,
-                    Track.is_unlisted == False,
-                    Track.track_id.in_(saved_track_ids),
-                )
-                .all()
+            saved_tracks = hydrate_entities(
+                session, Track, Track.track_id, saved_track_ids,
+                Track.is_current == True,
+                Track.is_delete == False,
+                Track.is_unlisted == False
             )
-            saved_tracks = helpers.query_result_to_list(saved_tracks)
             for saved_track in saved_tracks:
                 saved_track_id = saved_track["track_id"]
                 saved_track[response_name_constants.play_count] = \
@@ -254,26 +260,11 @@ def search_tags():
 
         if (searchKind in [SearchKind.all, SearchKind.users]):
             # Query followed users that have referenced this tag
-            followed_user_query = (
-                session.query(Follow.followee_user_id)
-                .filter(
-                    Follow.is_current == True,
-                    Follow.is_delete == False,
-                    Follow.follower_user_id == current_user_id,
-                    Follow.followee_user_id.in_(user_ids)
-                )
-                .all()
-            )
-            followed_user_ids = [i[0] for i in followed_user_query]
-            followed_users = (
-                session.query(User)
-                .filter(
-                    User.is_current == True,
-                    User.user_id.in_(followed_user_ids)
-                )
-                .all()
+            current_user_followee_ids = set(get_followee_user_ids(session, current_user_id))
+            followed_user_ids = [user_id for user_id in user_ids if user_id in current_user_followee_ids]
+            followed_users = hydrate_entities(
+                session, User, User.user_id, followed_user_ids, User.is_current == True
             )
-            followed_users = helpers.query_result_to_list(followed_users)
             followed_users = \
                     populate_user_metadata(
                         session,
@@ -304,7 +295,8 @@ def search_tags():
 # the full objects and helper methods that the ORM provides. This is done in post-processing
 # after the initial text query executes.
 #
-# search query against custom materialized view created in alembic migration
+# search query against the lexeme dictionary tables kept up to date by the indexer,
+# see src/tasks/lexeme_dicts.py
 # - returns all object ids which have a trigram match with query string
 # - order by descending similarity and paginate
 # - de-duplicates object_ids with multiple hits, returning highest match
@@ -314,6 +306,77 @@ def search_tags():
 #
 # @devnote - track_ids argument should match tracks argument
 
+def get_search_executor():
+    pid = os.getpid()
+    with _search_executors_lock:
+        if pid not in _search_executors:
+            _search_executors.clear()
+            _search_executors[pid] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=int(shared_config["discprov"]["search_query_concurrency"])
+            )
+        return _search_executors[pid]
+
+
+def run_search_query(db, search_query, args):
+    """Run search_query on its own session, returns (results, seconds taken)"""
+    start = time.time()
+    with db.scoped_session() as session:
+        results = search_query(session, *args)
+    return (results, time.time() - start)
+
+
+def get_autocomplete_ranked_ids(db, result_keys, searchStr, limit, offset):
+    """ Return (result key --> ranked ids, cache generations) for the non-personalized
+        autocomplete results ranked from the prefix cache, or the in-process search index.
+        Results missing are ranked by their search query, the generations are None when
+        the cache is disabled.
+    """
+    ranked_ids = {}
+    cache_generations = None
+    if autocomplete_cache_enabled():
+        cache_generations = get_autocomplete_cache_generations(REDIS)
+        for result_key in result_keys:
+            if result_key in autocomplete_result_kinds:
+                name_weight = search_index_kinds[result_key][1]
+                ids = get_autocomplete_ids(
+                    REDIS, cache_generations, result_key, searchStr, limit, offset, name_weight, minSearchSimilarity
+                )
+                if ids is not None:
+                    ranked_ids[result_key] = ids
+
+    search_index = get_search_index(db)
+    if search_index is not None:
+        for result_key in result_keys:
+            if result_key in search_index_kinds and result_key not in ranked_ids:
+                (kind, name_weight) = search_index_kinds[result_key]
+                # answered in process, see src/utils/search_index.py
+                ranked_ids[result_key] = search_index.search(
+                    kind, searchStr, limit, offset, name_weight, minSearchSimilarity
+                )
+    return (ranked_ids, cache_generations)
+
+
+def cache_autocomplete_results(db, cache_generations, results, ranked_ids, searchStr, limit, offset):
+    # cache the results ranked by their search query, with the lexemes prefix hits are ranked from
+    result_keys = [
+        result_key for result_key in autocomplete_result_kinds
+        if result_key in results and result_key not in ranked_ids
+    ]
+    lexemes = {}
+    if autocomplete_prefix_hits_enabled():
+        with db.scoped_session() as session:
+            for result_key in result_keys:
+                if is_exhaustive(results[result_key], limit, offset):
+                    (kind, id_field) = autocomplete_result_kinds[result_key]
+                    ids = [result[id_field] for result in results[result_key]]
+                    lexemes[result_key] = load_lexemes(session, kind, ids)
+    for result_key in result_keys:
+        set_autocomplete_results(
+            REDIS, cache_generations, result_key, searchStr, limit, offset, results[result_key],
+            lexemes.get(result_key)
+        )
+
+
 def search(isAutocomplete):
     searchStr = request.args.get("query", type=str)
     if not searchStr:
@@ -328,127 +391,132 @@ def search(isAutocomplete):
     searchKind = SearchKind[kind]
 
     (limit, offset) = get_pagination_vars()
+    # read from the request here, sub-queries run outside of the request context
+    current_user_id = get_current_user_id(required=False)
 
-    results = {}
-    if searchStr:
-        db = get_db()
-        with db.scoped_session() as session:
-            if (searchKind in [SearchKind.all, SearchKind.tracks]):
-                results['tracks'] = track_search_query(session, searchStr, limit, offset, False, isAutocomplete)
-                results['saved_tracks'] = track_search_query(session, searchStr, limit, offset, True, isAutocomplete)
-            if (searchKind in [SearchKind.all, SearchKind.users]):
-                results['users'] = user_search_query(session, searchStr, limit, offset, False, isAutocomplete)
-                results['followed_users'] = user_search_query(session, searchStr, limit, offset, True, isAutocomplete)
-            if (searchKind in [SearchKind.all, SearchKind.playlists]):
-                results['playlists'] = playlist_search_query(
-                    session,
-                    searchStr,
-                    limit,
-                    offset,
-                    False,
-                    False,
-                    isAutocomplete
-                )
-                results['saved_playlists'] = playlist_search_query(
-                    session,
-                    searchStr,
-                    limit,
-                    offset,
-                    False,
-                    True,
-                    isAutocomplete
-                )
-            if (searchKind in [SearchKind.all, SearchKind.albums]):
-                results['albums'] = playlist_search_query(session, searchStr, limit, offset, True, False, isAutocomplete)
-                results['saved_albums'] = playlist_search_query(
-                    session,
-                    searchStr,
-                    limit,
-                    offset,
-                    True,
-                    True,
-                    isAutocomplete
-                )
+    # result key --> (search query, args, personalized)
+    search_queries = {}
+    if (searchKind in [SearchKind.all, SearchKind.tracks]):
+        search_queries['tracks'] = (track_search_query, [False], False)
+        search_queries['saved_tracks'] = (track_search_query, [True], True)
+    if (searchKind in [SearchKind.all, SearchKind.users]):
+        search_queries['users'] = (user_search_query, [False], False)
+        search_queries['followed_users'] = (user_search_query, [True], True)
+    if (searchKind in [SearchKind.all, SearchKind.playlists]):
+        search_queries['playlists'] = (playlist_search_query, [False, False], False)
+        search_queries['saved_playlists'] = (playlist_search_query, [False, True], True)
+    if (searchKind in [SearchKind.all, SearchKind.albums]):
+        search_queries['albums'] = (playlist_search_query, [True, False], False)
+        search_queries['saved_albums'] = (playlist_search_query, [True, True], True)
 
-    return api_helpers.success_response(results)
+    db = get_db()
+    start = time.time()
+    ranked_ids = {}
+    cache_generations = None
+    if isAutocomplete:
+        (ranked_ids, cache_generations) = get_autocomplete_ranked_ids(
+            db, search_queries.keys(), searchStr, limit, offset
+        )
 
+    # Run the sub-queries concurrently, so latency is that of the slowest rather than the sum
+    executor = get_search_executor()
+    futures = {}
+    results = {}
+    for (result_key, (search_query, query_args, personalized)) in search_queries.items():
+        if personalized and not current_user_id:
+            results[result_key] = []
+            continue
+        args = [searchStr, limit, offset] + query_args + \
+            [isAutocomplete, current_user_id, ranked_ids.get(result_key)]
+        futures[result_key] = executor.submit(run_search_query, db, search_query, args)
+
+    latencies = {}
+    for (result_key, future) in futures.items():
+        (results[result_key], latencies[result_key]) = future.result()
+    latencies['total'] = time.time() - start
+
+    if cache_generations is not None:
+        cache_autocomplete_results(db, cache_generations, results, ranked_ids, searchStr, limit, offset)
+
+    latencies_ms = [f"{result_key}={latency * 1000:.1f}ms" for (result_key, latency) in latencies.items()]
+    logger.info(f"search.py | search | kind={kind} | {', '.join(latencies_ms)}")
+
+    (response, status) = api_helpers.success_response(results)
+    response.headers["Server-Timing"] = ", ".join(
+        f"{result_key};dur={latency * 1000:.1f}" for (result_key, latency) in latencies.items()
+    )
+    return (response, status)
 
-def track_search_query(session, searchStr, limit, offset, personalized, isAutocomplete):
-    current_user_id = get_current_user_id(required=False)
+
+def track_search_query(
+        session, searchStr, limit, offset, personalized, isAutocomplete, current_user_id, ranked_ids=None
+):
     if personalized and not current_user_id:
         return []
 
-    res = sqlalchemy.text(
-        f"""
-        select track_id from (
-            select track_id, (sum(score) + (:title_weight*similarity(title, query))) as total_score from (
-                select
-                    d."track_id" as track_id, d."word" as word, similarity(d."word", :query) as score,
-                    t."title" as title, :query as query
-                from "track_lexeme_dict" d
-                inner join "tracks" t on t."track_id" = d."track_id"
-                {
-                    'inner join "saves" s on s.save_item_id = d.track_id'
-                    if personalized and current_user_id
-                    else ""
-                }
-                where similarity(d."word", :query) >= :min_similarity
-                and t."is_current"=true
-                and t."is_unlisted"=false
-                {
-                    "and s.save_type='track' and s.is_current=true and s.is_delete=false and s.user_id=:current_user_id"
-                    if personalized and current_user_id
-                    else ""
-                }
-                order by d."word" <-> :query
-            ) as results
-            group by track_id, title, query
-        ) as results2
-        order by total_score desc
-        limit :limit
-        offset :offset;
-        """
-    )
-
-    track_ids = session.execute(
-        res,
-        {
-            "query": searchStr,
-            "limit": limit,
-            "offset": offset,
-            "title_weight": trackTitleWeight,
-            "min_similarity": minSearchSimilarity,
-            "current_user_id": current_user_id
-        },
-    ).fetchall()
-
-    # track_ids is list of tuples - simplify to 1-D list
-    track_ids = [i[0] for i in track_ids]
-
-    tracks = (
-        session.query(Track)
-        .filter(
-            Track.is_current == True,
-            Track.is_unlisted == False,
-            Track.track_id.in_(track_ids),
+    if ranked_ids is not None:
+        track_ids = ranked_ids
+    else:
+        res = sqlalchemy.text(
+            f"""
+            select track_id from (
+                select track_id, (sum(score) + (:title_weight*similarity(title, query))) as total_score from (
+                    select
+                        d."track_id" as track_id, d."word" as word, similarity(d."word", :query) as score,
+                        t."title" as title, :query as query
+                    from "track_lexeme_dict" d
+                    inner join "tracks" t on t."track_id" = d."track_id"
+                    {
+                        'inner join "saves" s on s.save_item_id = d.track_id'
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    where similarity(d."word", :query) >= :min_similarity
+                    and t."is_current"=true
+                    and t."is_unlisted"=false
+                    {
+                        "and s.save_type='track' and s.is_current=true and s.is_delete=false "
+                        "and s.user_id=:current_user_id"
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    order by d."word" <-> :query
+                ) as results
+                group by track_id, title, query
+            ) as results2
+            order by total_score desc
+            limit :limit
+            offset :offset;
+            """
         )
-        .all()
+
+        track_ids = session.execute(
+            res,
+            {
+                "query": searchStr,
+                "limit": limit,
+                "offset": offset,
+                "title_weight": trackTitleWeight,
+                "min_similarity": minSearchSimilarity,
+                "current_user_id": current_user_id
+            },
+        ).fetchall()
+
+        # track_ids is list of tuples - simplify to 1-D list
+        track_ids = [i[0] for i in track_ids]
+
+    # in track_ids order
+    # ids ranked by the search index or autocomplete cache may no longer be current when fetched
+    tracks = hydrate_entities(
+        session, Track, Track.track_id, track_ids,
+        Track.is_current == True,
+        Track.is_unlisted == False
     )
-    tracks = helpers.query_result_to_list(tracks)
 
     if isAutocomplete == True:
         # fetch users for tracks
-        track_owner_ids = list(map(lambda track: track["owner_id"], tracks))
-        users = (
-            session.query(User)
-            .filter(
-                User.is_current == True,
-                User.user_id.in_(track_owner_ids)
-            )
-            .all()
-        )
-        users = helpers.query_result_to_list(users)
-        users_dict = {user["user_id"]:user for user in users}
+        track_owner_ids = set(track["owner_id"] for track in tracks)
+        users_dict = get_entities_by_id(session, User, User.user_id, track_owner_ids, User.is_current == True)
 
         # attach user objects to track objects
         for track in tracks:
@@ -457,83 +525,79 @@ def track_search_query(session, searchStr, limit, offset, personalized, isAutoco
         # bundle peripheral info into track results
         tracks = populate_track_metadata(session, track_ids, tracks, current_user_id)
 
-    # preserve order from track_ids above
-    tracks = [next(t for t in tracks if t["track_id"] == track_id) for track_id in track_ids]
     return tracks
 
 
-def user_search_query(session, searchStr, limit, offset, personalized, isAutocomplete):
-    current_user_id = get_current_user_id(required=False)
+def user_search_query(
+        session, searchStr, limit, offset, personalized, isAutocomplete, current_user_id, ranked_ids=None
+):
     if personalized and not current_user_id:
         return []
 
-    res = sqlalchemy.text(
-        f"""
-        select user_id from (
-            select user_id, (sum(score) + (:name_weight*similarity(name, query))) as total_score from (
-                select
-                    d."user_id" as user_id, d."word" as word, similarity(d."word", :query) as score,
-                    u."name" as name, :query as query
-                from "user_lexeme_dict" d
-                inner join "users" u on u."user_id" = d."user_id"
-                {
-                    'inner join "follows" f on f.followee_user_id=d.user_id'
-                    if personalized and current_user_id
-                    else ""
-                }
-                where similarity(d."word", :query) >= :min_similarity
-                and u."is_current"=true
-                {
-                    "and f.is_current=true and f.is_delete=false and f.follower_user_id=:current_user_id"
-                    if personalized and current_user_id
-                    else ""
-                }
-                order by d."word" <-> :query
-            ) as results
-            group by user_id, name, query
-        ) as results2
-        order by total_score desc
-        limit :limit
-        offset :offset;
-        """
-    )
-
-    user_ids = session.execute(
-        res,
-        {
-            "query": searchStr,
-            "limit": limit,
-            "offset": offset,
-            "name_weight": userNameWeight,
-            "min_similarity": minSearchSimilarity,
-            "current_user_id": current_user_id
-        },
-    ).fetchall()
-
-    # user_ids is list of tuples - simplify to 1-D list
-    user_ids = [i[0] for i in user_ids]
-
-    users = (
-        session.query(User)
-        .filter(
-            User.is_current == True,
-            User.user_id.in_(user_ids)
+    if ranked_ids is not None:
+        user_ids = ranked_ids
+    else:
+        res = sqlalchemy.text(
+            f"""
+            select user_id from (
+                select user_id, (sum(score) + (:name_weight*similarity(name, query))) as total_score from (
+                    select
+                        d."user_id" as user_id, d."word" as word, similarity(d."word", :query) as score,
+                        u."name" as name, :query as query
+                    from "user_lexeme_dict" d
+                    inner join "users" u on u."user_id" = d."user_id"
+                    {
+                        'inner join "follows" f on f.followee_user_id=d.user_id'
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    where similarity(d."word", :query) >= :min_similarity
+                    and u."is_current"=true
+                    {
+                        "and f.is_current=true and f.is_delete=false and f.follower_user_id=:current_user_id"
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    order by d."word" <-> :query
+                ) as results
+                group by user_id, name, query
+            ) as results2
+            order by total_score desc
+            limit :limit
+            offset :offset;
+            """
         )
-        .all()
-    )
-    users = helpers.query_result_to_list(users)
+
+        user_ids = session.execute(
+            res,
+            {
+                "query": searchStr,
+                "limit": limit,
+                "offset": offset,
+                "name_weight": userNameWeight,
+                "min_similarity": minSearchSimilarity,
+                "current_user_id": current_user_id
+            },
+        ).fetchall()
+
+        # user_ids is list of tuples - simplify to 1-D list
+        user_ids = [i[0] for i in user_ids]
+
+    # in user_ids order
+    # ids ranked by the search index or autocomplete cache may no longer be current when fetched
+    users = hydrate_entities(session, User, User.user_id, user_ids, User.is_current == True)
 
     if isAutocomplete == False:
         # bundle peripheral info into user results
         users = populate_user_metadata(session, user_ids, users, current_user_id)
 
-    # preserve order from user_ids above
-    users = [next(u for u in users if u["user_id"] == user_id) for user_id in user_ids]
     return users
 
 
-def playlist_search_query(session, searchStr, limit, offset, is_album, personalized, isAutocomplete):
-    current_user_id = get_current_user_id(required=False)
+def playlist_search_query(
+        session, searchStr, limit, offset, is_album, personalized, isAutocomplete, current_user_id,
+        ranked_ids=None
+):
     if personalized and not current_user_id:
         return []
 
@@ -541,80 +605,73 @@ def playlist_search_query(session, searchStr, limit, offset, is_album, personali
     repost_type = RepostType.album if is_album else RepostType.playlist
     save_type = SaveType.album if is_album else SaveType.playlist
 
-    # SQLAlchemy doesn't expose a way to escape a string with double-quotes instead of
-    # single-quotes, so we have to use traditional string substitution. This is safe
-    # because the value is not user-specified.
-    res = sqlalchemy.text(
-        f"""
-        select playlist_id from (
-            select playlist_id, (sum(score) + (:name_weight*similarity(playlist_name, query))) as total_score from (
-                select
-                    d."playlist_id" as playlist_id, d."word" as word, similarity(d."word", :query) as score,
-                    p."playlist_name" as playlist_name, :query as query
-                from "{table_name}" d
-                inner join "playlists" p on p."playlist_id" = d."playlist_id"
-                {
-                    'inner join "saves" s on s.save_item_id = d.playlist_id'
-                    if personalized and current_user_id
-                    else ""
-                }
-                where similarity(d."word", :query) >= :min_similarity
-                and p."is_current"=true
-                {
-                    "and s.save_type='" + save_type +
-                    "' and s.is_current=true and s.is_delete=false and s.user_id=:current_user_id"
-                    if personalized and current_user_id
-                    else ""
-                }
-                order by d."word" <-> :query
-            ) as results
-            group by playlist_id, playlist_name, query
-        ) as results2
-        order by total_score desc
-        limit :limit
-        offset :offset;
-        """
-    )
-
-    playlist_ids = session.execute(
-        res,
-        {
-            "query": searchStr,
-            "limit": limit,
-            "offset": offset,
-            "name_weight": playlistNameWeight,
-            "min_similarity": minSearchSimilarity,
-            "current_user_id": current_user_id
-        },
-    ).fetchall()
-
-    # playlist_ids is list of tuples - simplify to 1-D list
-    playlist_ids = [i[0] for i in playlist_ids]
-
-    playlists = (
-        session.query(Playlist)
-        .filter(
-            Playlist.is_current == True,
-            Playlist.is_album == is_album,
-            Playlist.playlist_id.in_(playlist_ids)
+    if ranked_ids is not None:
+        playlist_ids = ranked_ids
+    else:
+        # SQLAlchemy doesn't expose a way to escape a string with double-quotes instead of
+        # single-quotes, so we have to use traditional string substitution. This is safe
+        # because the value is not user-specified.
+        res = sqlalchemy.text(
+            f"""
+            select playlist_id from (
+                select playlist_id, (sum(score) + (:name_weight*similarity(playlist_name, query))) as total_score from (
+                    select
+                        d."playlist_id" as playlist_id, d."word" as word, similarity(d."word", :query) as score,
+                        p."playlist_name" as playlist_name, :query as query
+                    from "{table_name}" d
+                    inner join "playlists" p on p."playlist_id" = d."playlist_id"
+                    {
+                        'inner join "saves" s on s.save_item_id = d.playlist_id'
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    where similarity(d."word", :query) >= :min_similarity
+                    and p."is_current"=true
+                    {
+                        "and s.save_type='" + save_type +
+                        "' and s.is_current=true and s.is_delete=false and s.user_id=:current_user_id"
+                        if personalized and current_user_id
+                        else ""
+                    }
+                    order by d."word" <-> :query
+                ) as results
+                group by playlist_id, playlist_name, query
+            ) as results2
+            order by total_score desc
+            limit :limit
+            offset :offset;
+            """
         )
-        .all()
+
+        playlist_ids = session.execute(
+            res,
+            {
+                "query": searchStr,
+                "limit": limit,
+                "offset": offset,
+                "name_weight": playlistNameWeight,
+                "min_similarity": minSearchSimilarity,
+                "current_user_id": current_user_id
+            },
+        ).fetchall()
+
+        # playlist_ids is list of tuples - simplify to 1-D list
+        playlist_ids = [i[0] for i in playlist_ids]
+
+    # in playlist_ids order
+    # ids ranked by the search index or autocomplete cache may no longer be current when fetched
+    playlists = hydrate_entities(
+        session, Playlist, Playlist.playlist_id, playlist_ids,
+        Playlist.is_current == True,
+        Playlist.is_album == is_album
     )
-    playlists = helpers.query_result_to_list(playlists)
 
     if isAutocomplete == True:
         # fetch users for playlists
-        playlist_owner_ids = list(map(lambda playlist: playlist["playlist_owner_id"], playlists))
-        users = (
-            session.query(User)
-            .filter(
-                User.is_current == True,
-                User.user_id.in_(playlist_owner_ids)
-            )
-            .all()
+        playlist_owner_ids = set(playlist["playlist_owner_id"] for playlist in playlists)
+        users_dict = get_entities_by_id(
+            session, User, User.user_id, playlist_owner_ids, User.is_current == True
         )
-        users = helpers.query_result_to_list(users)
-        users_dict = {user["user_id"]:user for user in users}
 
         # attach user objects to playlist objects
         for playlist in playlists:
@@ -630,6 +687,4 @@ def playlist_search_query(session, searchStr, limit, offset, is_album, personali
             current_user_id
         )
 
-    # preserve order from playlist_ids above
-    playlists = [next(p for p in playlists if p["playlist_id"] == playlist_id) for playlist_id in playlist_ids]
     return playlists
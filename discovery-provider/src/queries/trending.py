@@ -1,6 +1,6 @@
 import logging # pylint: disable=C0302
+import threading
 import redis
-import json
 import sqlalchemy
 
 from flask import Blueprint, request
@@ -11,8 +11,11 @@ from src.models import User, Track, RepostType, Follow, SaveType
 from src.utils.db_session import get_db
 from src.utils.config import shared_config
 from src.queries.query_helpers import get_pagination_vars
-from src.tasks.generate_trending import generate_trending, trending_cache_hits_key, \
-        trending_cache_miss_key, trending_cache_total_key
+from src.tasks.generate_trending import generate_trending, validate_trending_time, \
+        trending_cache_hits_key, trending_cache_miss_key, trending_cache_total_key
+from src.tasks.index_cache import refresh_trending_cache, update_trending_cache
+from src.utils.trending_cache import get_trending_page, get_trending_refresh_lock, \
+        trending_cache_soft_ttl_sec
 
 logger = logging.getLogger(__name__)
 bp = Blueprint("trending", __name__)
@@ -20,6 +23,29 @@ bp = Blueprint("trending", __name__)
 REDIS_URL = shared_config["redis"]["url"]
 REDIS = redis.Redis.from_url(url=REDIS_URL)
 
+# How long a request waits on another worker computing trending rankings that are not cached
+trending_cache_miss_wait_sec = 10
+
+
+######## HELPER FUNCTIONS ########
+
+def refresh_trending_cache_in_background(db, time, refresh_lock):
+    try:
+        refresh_trending_cache(db, REDIS, time)
+    except Exception: # pylint: disable=W0703
+        logger.error(f"trending.py | Failed to refresh trending cache {time}", exc_info=True)
+    finally:
+        refresh_lock.release()
+
+
+def revalidate_trending_cache(db, time):
+    """Refresh the rankings of time in a background thread, unless another worker already is"""
+    refresh_lock = get_trending_refresh_lock(REDIS, time)
+    if refresh_lock.acquire(blocking=False):
+        threading.Thread(
+            target=refresh_trending_cache_in_background, args=(db, time, refresh_lock), daemon=True
+        ).start()
+
 ######## ROUTES ########
 
 @bp.route("/trending/<time>", methods=("GET",))
@@ -29,22 +55,31 @@ def trending(time):
     REDIS.incr(trending_cache_total_key, 1)
 
     genre = request.args.get("genre", default=None, type=str)
-    if genre is None:
-        redis_key = f"trending-{time}"
-        redis_cache_value = REDIS.get(redis_key)
-        if redis_cache_value is not None:
-            json_cache = json.loads(redis_cache_value.decode('utf-8'))
-            if json_cache is not None:
-                num_cached_entries = len(json_cache['listen_counts'])
-                logger.error(f'Cache for {redis_key}, {num_cached_entries} entries, request limit {limit}')
-                if offset + limit <= num_cached_entries:
-                    json_cache['listen_counts'] = json_cache['listen_counts'][offset:offset + limit]
-                    logger.error(f'Returning cache for {redis_key}')
-                    # Increment cache hit count
-                    REDIS.incr(trending_cache_hits_key, 1)
-                    return api_helpers.success_response(json_cache)
+    validate_trending_time(time)
+    db = get_db()
+
+    # Parse encoded characters, such as Hip-Hop%252FRap -> Hip-Hop/Rap
+    cache_genre = unquote(genre) if genre is not None else None
+    (cached_page, cache_age) = get_trending_page(REDIS, time, cache_genre, limit, offset)
+    if cache_age is None:
+        # Not cached at all, e.g. on a cold start: compute the rankings once, concurrent
+        # requests wait on the worker computing them instead of all recomputing
+        if update_trending_cache(db, REDIS, time, blocking_timeout=trending_cache_miss_wait_sec):
+            (cached_page, cache_age) = get_trending_page(REDIS, time, cache_genre, limit, offset)
+    elif cache_age > trending_cache_soft_ttl_sec():
+        # Serve the stale rankings while a single worker recomputes them
+        revalidate_trending_cache(db, time)
+
+    if cached_page is not None:
+        # Increment cache hit count
+        REDIS.incr(trending_cache_hits_key, 1)
+        (response, status) = api_helpers.success_response({'listen_counts': cached_page})
+        # Seconds since the served rankings were computed
+        response.headers["Age"] = str(int(cache_age))
+        return (response, status)
+
     # Increment cache miss count
     REDIS.incr(trending_cache_miss_key, 1)
-    # Recalculate trending values if necessary
-    final_resp = generate_trending(get_db(), time, genre, limit, offset)
+    # Page past the cached rankings, compute it directly
+    final_resp = generate_trending(db, time, genre, limit, offset)
     return api_helpers.success_response(final_resp)
@@ -0,0 +1,124 @@
+import logging
+import sqlalchemy
+
+logger = logging.getLogger(__name__)
+
+# user_aggregates, track_aggregates and playlist_aggregates hold the repost / save /
+# follow / track counts served by the query helpers. The indexer recomputes rows only
+# for the ids touched in the current transaction (see src/tasks/entity_changes.py), each
+# count being an index-backed lookup for a single id, and upserts the result.
+# {id_source} is either the changed ids or, for a full rebuild, every current entity.
+
+user_aggregates_query = """
+    INSERT INTO user_aggregates (
+        user_id, track_count, playlist_count, album_count,
+        follower_count, following_count, repost_count, track_blocknumber
+    )
+    SELECT
+      ids.user_id,
+      (
+        SELECT count(*) FROM tracks t
+        WHERE t.owner_id = ids.user_id
+          and t.is_current = true and t.is_delete = false and t.is_unlisted = false
+      ),
+      (
+        SELECT count(*) FROM playlists p
+        WHERE p.playlist_owner_id = ids.user_id
+          and p.is_current = true and p.is_album = false and p.is_private = false and p.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM playlists p
+        WHERE p.playlist_owner_id = ids.user_id
+          and p.is_current = true and p.is_album = true and p.is_private = false and p.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM follows f
+        WHERE f.followee_user_id = ids.user_id and f.is_current = true and f.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM follows f
+        WHERE f.follower_user_id = ids.user_id and f.is_current = true and f.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM reposts r
+        WHERE r.user_id = ids.user_id and r.is_current = true and r.is_delete = false
+      ),
+      (
+        SELECT max(t.blocknumber) FROM tracks t
+        WHERE t.owner_id = ids.user_id and t.is_current = true and t.is_delete = false
+      )
+    FROM {id_source}
+    ON CONFLICT (user_id) DO UPDATE SET
+      track_count = EXCLUDED.track_count,
+      playlist_count = EXCLUDED.playlist_count,
+      album_count = EXCLUDED.album_count,
+      follower_count = EXCLUDED.follower_count,
+      following_count = EXCLUDED.following_count,
+      repost_count = EXCLUDED.repost_count,
+      track_blocknumber = EXCLUDED.track_blocknumber
+"""
+
+track_aggregates_query = """
+    INSERT INTO track_aggregates (track_id, repost_count, save_count)
+    SELECT
+      ids.track_id,
+      (
+        SELECT count(*) FROM reposts r
+        WHERE r.repost_item_id = ids.track_id and r.repost_type = 'track'
+          and r.is_current = true and r.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM saves s
+        WHERE s.save_item_id = ids.track_id and s.save_type = 'track'
+          and s.is_current = true and s.is_delete = false
+      )
+    FROM {id_source}
+    ON CONFLICT (track_id) DO UPDATE SET
+      repost_count = EXCLUDED.repost_count,
+      save_count = EXCLUDED.save_count
+"""
+
+playlist_aggregates_query = """
+    INSERT INTO playlist_aggregates (playlist_id, repost_count, save_count)
+    SELECT
+      ids.playlist_id,
+      (
+        SELECT count(*) FROM reposts r
+        WHERE r.repost_item_id = ids.playlist_id and r.repost_type in ('playlist', 'album')
+          and r.is_current = true and r.is_delete = false
+      ),
+      (
+        SELECT count(*) FROM saves s
+        WHERE s.save_item_id = ids.playlist_id and s.save_type in ('playlist', 'album')
+          and s.is_current = true and s.is_delete = false
+      )
+    FROM {id_source}
+    ON CONFLICT (playlist_id) DO UPDATE SET
+      repost_count = EXCLUDED.repost_count,
+      save_count = EXCLUDED.save_count
+"""
+
+# (query, id column, source of every id for a full rebuild)
+aggregate_queries = [
+    (user_aggregates_query, "user_id", "SELECT user_id FROM users WHERE is_current = true"),
+    (track_aggregates_query, "track_id", "SELECT track_id FROM tracks WHERE is_current = true"),
+    (playlist_aggregates_query, "playlist_id", "SELECT playlist_id FROM playlists WHERE is_current = true"),
+]
+
+
+def update_aggregates(session, user_ids, track_ids, playlist_ids):
+    """Recompute aggregate rows for the given ids. Pending changes must be flushed to the session first."""
+    for ((query, id_column, _), ids) in zip(aggregate_queries, (user_ids, track_ids, playlist_ids)):
+        if not ids:
+            continue
+        session.execute(
+            sqlalchemy.text(query.format(id_source=f"unnest(:ids) AS ids({id_column})")),
+            {"ids": list(ids)}
+        )
+
+
+def rebuild_aggregates(session):
+    """Recompute every aggregate row from scratch, used for backfill."""
+    for (query, id_column, all_ids_query) in aggregate_queries:
+        logger.info(f"aggregates.py | rebuild_aggregates | rebuilding {id_column} aggregates")
+        session.execute(query.format(id_source=f"({all_ids_query}) AS ids"))
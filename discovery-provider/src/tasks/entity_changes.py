@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.models import User, Track, Playlist, Follow, Repost, RepostType, Save, SaveType
+
+
+def get_empty_changed_ids():
+    """ Ids touched by indexed rows, consumed by update_lexeme_dicts and update_aggregates
+            user / track / playlist: entities with a new row version (search lexeme entries)
+            user_aggregates / track_aggregates / playlist_aggregates: ids whose counts may change
+            follower: users whose followee set may change (cached followee ids to evict)
+            feed_activity: (actor user id, activity, item type, item id, activity datetime) of new
+                tracks, playlists and reposts, see src/utils/feed_timeline.py. Only collected for
+                indexed rows, not reverts
+    """
+    return {
+        "user": set(),
+        "track": set(),
+        "playlist": set(),
+        "user_aggregates": set(),
+        "track_aggregates": set(),
+        "playlist_aggregates": set(),
+        "follower": set(),
+        "feed_activity": set(),
+    }
+
+
+def add_feed_activity(changed_ids, obj):
+    """ Record the feed activity of obj, a newly inserted row """
+    # every update inserts a new entity version, only the version written by the create
+    # event has created_at == updated_at
+    if isinstance(obj, Track) and obj.created_at == obj.updated_at:
+        changed_ids["feed_activity"].add((obj.owner_id, "create", "track", obj.track_id, obj.created_at))
+    elif isinstance(obj, Playlist) and obj.created_at == obj.updated_at:
+        changed_ids["feed_activity"].add(
+            (obj.playlist_owner_id, "create", "playlist", obj.playlist_id, obj.created_at)
+        )
+    elif isinstance(obj, Repost):
+        item_type = "track" if obj.repost_type == RepostType.track else "playlist"
+        activity = "unrepost" if obj.is_delete else "repost"
+        changed_ids["feed_activity"].add((obj.user_id, activity, item_type, obj.repost_item_id, obj.created_at))
+
+
+def add_changed_entity(changed_ids, obj):
+    """ Record the ids affected by obj, a User, Track, Playlist, Follow, Repost or
+        Save row that was inserted or reverted """
+    if isinstance(obj, User):
+        changed_ids["user"].add(obj.user_id)
+    elif isinstance(obj, Track):
+        changed_ids["track"].add(obj.track_id)
+        changed_ids["user_aggregates"].add(obj.owner_id)
+    elif isinstance(obj, Playlist):
+        changed_ids["playlist"].add(obj.playlist_id)
+        changed_ids["user_aggregates"].add(obj.playlist_owner_id)
+    elif isinstance(obj, Follow):
+        changed_ids["user_aggregates"].add(obj.follower_user_id)
+        changed_ids["user_aggregates"].add(obj.followee_user_id)
+        changed_ids["follower"].add(obj.follower_user_id)
+    elif isinstance(obj, Repost):
+        changed_ids["user_aggregates"].add(obj.user_id)
+        if obj.repost_type == RepostType.track:
+            changed_ids["track_aggregates"].add(obj.repost_item_id)
+        else:
+            changed_ids["playlist_aggregates"].add(obj.repost_item_id)
+    elif isinstance(obj, Save):
+        if obj.save_type == SaveType.track:
+            changed_ids["track_aggregates"].add(obj.save_item_id)
+        else:
+            changed_ids["playlist_aggregates"].add(obj.save_item_id)
+
+
+@contextmanager
+def track_changed_entities(session):
+    """ Usage:
+            with track_changed_entities(session) as changed_ids:
+                add new entity rows to session ...
+
+        Collects the ids affected by rows inserted by any flush while the block is
+        active (including autoflushes) into changed_ids, see get_empty_changed_ids.
+        The session is flushed when leaving the block.
+    """
+    changed_ids = get_empty_changed_ids()
+
+    def collect_changed_ids(flush_session, flush_context, instances):
+        for obj in flush_session.new:
+            add_changed_entity(changed_ids, obj)
+            add_feed_activity(changed_ids, obj)
+
+    event.listen(session, "before_flush", collect_changed_ids)
+    try:
+        yield changed_ids
+        session.flush()
+    finally:
+        event.remove(session, "before_flush", collect_changed_ids)
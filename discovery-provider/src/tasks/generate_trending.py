@@ -1,13 +1,11 @@
 import logging # pylint: disable=C0302
-from urllib.parse import urljoin, unquote
-import requests
-from sqlalchemy import func
+from urllib.parse import unquote
+import sqlalchemy
 
-from src import api_helpers
-from src.models import Track, RepostType, Follow, SaveType
-from src.utils.config import shared_config
+from src import exceptions
 from src.queries import response_name_constants
-from src.queries.query_helpers import get_repost_counts, get_save_counts, get_genre_list
+from src.queries.query_helpers import get_genre_list, electronic_sub_genres
+from src.tasks.index_listen_counts import trending_time_ranges
 
 logger = logging.getLogger(__name__)
 
@@ -15,149 +13,107 @@ trending_cache_hits_key = 'trending_cache_hits'
 trending_cache_miss_key = 'trending_cache_miss'
 trending_cache_total_key = 'trending_cache_total'
 
-def generate_trending(db, time, genre, limit, offset):
-    identity_url = shared_config['discprov']['identity_service_url']
-    identity_trending_endpoint = urljoin(identity_url, f"/tracks/trending/{time}")
+# Scored tracks for a time range from the scores kept up to date by
+# src/tasks/index_listen_counts.py, along with the track's repost / save counts and owner's
+# follower count. Deleted and unlisted tracks are skipped.
+trending_tracks_query = """
+    SELECT
+      s.track_id,
+      s.listens,
+      t.owner_id,
+      t.genre,
+      coalesce(ta.repost_count, 0) AS repost_count,
+      coalesce(ta.save_count, 0) AS save_count,
+      coalesce(ua.follower_count, 0) AS owner_follower_count
+    FROM track_trending_scores s
+    JOIN tracks t ON t.track_id = s.track_id
+      and t.is_current = true and t.is_delete = false and t.is_unlisted = false
+    LEFT JOIN track_aggregates ta ON ta.track_id = s.track_id
+    LEFT JOIN user_aggregates ua ON ua.user_id = t.owner_id
+    WHERE s.time_range = :time_range
+"""
+
+# A single page of trending tracks, by listens desc
+trending_query = trending_tracks_query + """
+    {genre_filter}
+    ORDER BY s.listens DESC, s.track_id DESC
+    LIMIT :limit OFFSET :offset
+"""
+
+# The top :limit tracks overall and the top :limit tracks of each genre, by listens desc
+trending_rankings_query = """
+    SELECT * FROM (
+      SELECT
+        trending_tracks.*,
+        row_number() OVER (ORDER BY listens DESC, track_id DESC) AS rank,
+        row_number() OVER (PARTITION BY genre ORDER BY listens DESC, track_id DESC) AS genre_rank
+      FROM ({trending_tracks_query}) AS trending_tracks
+    ) AS ranked_tracks
+    WHERE rank <= :limit OR genre_rank <= :limit
+    ORDER BY rank
+""".format(trending_tracks_query=trending_tracks_query)
+
+
+def validate_trending_time(time):
+    if time not in trending_time_ranges:
+        raise exceptions.ArgumentError(
+            f"Invalid time parameter provided, use {'/'.join(trending_time_ranges.keys())}"
+        )
 
-    post_body = {}
-    post_body["limit"] = limit
-    post_body["offset"] = offset
 
-    # Retrieve genre and query all tracks if required
-    if genre is not None:
-        # Parse encoded characters, such as Hip-Hop%252FRap -> Hip-Hop/Rap
-        genre = unquote(genre)
-        with db.scoped_session() as session:
-            genre_list = get_genre_list(genre)
-            genre_track_ids = (
-                session.query(Track.track_id)
-                .filter(
-                    Track.genre.in_(genre_list),
-                    Track.is_current == True,
-                    Track.is_delete == False,
-                    Track.is_unlisted == False
-                )
-                .all()
-            )
-            genre_specific_track_ids = [record[0] for record in genre_track_ids]
-            post_body["track_ids"] = genre_specific_track_ids
-
-    # Query trending information from identity service
-    resp = None
-    try:
-        resp = requests.post(identity_trending_endpoint, json=post_body)
-    except Exception as e: # pylint: disable=W0703
-        logger.error(
-            f'Error retrieving trending info - {identity_trending_endpoint}, {post_body}'
-        )
-        return api_helpers.error_response(e, 500)
+def to_trending_entry(row):
+    return {
+        response_name_constants.track_id: row["track_id"],
+        "listens": row["listens"],
+        response_name_constants.repost_count: row["repost_count"],
+        response_name_constants.save_count: row["save_count"],
+        response_name_constants.track_owner_id: row["owner_id"],
+        response_name_constants.track_owner_follower_count: row["owner_follower_count"],
+    }
 
-    json_resp = resp.json()
-    if "error" in json_resp:
-        return api_helpers.error_response(json_resp["error"], 500)
 
-    listen_counts = json_resp["listenCounts"]
-    # Convert trackId to snakeCase
-    for track_entry in listen_counts:
-        track_entry[response_name_constants.track_id] = track_entry['trackId']
-        del track_entry['trackId']
+def generate_trending(db, time, genre, limit, offset):
+    validate_trending_time(time)
 
-    track_ids = [track[response_name_constants.track_id] for track in listen_counts]
+    params = {"time_range": time, "limit": limit, "offset": offset}
+    genre_filter = ""
+    if genre is not None:
+        # Parse encoded characters, such as Hip-Hop%252FRap -> Hip-Hop/Rap
+        genre = unquote(genre)
+        genre_filter = "and t.genre = ANY(:genres)"
+        params["genres"] = get_genre_list(genre)
 
     with db.scoped_session() as session:
-        # Filter tracks to not-deleted ones so trending order is preserved
-        not_deleted_track_ids = (
-            session.query(Track.track_id)
-            .filter(
-                Track.track_id.in_(track_ids),
-                Track.is_current == True,
-                Track.is_delete == False,
-                Track.is_unlisted == False
-            )
-            .all()
-        )
-        not_deleted_track_ids = set([record[0] for record in not_deleted_track_ids]) # pylint: disable=R1718
-
-        # Query repost counts
-        repost_counts = get_repost_counts(session, False, True, not_deleted_track_ids, None)
-        track_repost_counts = {
-            repost_item_id: repost_count
-            for (repost_item_id, repost_count, repost_type) in repost_counts
-            if repost_type == RepostType.track
-        }
-
-        # Query follower info for each track owner
-        # Query each track owner
-        track_owners_query = (
-            session.query(Track.track_id, Track.owner_id)
-            .filter
-            (
-                Track.is_current == True,
-                Track.is_unlisted == False,
-                Track.track_id.in_(not_deleted_track_ids)
-            )
-            .all()
-        )
+        trending_results = session.execute(
+            sqlalchemy.text(trending_query.format(genre_filter=genre_filter)), params
+        ).fetchall()
 
-        # Generate track_id <-> owner_id mapping
-        track_owner_dict = {track_id: owner_id for (track_id, owner_id) in track_owners_query}
-        # Generate list of owner ids
-        track_owner_list = [owner_id for (track_id, owner_id) in track_owners_query]
-
-        # build dict of owner_id --> follower_count
-        follower_counts = (
-            session.query(
-                Follow.followee_user_id,
-                func.count(Follow.followee_user_id)
-            )
-            .filter(
-                Follow.is_current == True,
-                Follow.is_delete == False,
-                Follow.followee_user_id.in_(track_owner_list)
-            )
-            .group_by(Follow.followee_user_id)
-            .all()
-        )
-        follower_count_dict = \
-                {user_id: follower_count for (user_id, follower_count) in follower_counts}
-
-        save_counts = get_save_counts(session, False, True, not_deleted_track_ids, None)
-        track_save_counts = {
-            save_item_id: save_count
-            for (save_item_id, save_count, save_type) in save_counts
-            if save_type == SaveType.track
-        }
-
-        trending_tracks = []
-        for track_entry in listen_counts:
-            # Skip over deleted tracks
-            if track_entry[response_name_constants.track_id] not in not_deleted_track_ids:
-                continue
-
-            # Populate repost counts
-            if track_entry[response_name_constants.track_id] in track_repost_counts:
-                track_entry[response_name_constants.repost_count] = \
-                        track_repost_counts[track_entry[response_name_constants.track_id]]
-            else:
-                track_entry[response_name_constants.repost_count] = 0
-
-            # Populate save counts
-            if track_entry[response_name_constants.track_id] in track_save_counts:
-                track_entry[response_name_constants.save_count] = \
-                        track_save_counts[track_entry[response_name_constants.track_id]]
-            else:
-                track_entry[response_name_constants.save_count] = 0
-
-            # Populate listen counts
-            owner_id = track_owner_dict[track_entry[response_name_constants.track_id]]
-            owner_follow_count = 0
-            if owner_id in follower_count_dict:
-                owner_follow_count = follower_count_dict[owner_id]
-            track_entry[response_name_constants.track_owner_id] = owner_id
-            track_entry[response_name_constants.track_owner_follower_count] = owner_follow_count
-
-            trending_tracks.append(track_entry)
+    trending_tracks = [to_trending_entry(row) for row in trending_results]
 
     final_resp = {}
     final_resp['listen_counts'] = trending_tracks
     return final_resp
+
+
+def generate_trending_rankings(db, time, limit):
+    """Return a dict of genre --> top limit trending entries for time, the None genre
+    holding the ranking across all genres. A genre's ranking covers its sub-genres, as
+    generate_trending does, and genres without trending tracks are left out."""
+    validate_trending_time(time)
+
+    with db.scoped_session() as session:
+        ranked_tracks = session.execute(
+            sqlalchemy.text(trending_rankings_query), {"time_range": time, "limit": limit}
+        ).fetchall()
+
+    # rows are in overall rank order, so filtering a genre's rows keeps them in genre rank order
+    genres = set(row["genre"] for row in ranked_tracks if row["genre"] is not None)
+    if genres & set(electronic_sub_genres):
+        genres.add("Electronic")
+    rankings = {None: [to_trending_entry(row) for row in ranked_tracks if row["rank"] <= limit]}
+    for genre in genres:
+        genre_list = set(get_genre_list(genre))
+        rankings[genre] = [
+            to_trending_entry(row) for row in ranked_tracks if row["genre"] in genre_list
+        ][:limit]
+    return rankings
@@ -1,4 +1,7 @@
 import logging
+import time
+import collections
+import concurrent.futures
 from src import contract_addresses
 from src.models import Block, User, Track, Repost, Follow, Playlist, Save
 from src.tasks.celery_app import celery
@@ -7,6 +10,13 @@ from src.tasks.users import user_state_update  # pylint: disable=E0611,E0001
 from src.tasks.social_features import social_feature_state_update
 from src.tasks.playlists import playlist_state_update
 from src.tasks.user_library import user_library_state_update
+from src.tasks.lexeme_dicts import update_lexeme_dicts
+from src.tasks.aggregates import update_aggregates
+from src.tasks.entity_changes import get_empty_changed_ids, add_changed_entity, track_changed_entities
+from src.tasks.ipfs_prefetch import prefetch_ipfs_data
+from src.utils.followee_cache import invalidate_followee_ids
+from src.utils.feed_timeline import feed_timeline_enabled, fan_out_feed_activity, invalidate_feed_timelines
+from src.utils.autocomplete_cache import invalidate_autocomplete_cache
 from src.utils.helpers import get_ipfs_info_from_cnode_endpoint
 from src.utils.redis_constants import latest_block_redis_key, \
     latest_block_hash_redis_key, most_recent_indexed_block_redis_key
@@ -21,6 +31,15 @@ default_padded_start_hash = (
 )
 default_config_start_hash = "0x0"
 
+# Contracts whose transactions are decoded by index_blocks
+indexed_contract_names = [
+    "user_factory",
+    "track_factory",
+    "social_feature_factory",
+    "playlist_factory",
+    "user_library_factory",
+]
+
 def get_contract_info_if_exists(self, address):
     for contract_name, contract_address in contract_addresses.items():
         if update_task.web3.toChecksumAddress(contract_address) == address:
@@ -83,7 +102,11 @@ def get_latest_block(db):
             target_latest_block_number = latest_block_number_from_chain
 
         logger.info(f"index.py | get_latest_block | current={current_block_number} target={target_latest_block_number}")
-        latest_block = update_task.web3.eth.getBlock(target_latest_block_number, True)
+        # Full transactions are only needed when receipts are looked up per transaction
+        latest_block = update_task.web3.eth.getBlock(
+            target_latest_block_number,
+            not uses_logs_indexing_mode()
+        )
     return latest_block
 
 def update_latest_block_redis():
@@ -91,148 +114,409 @@ def update_latest_block_redis():
     redis = update_task.redis
     redis.set(latest_block_redis_key, latest_block_from_chain.number)
     redis.set(latest_block_hash_redis_key, latest_block_from_chain.hash.hex())
+    return latest_block_from_chain.number
 
-def index_blocks(self, db, blocks_list):
-    web3 = update_task.web3
-    redis = update_task.redis
-
-    num_blocks = len(blocks_list)
-    block_order_range = range(len(blocks_list) - 1, -1, -1)
-    for i in block_order_range:
-        if i % 10 == 0 and i != 0:
-            block_index = num_blocks - i
-            logger.info(f"index.py | index_blocks | processing block {block_index}/{num_blocks} blocks")
-
-        block = blocks_list[i]
-        block_number = block.number
-        block_timestamp = block.timestamp
-
-        # Handle each block in a distinct transaction
-        with db.scoped_session() as session:
-            current_block_query = session.query(Block).filter_by(is_current=True)
-
-            block_model = Block(
-                blockhash=web3.toHex(block.hash),
-                parenthash=web3.toHex(block.parentHash),
-                number=block.number,
-                is_current=True,
-            )
-
-            # Update blocks table after
-            assert (
-                current_block_query.count() == 1
-            ), "Expected single row marked as current"
-
-            former_current_block = current_block_query.first()
-            former_current_block.is_current = False
-            session.add(block_model)
+def get_indexed_contract_addresses():
+    return {contract_addresses[name] for name in indexed_contract_names}
 
-            user_factory_txs = []
-            track_factory_txs = []
-            social_feature_factory_txs = []
-            playlist_factory_txs = []
-            user_library_factory_txs = []
+def fetch_tx_receipts(blocks_list, max_workers=None):
+    """Return dict of block hash -> [(tx hash, target contract address, tx receipt)] for
+    every tx in blocks_list sent to an indexed contract, sorted by tx hash.
 
-            # Sort transactions by hash
-            sorted_txs = sorted(block.transactions, key=lambda entry: entry['hash'])
-
-            # Parse tx events in each block
-            for tx in sorted_txs:
+    Transactions are filtered by target contract before any receipt is requested, and the
+    remaining receipts for the whole window are fetched concurrently by a bounded thread pool
+    of max_workers, tx_receipt_fetch_concurrency by default.
+    """
+    web3 = update_task.web3
+    indexed_contract_addresses = get_indexed_contract_addresses()
+
+    block_txs = {}
+    tx_hashes = []
+    for block in blocks_list:
+        txs = []
+        # Sort transactions by hash
+        for tx in sorted(block.transactions, key=lambda entry: entry['hash']):
+            if tx["to"] in indexed_contract_addresses:
                 tx_hash = web3.toHex(tx["hash"])
-                tx_target_contract_address = tx["to"]
-                tx_receipt = web3.eth.getTransactionReceipt(tx_hash)
+                txs.append((tx_hash, tx["to"]))
+                tx_hashes.append(tx_hash)
+        block_txs[web3.toHex(block.hash)] = txs
+
+    tx_receipt_dict = {}
+    if tx_hashes:
+        if max_workers is None:
+            max_workers = int(update_task.shared_config["discprov"]["tx_receipt_fetch_concurrency"])
+        num_workers = min(max_workers, len(tx_hashes))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+            tx_receipts = executor.map(web3.eth.getTransactionReceipt, tx_hashes)
+            tx_receipt_dict = dict(zip(tx_hashes, tx_receipts))
+
+    logger.info(
+        f"index.py | fetch_tx_receipts | Fetched {len(tx_receipt_dict)} receipts "
+        f"for {len(blocks_list)} blocks"
+    )
+    return {
+        block_hash: [(tx_hash, tx_to, tx_receipt_dict[tx_hash]) for (tx_hash, tx_to) in txs]
+        for block_hash, txs in block_txs.items()
+    }
+
+def fetch_tx_receipts_from_logs(blocks_list):
+    """Return the same structure as fetch_tx_receipts, built from a single eth_getLogs
+    call over the block range instead of full blocks and per-tx receipts.
+
+    Logs are grouped by (tx hash, emitting contract) into minimal receipts of the form
+    {"transactionHash", "blockHash", "blockNumber", "logs"}, which is all processReceipt reads.
+    Empty blocks cost nothing beyond their header.
+    """
+    web3 = update_task.web3
+    if not blocks_list:
+        return {}
+
+    block_numbers = [block.number for block in blocks_list]
+    block_hashes = {web3.toHex(block.hash) for block in blocks_list}
+    logs = web3.eth.getLogs({
+        "fromBlock": min(block_numbers),
+        "toBlock": max(block_numbers),
+        "address": list(get_indexed_contract_addresses())
+    })
+
+    # (block hash, tx hash, contract address) -> receipt
+    receipts = {}
+    for log in logs:
+        block_hash = web3.toHex(log["blockHash"])
+        # Block hashes in the log range must match the blocks we are indexing,
+        # otherwise the chain reorganized between fetching blocks and logs
+        if block_hash not in block_hashes:
+            raise Exception(
+                f"index.py | fetch_tx_receipts_from_logs | Log from unexpected block {block_hash} "
+                f"at height {log['blockNumber']}, chain reorganized during indexing"
+            )
+        tx_hash = web3.toHex(log["transactionHash"])
+        receipt_key = (block_hash, tx_hash, log["address"])
+        if receipt_key not in receipts:
+            receipts[receipt_key] = {
+                "transactionHash": log["transactionHash"],
+                "blockHash": log["blockHash"],
+                "blockNumber": log["blockNumber"],
+                "logs": [],
+            }
+        receipts[receipt_key]["logs"].append(log)
+
+    block_txs = {block_hash: [] for block_hash in block_hashes}
+    # Sort by tx hash to match the ordering used by fetch_tx_receipts
+    for (block_hash, tx_hash, address) in sorted(receipts.keys()):
+        receipt = receipts[(block_hash, tx_hash, address)]
+        receipt["logs"].sort(key=lambda entry: entry["logIndex"])
+        block_txs[block_hash].append((tx_hash, address, receipt))
+
+    logger.info(
+        f"index.py | fetch_tx_receipts_from_logs | Fetched {len(logs)} logs "
+        f"for {len(blocks_list)} blocks"
+    )
+    return block_txs
+
+def uses_logs_indexing_mode():
+    return update_task.shared_config["discprov"]["indexing_mode"] == "logs"
+
+def get_block_window(blocks_list):
+    """Yield (block, block tx receipts) in ascending order for blocks_list (ordered newest first),
+    fetching the receipts and IPFS data for the whole window up front."""
+    if uses_logs_indexing_mode():
+        block_tx_receipts = fetch_tx_receipts_from_logs(blocks_list)
+    else:
+        block_tx_receipts = fetch_tx_receipts(blocks_list)
+    prefetch_ipfs_data(
+        update_task, [tx for block_txs in block_tx_receipts.values() for tx in block_txs]
+    )
+
+    for block in reversed(blocks_list):
+        yield block, block_tx_receipts.get(update_task.web3.toHex(block.hash), [])
+
+def prefetch_blocks(start_block_number, end_block_number, parent_hash):
+    """Yield (block, block tx receipts) for start_block_number..end_block_number in ascending order.
+
+    Blocks are fetched by number in chunks of block_prefetch_chunk_size by a bounded thread pool,
+    at most block_prefetch_queue_size blocks ahead of the consumer, so fetching overlaps with
+    indexing while memory stays flat. The receipts of a chunk are fetched together, in logs mode
+    with a single eth_getLogs call.
+    Iteration stops early if a block does not extend the previous one (reorg during the run);
+    the next update_task run resolves the fork through the intersection walk.
+    """
+    web3 = update_task.web3
+    discprov_config = update_task.shared_config["discprov"]
+    chunk_size = max(1, int(discprov_config["block_prefetch_chunk_size"]))
+    max_pending_chunks = max(1, int(discprov_config["block_prefetch_queue_size"]) // chunk_size)
+    num_workers = int(discprov_config["block_prefetch_concurrency"])
+    full_transactions = not uses_logs_indexing_mode()
+    # chunks fetch their receipts concurrently, split the receipt fetch concurrency between them
+    # so at most tx_receipt_fetch_concurrency receipt requests are in flight
+    num_receipt_workers = max(1, int(discprov_config["tx_receipt_fetch_concurrency"]) // num_workers)
+
+    def fetch_chunk(first_block_number, last_block_number):
+        blocks = [
+            web3.eth.getBlock(block_number, full_transactions)
+            for block_number in range(first_block_number, last_block_number + 1)
+        ]
+        if full_transactions:
+            block_tx_receipts = fetch_tx_receipts(blocks, num_receipt_workers)
+        else:
+            block_tx_receipts = fetch_tx_receipts_from_logs(blocks)
+        # IPFS data is resolved in the fetch worker, ahead of the writer
+        prefetch_ipfs_data(update_task, [tx for block_txs in block_tx_receipts.values() for tx in block_txs])
+        return [(block, block_tx_receipts.get(web3.toHex(block.hash), [])) for block in blocks]
+
+    pending = collections.deque()
+    next_block_number = start_block_number
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        try:
+            while pending or next_block_number <= end_block_number:
+                while next_block_number <= end_block_number and len(pending) < max_pending_chunks:
+                    last_block_number = min(next_block_number + chunk_size - 1, end_block_number)
+                    pending.append(executor.submit(fetch_chunk, next_block_number, last_block_number))
+                    next_block_number = last_block_number + 1
+
+                for (block, block_tx_receipts) in pending.popleft().result():
+                    if web3.toHex(block.parentHash) != parent_hash:
+                        logger.warning(
+                            f"index.py | prefetch_blocks | Block {block.number} parent "
+                            f"{web3.toHex(block.parentHash)} does not match {parent_hash}, stopping prefetch"
+                        )
+                        return
+                    parent_hash = web3.toHex(block.hash)
+                    yield block, block_tx_receipts
+        finally:
+            # Drop fetches that have not started if the consumer stopped early
+            for future in pending:
+                future.cancel()
+
+def get_canonical_current_block(db):
+    """Return the current db block if it is still on the canonical chain, else None.
+
+    When it is, every block above it can be fetched by number instead of walking
+    parent hashes back from the target block one request at a time.
+    """
+    with db.scoped_session() as session:
+        current_block = session.query(Block).filter_by(is_current=True).one()
+        session.expunge(current_block)
+
+    if current_block.number is None:
+        return None
+
+    chain_block = update_task.web3.eth.getBlock(current_block.number, False)
+    if chain_block is None or update_task.web3.toHex(chain_block.hash) != current_block.blockhash:
+        return None
+    return current_block
+
+def get_commit_batch_size(target_block_number, latest_block_number_from_chain):
+    """Number of blocks to write per db transaction. Batching only applies while
+    catching up, once the indexer reaches the chain head each block is committed on its own.
+    get_latest_block caps a run at block_processing_window blocks, which also bounds the batch."""
+    commit_batch_size = max(1, int(update_task.shared_config["discprov"]["index_commit_batch_size"]))
+    if target_block_number >= latest_block_number_from_chain:
+        return 1
+    return commit_batch_size
+
+def index_block(self, session, block, block_tx_receipts):
+    """Write a single block and its indexed transactions into session without committing.
+    Returns the Block model and the ids changed by the block, see get_empty_changed_ids."""
+    web3 = update_task.web3
+    block_number = block.number
+    block_timestamp = block.timestamp
+
+    # The block is marked current once its commit batch is written, see index_block_batch
+    block_model = Block(
+        blockhash=web3.toHex(block.hash),
+        parenthash=web3.toHex(block.parentHash),
+        number=block.number,
+        is_current=False,
+    )
+    session.add(block_model)
+
+    user_factory_txs = []
+    track_factory_txs = []
+    social_feature_factory_txs = []
+    playlist_factory_txs = []
+    user_library_factory_txs = []
+
+    # Parse tx events in each block, sorted by tx hash
+    # Receipts are only fetched for transactions sent to indexed contracts
+    for (tx_hash, tx_target_contract_address, tx_receipt) in block_tx_receipts:
+
+        # Handle user operations
+        if tx_target_contract_address == contract_addresses["user_factory"]:
+            logger.info(
+                f"index.py | index_blocks | UserFactory contract addr: {tx_target_contract_address}"
+                f" tx from block - {tx_hash}, receipt - {tx_receipt}, adding to user_factory_txs to process in bulk"
+            )
+            user_factory_txs.append(tx_receipt)
 
-                # Handle user operations
-                if tx_target_contract_address == contract_addresses["user_factory"]:
-                    logger.info(
-                        f"index.py | index_blocks | UserFactory contract addr: {tx_target_contract_address}"
-                        f" tx from block - {tx}, receipt - {tx_receipt}, adding to user_factory_txs to process in bulk"
-                    )
-                    user_factory_txs.append(tx_receipt)
+        # Handle track operations
+        if tx_target_contract_address == contract_addresses["track_factory"]:
+            logger.info(
+                f"index.py | index_blocks | TrackFactory contract addr: {tx_target_contract_address}"
+                f" tx from block - {tx_hash}, receipt - {tx_receipt}"
+            )
+            # Track state operations
+            track_factory_txs.append(tx_receipt)
+
+        # Handle social operations
+        if tx_target_contract_address == contract_addresses["social_feature_factory"]:
+            logger.info(
+                f"index.py | index_blocks | Social feature contract addr: {tx_target_contract_address}"
+                f"tx from block - {tx_hash}, receipt - {tx_receipt}"
+            )
+            social_feature_factory_txs.append(tx_receipt)
 
-                # Handle track operations
-                if tx_target_contract_address == contract_addresses["track_factory"]:
-                    logger.info(
-                        f"index.py | index_blocks | TrackFactory contract addr: {tx_target_contract_address}"
-                        f" tx from block - {tx}, receipt - {tx_receipt}"
-                    )
-                    # Track state operations
-                    track_factory_txs.append(tx_receipt)
+        # Handle repost operations
+        if tx_target_contract_address == contract_addresses["playlist_factory"]:
+            logger.info(
+                f"index.py | index_blocks | Playlist contract addr: {tx_target_contract_address}"
+                f"tx from block - {tx_hash}, receipt - {tx_receipt}"
+            )
+            playlist_factory_txs.append(tx_receipt)
 
-                # Handle social operations
-                if tx_target_contract_address == contract_addresses["social_feature_factory"]:
-                    logger.info(
-                        f"index.py | index_blocks | Social feature contract addr: {tx_target_contract_address}"
-                        f"tx from block - {tx}, receipt - {tx_receipt}"
-                    )
-                    social_feature_factory_txs.append(tx_receipt)
+        # Handle User Library operations
+        if tx_target_contract_address == contract_addresses["user_library_factory"]:
+            logger.info(
+                f"index.py | index_blocks | User Library contract addr: {tx_target_contract_address}"
+                f"tx from block - {tx_hash}, receipt - {tx_receipt}"
+            )
+            user_library_factory_txs.append(tx_receipt)
+
+    # bulk process operations once all tx's for block have been parsed
+    # Entity rows inserted here are the versions written by this block, they determine
+    # the search lexeme entries and aggregate counts to update.
+    # Leaving the block flushes so the next block in the same transaction sees this block's is_current updates
+    with track_changed_entities(session) as changed_ids:
+        user_state_update(
+            self, update_task, session, user_factory_txs, block_number, block_timestamp
+        )
 
-                # Handle repost operations
-                if tx_target_contract_address == contract_addresses["playlist_factory"]:
-                    logger.info(
-                        f"index.py | index_blocks | Playlist contract addr: {tx_target_contract_address}"
-                        f"tx from block - {tx}, receipt - {tx_receipt}"
-                    )
-                    playlist_factory_txs.append(tx_receipt)
+        track_state_update(
+            self, update_task, session, track_factory_txs, block_number, block_timestamp
+        )
 
-                # Handle User Library operations
-                if tx_target_contract_address == contract_addresses["user_library_factory"]:
-                    logger.info(
-                        f"index.py | index_blocks | User Library contract addr: {tx_target_contract_address}"
-                        f"tx from block - {tx}, receipt - {tx_receipt}"
-                    )
-                    user_library_factory_txs.append(tx_receipt)
+        social_feature_state_update(
+            self, update_task, session, social_feature_factory_txs, block_number, block_timestamp
+        )
 
-            # bulk process operations once all tx's for block have been parsed
-            user_state_changed = (
-                user_state_update(
-                    self, update_task, session, user_factory_txs, block_number, block_timestamp
-                )
-                > 0
-            )
+        # Playlist state operations processed in bulk
+        playlist_state_update(
+            self, update_task, session, playlist_factory_txs, block_number, block_timestamp
+        )
 
-            track_state_changed = (
-                track_state_update(
-                    self, update_task, session, track_factory_txs, block_number, block_timestamp
-                )
-                > 0
-            )
+        user_library_state_update(
+            self, update_task, session, user_library_factory_txs, block_number, block_timestamp
+        )
 
-            social_feature_state_changed = ( # pylint: disable=W0612
-                social_feature_state_update(
-                    self, update_task, session, social_feature_factory_txs, block_number, block_timestamp
-                )
-                > 0
-            )
+    return block_model, changed_ids
+
+def index_block_batch(self, session, block_iterator, commit_batch_size, stats):
+    """Write up to commit_batch_size blocks from block_iterator into a single transaction.
+    Returns the last block written, or None if block_iterator was already exhausted,
+    and the ids changed by the written blocks."""
+    current_block_query = session.query(Block).filter_by(is_current=True)
+    assert (
+        current_block_query.count() == 1
+    ), "Expected single row marked as current"
+    former_current_block = current_block_query.first()
+
+    last_block = None
+    last_block_model = None
+    changed_ids = get_empty_changed_ids()
+    while stats["num_blocks_in_batch"] < commit_batch_size:
+        # Time spent waiting on the next block is fetch time not hidden by the pipeline
+        fetch_start = time.time()
+        next_entry = next(block_iterator, None)
+        if next_entry is None:
+            break
+        fetch_wait = time.time() - fetch_start
+        write_start = time.time()
+
+        (block, block_tx_receipts) = next_entry
+        stats["num_blocks"] += 1
+        stats["num_blocks_in_batch"] += 1
+        if stats["num_blocks"] % 10 == 0:
+            logger.info(f"index.py | index_blocks | processing block {stats['num_blocks']}, number {block.number}")
+
+        (last_block_model, block_changed_ids) = index_block(self, session, block, block_tx_receipts)
+        for key, ids in block_changed_ids.items():
+            changed_ids[key].update(ids)
+        last_block = block
+
+        write_duration = time.time() - write_start
+        stats["fetch_wait"] += fetch_wait
+        stats["write"] += write_duration
+        logger.debug(
+            f"index.py | index_blocks | block {block.number} fetch_wait={fetch_wait:.3f}s write={write_duration:.3f}s"
+        )
 
-            # Playlist state operations processed in bulk
-            playlist_state_changed = playlist_state_update(
-                self, update_task, session, playlist_factory_txs, block_number, block_timestamp
-            )
+    if last_block_model is None:
+        return (None, changed_ids)
+
+    # Move the current block pointer once per transaction, so it only ever
+    # references a block whose batch has been committed
+    former_current_block.is_current = False
+    last_block_model.is_current = True
+
+    # keep search lexeme dictionaries and aggregate counts in sync with db, once per transaction
+    # write out all pending transactions to db before updating them
+    session.flush()
+    update_lexeme_dicts(session, changed_ids["user"], changed_ids["track"], changed_ids["playlist"])
+    update_aggregates(
+        session,
+        changed_ids["user_aggregates"],
+        changed_ids["track_aggregates"],
+        changed_ids["playlist_aggregates"]
+    )
+    return (last_block, changed_ids)
+
+def index_blocks(self, db, blocks, commit_batch_size=1):
+    """Index blocks, an iterable of (block, block tx receipts) in ascending block order,
+    as produced by get_block_window or prefetch_blocks. Up to commit_batch_size blocks
+    are written per db transaction."""
+    redis = update_task.redis
 
-            user_library_state_changed = user_library_state_update( # pylint: disable=W0612
-                self, update_task, session, user_library_factory_txs, block_number, block_timestamp
-            )
+    stats = {"num_blocks": 0, "num_commits": 0, "fetch_wait": 0, "write": 0, "commit": 0, "feed_fan_out": 0}
+    block_iterator = iter(blocks)
+    while True:
+        stats["num_blocks_in_batch"] = 0
+        with db.scoped_session() as session:
+            (last_block, changed_ids) = index_block_batch(self, session, block_iterator, commit_batch_size, stats)
+            commit_start = time.time()
+        if last_block is None:
+            break
+        stats["commit"] += time.time() - commit_start
+        stats["num_commits"] += 1
+
+        # add the block number of the most recently committed block to redis
+        redis.set(most_recent_indexed_block_redis_key, last_block.number)
+        # evict cached followee sets and feed timelines only once the follow changes are visible to readers
+        invalidate_followee_ids(redis, changed_ids["follower"])
+        invalidate_feed_timelines(redis, changed_ids["follower"])
+        invalidate_autocomplete_cache(redis, changed_ids["user"], changed_ids["track"], changed_ids["playlist"])
+
+        # push new activity into followers' feed timelines once it is visible to readers
+        if feed_timeline_enabled() and changed_ids["feed_activity"]:
+            fan_out_start = time.time()
+            with db.scoped_session() as session:
+                fan_out_feed_activity(session, redis, changed_ids["feed_activity"])
+            stats["feed_fan_out"] += time.time() - fan_out_start
 
-            # keep search materialized view in sync with db
-            # only refresh track_lexeme_dict when necessary
-            # social state changes are not factored in since they don't affect track_lexeme_dict
-            # write out all pending transactions to db before refreshing view
-            track_lexeme_state_changed = (user_state_changed or track_state_changed)
-            session.flush()
-            if user_state_changed:
-                session.execute("REFRESH MATERIALIZED VIEW user_lexeme_dict")
-            if track_lexeme_state_changed:
-                session.execute("REFRESH MATERIALIZED VIEW track_lexeme_dict")
-            if playlist_state_changed:
-                session.execute("REFRESH MATERIALIZED VIEW playlist_lexeme_dict")
-                session.execute("REFRESH MATERIALIZED VIEW album_lexeme_dict")
-
-        # add the block number of the most recently processed block to redis
-        redis.set(most_recent_indexed_block_redis_key, block.number)
+        if stats["num_blocks_in_batch"] < commit_batch_size:
+            break
 
+    num_blocks = stats["num_blocks"]
     if num_blocks > 0:
-        logger.warning(f"index.py | index_blocks | Indexed {num_blocks} blocks")
+        logger.warning(
+            f"index.py | index_blocks | Indexed {num_blocks} blocks in {stats['num_commits']} commits, "
+            f"fetch_wait={stats['fetch_wait']:.3f}s ({stats['fetch_wait'] / num_blocks:.3f}s/block), "
+            f"write={stats['write']:.3f}s ({stats['write'] / num_blocks:.3f}s/block), "
+            f"commit={stats['commit']:.3f}s, feed_fan_out={stats['feed_fan_out']:.3f}s"
+        )
+        logger.info(
+            f"index.py | index_blocks | IPFS metadata cache {update_task.ipfs_client.metadata_cache_metrics()}"
+        )
 
 # transactions are reverted in reverse dependency order (social features --> playlists --> tracks --> users)
 def revert_blocks(self, db, revert_blocks_list):
@@ -244,9 +528,8 @@ def revert_blocks(self, db, revert_blocks_list):
 
     with db.scoped_session() as session:
 
-        rebuild_playlist_index = False
-        rebuild_track_index = False
-        rebuild_user_index = False
+        # ids whose search lexeme entries and aggregate counts need recomputing
+        reverted_ids = get_empty_changed_ids()
 
         for revert_block in revert_blocks_list:
             # Cache relevant information about current block
@@ -390,17 +673,28 @@ def revert_blocks(self, db, revert_blocks_list):
             # Remove outdated block entry
             session.query(Block).filter(Block.blockhash == revert_hash).delete()
 
-            rebuild_playlist_index = rebuild_playlist_index or bool(revert_playlist_entries)
-            rebuild_track_index = rebuild_track_index or bool(revert_track_entries)
-            rebuild_user_index = rebuild_user_index or bool(revert_user_entries)
+            for reverted_entry in (
+                    revert_save_entries + revert_repost_entries + revert_follow_entries +
+                    revert_playlist_entries + revert_track_entries + revert_user_entries
+            ):
+                add_changed_entity(reverted_ids, reverted_entry)
+
+        session.flush()
+        update_lexeme_dicts(session, reverted_ids["user"], reverted_ids["track"], reverted_ids["playlist"])
+        update_aggregates(
+            session,
+            reverted_ids["user_aggregates"],
+            reverted_ids["track_aggregates"],
+            reverted_ids["playlist_aggregates"]
+        )
 
-        if rebuild_playlist_index:
-            session.execute("REFRESH MATERIALIZED VIEW playlist_lexeme_dict")
-            session.execute("REFRESH MATERIALIZED VIEW album_lexeme_dict")
-        if rebuild_user_index or rebuild_track_index:
-            session.execute("REFRESH MATERIALIZED VIEW track_lexeme_dict")
-        if rebuild_user_index:
-            session.execute("REFRESH MATERIALIZED VIEW user_lexeme_dict")
+    invalidate_followee_ids(update_task.redis, reverted_ids["follower"])
+    # reverted activity is not removed from other feed timelines, deleted entities are filtered
+    # out on read and anything else is dropped once the timeline expires or is reseeded
+    invalidate_feed_timelines(update_task.redis, reverted_ids["follower"])
+    invalidate_autocomplete_cache(
+        update_task.redis, reverted_ids["user"], reverted_ids["track"], reverted_ids["playlist"]
+    )
 
     # TODO - if we enable revert, need to set the most_recent_indexed_block_redis_key key in redis
 
@@ -478,7 +772,7 @@ def update_task(self):
     redis = update_task.redis
 
     # Update redis cache for health check queries
-    update_latest_block_redis()
+    latest_block_number_from_chain = update_latest_block_redis()
 
     # Define lock acquired boolean
     have_lock = False
@@ -495,6 +789,23 @@ def update_task(self):
             initialize_blocks_table_if_necessary(db)
 
             latest_block = get_latest_block(db)
+            commit_batch_size = get_commit_batch_size(latest_block.number, latest_block_number_from_chain)
+
+            # If the current db block is still canonical nothing needs to be reverted,
+            # so blocks up to the target are prefetched by number and indexed as they arrive
+            canonical_current_block = get_canonical_current_block(db)
+            if canonical_current_block is not None:
+                index_blocks(
+                    self,
+                    db,
+                    prefetch_blocks(
+                        canonical_current_block.number + 1,
+                        latest_block.number,
+                        canonical_current_block.blockhash
+                    ),
+                    commit_batch_size
+                )
+                return
 
             # Capture block information between latest and target block hash
             index_blocks_list = []
@@ -546,7 +857,7 @@ def update_task(self):
                         block_intersection_found = True
                         intersect_block_hash = default_config_start_hash
                     else:
-                        latest_block = web3.eth.getBlock(parent_hash, True)
+                        latest_block = web3.eth.getBlock(parent_hash, not uses_logs_indexing_mode())
                         intersect_block_hash = web3.toHex(latest_block.hash)
 
                 # Determine whether current indexed data (is_current == True) matches the
@@ -602,7 +913,7 @@ def update_task(self):
             revert_blocks(self, db, revert_blocks_list)
 
             # Perform indexing operations
-            index_blocks(self, db, index_blocks_list)
+            index_blocks(self, db, get_block_window(index_blocks_list), commit_batch_size)
         else:
             logger.info("index.py | update_task | Failed to acquire disc_prov_lock")
     except Exception as e:
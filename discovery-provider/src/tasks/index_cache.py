@@ -1,28 +1,50 @@
 import logging
-import json
 from src.tasks.celery_app import celery
-from src.tasks.generate_trending import generate_trending, trending_cache_hits_key, \
+from src.tasks.generate_trending import generate_trending_rankings, trending_cache_hits_key, \
         trending_cache_miss_key, trending_cache_total_key
+from src.utils.trending_cache import set_trending_rankings, get_trending_refresh_lock, \
+        get_trending_page, trending_cache_max_entries
 
 logger = logging.getLogger(__name__)
 
 
 ######## HELPER FUNCTIONS ########
-def update_trending_cache(self, db, redis, time):
-    resp = generate_trending(db, time, None, 1000, 0)
-    resp_json = json.dumps(resp)
-    redis_key = f"trending-{time}"
-    # Cache value for 5 minutes
-    redis.set(redis_key, resp_json, 300)
-    logger.warning(f"index_cache.py | Updated trending cache {redis_key}")
+def refresh_trending_cache(db, redis, time):
+    # Rank every genre in the same pass as the overall ranking
+    rankings = generate_trending_rankings(db, time, trending_cache_max_entries)
+    set_trending_rankings(redis, time, rankings)
+    logger.warning(f"index_cache.py | Updated trending cache {time}, {len(rankings) - 1} genres")
+
+def update_trending_cache(db, redis, time, blocking_timeout=None):
+    """ Recompute the cached trending rankings of time, unless another worker holds the
+        refresh lock of time. With blocking_timeout, wait up to blocking_timeout seconds for
+        that worker instead and skip the recompute if it cached the rankings meanwhile.
+        Returns whether the rankings are cached.
+    """
+    refresh_lock = get_trending_refresh_lock(redis, time)
+    have_lock = refresh_lock.acquire(
+        blocking=blocking_timeout is not None, blocking_timeout=blocking_timeout
+    )
+    if not have_lock:
+        logger.info(f"index_cache.py | Trending cache {time} is being refreshed by another worker")
+        return False
+    try:
+        if blocking_timeout is not None:
+            (_, age) = get_trending_page(redis, time, None, 1, 0)
+            if age is not None:
+                return True
+        refresh_trending_cache(db, redis, time)
+        return True
+    finally:
+        refresh_lock.release()
 
 # Update cache for all trending timeframes
 def update_all_trending_cache(self, db, redis):
     logger.warning(f"index_cache.py | Update all trending cache")
-    update_trending_cache(self, db, redis, "day")
-    update_trending_cache(self, db, redis, "week")
-    update_trending_cache(self, db, redis, "month")
-    update_trending_cache(self, db, redis, "year")
+    update_trending_cache(db, redis, "day")
+    update_trending_cache(db, redis, "week")
+    update_trending_cache(db, redis, "month")
+    update_trending_cache(db, redis, "year")
 
 def print_cache_statistics(self, redis):
     total = redis.get(trending_cache_total_key)
@@ -0,0 +1,183 @@
+import logging
+from datetime import datetime, timedelta
+from urllib.parse import urljoin
+import sqlalchemy
+from src.tasks.celery_app import celery
+from src.utils.http_session import get_http_session
+from src.utils.redis_constants import listen_counts_ingested_until_redis_key
+
+logger = logging.getLogger(__name__)
+
+# Listen counts are recorded by identity service in hourly buckets. This task copies them into
+# track_listen_counts and recomputes track_trending_scores, so /trending is a local indexed read.
+#
+# Everything before the ingested_until hour (kept in redis) has been copied. Hours older than
+# hourly_ingestion_hours are backfilled a day at a time into a single bucket at the start of
+# the day, more recent hours get hourly buckets. The bucket of the previous and current hour
+# are re-read on every run since identity service is still incrementing them.
+
+# Trending time ranges, matching identity service's /tracks/trending/<time>
+trending_time_ranges = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "year": timedelta(days=360),
+}
+
+hourly_ingestion_hours = 48
+
+# Max listen count entries identity service returns per request
+listen_counts_page_size = 500
+
+upsert_listen_counts_query = """
+    INSERT INTO track_listen_counts (track_id, hour, listens)
+    VALUES (:track_id, :hour, :listens)
+    ON CONFLICT (track_id, hour) DO UPDATE SET listens = EXCLUDED.listens
+"""
+
+# Rankings barely change between runs, so only rows whose listens changed are written and
+# only tracks that dropped out of the range are deleted, keeping table churn and vacuum work low
+refresh_trending_scores_query = """
+    WITH scores AS (
+        SELECT track_id, sum(listens) AS listens
+        FROM track_listen_counts
+        WHERE hour >= :since
+        GROUP BY track_id
+    ), dropped AS (
+        DELETE FROM track_trending_scores
+        WHERE time_range = :time_range
+        AND NOT EXISTS (SELECT 1 FROM scores WHERE scores.track_id = track_trending_scores.track_id)
+    )
+    INSERT INTO track_trending_scores (time_range, track_id, listens)
+    SELECT :time_range, track_id, listens
+    FROM scores
+    ON CONFLICT (time_range, track_id) DO UPDATE SET listens = EXCLUDED.listens
+    WHERE track_trending_scores.listens != EXCLUDED.listens;
+"""
+
+
+######## HELPER FUNCTIONS ########
+def get_current_hour():
+    return datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+
+def to_identity_timestamp(timestamp):
+    # ISO 8601 UTC with millisecond precision, as parsed by identity service
+    return timestamp.strftime("%Y-%m-%dT%H:%M:%S.") + f"{timestamp.microsecond // 1000:03d}Z"
+
+
+def fetch_listen_counts(identity_url, start, end):
+    """Return a dict of track id --> listens within [start, end) from identity service"""
+    identity_listens_endpoint = urljoin(identity_url, "/tracks/listens/day")
+    listen_counts = {}
+    offset = 0
+    while True:
+        post_body = {
+            # identity service treats both bounds as inclusive
+            "startTime": to_identity_timestamp(start),
+            "endTime": to_identity_timestamp(end - timedelta(milliseconds=1)),
+            "limit": listen_counts_page_size,
+            "offset": offset,
+        }
+        # pages are ordered by (listens, trackId). A count changing between page reads of the
+        # still accumulating hours can still shift an entry across pages, those two hours are
+        # re-read on every run so the next run corrects them. Completed hours are stable.
+        resp = get_http_session().post(identity_listens_endpoint, json=post_body)
+        resp.raise_for_status()
+        num_entries = 0
+        # a window within a single day yields a single date entry, so one entry per track -
+        # an entry repeated across pages is assigned rather than summed to never double count
+        for date_entry in resp.json().values():
+            for listen_count in date_entry["listenCounts"]:
+                listen_counts[listen_count["trackId"]] = int(listen_count["listens"])
+                num_entries += 1
+        if num_entries < listen_counts_page_size:
+            return listen_counts
+        offset += listen_counts_page_size
+
+
+def ingest_listen_counts(session, identity_url, start, end):
+    listen_counts = fetch_listen_counts(identity_url, start, end)
+    if listen_counts:
+        session.execute(
+            sqlalchemy.text(upsert_listen_counts_query),
+            [
+                {"track_id": track_id, "hour": start, "listens": listens}
+                for (track_id, listens) in listen_counts.items()
+            ]
+        )
+    return len(listen_counts)
+
+
+def get_ingestion_windows(ingested_until, current_hour, max_windows):
+    """Return the [start, end) windows to ingest next, oldest first"""
+    windows = []
+    hourly_since = current_hour - timedelta(hours=hourly_ingestion_hours)
+    # the previous hour is re-read on every run, only advance up to it
+    while ingested_until < current_hour - timedelta(hours=1) and len(windows) < max_windows:
+        day_end = ingested_until + timedelta(days=1)
+        if ingested_until.hour == 0 and day_end <= hourly_since:
+            windows.append((ingested_until, day_end))
+        else:
+            windows.append((ingested_until, ingested_until + timedelta(hours=1)))
+        ingested_until = windows[-1][1]
+    return windows
+
+
+def update_listen_counts(self, db, redis):
+    shared_config = update_listen_counts_task.shared_config
+    identity_url = shared_config["discprov"]["identity_service_url"]
+    max_windows = int(shared_config["discprov"]["listen_counts_windows_per_run"])
+    current_hour = get_current_hour()
+
+    ingested_until = redis.get(listen_counts_ingested_until_redis_key)
+    if ingested_until is not None:
+        ingested_until = datetime.fromisoformat(ingested_until.decode("utf-8"))
+    else:
+        backfill_days = int(shared_config["discprov"]["listen_counts_backfill_days"])
+        ingested_until = (current_hour - timedelta(days=backfill_days)).replace(hour=0)
+
+    # backfill / catch up, committing each window so progress survives a failed run
+    for (start, end) in get_ingestion_windows(ingested_until, current_hour, max_windows):
+        with db.scoped_session() as session:
+            num_tracks = ingest_listen_counts(session, identity_url, start, end)
+        redis.set(listen_counts_ingested_until_redis_key, end.isoformat())
+        logger.info(f"index_listen_counts.py | Ingested {num_tracks} track listen counts {start} - {end}")
+
+    # refresh the still accumulating buckets and recompute trending scores in one transaction
+    with db.scoped_session() as session:
+        for start in (current_hour - timedelta(hours=1), current_hour):
+            ingest_listen_counts(session, identity_url, start, start + timedelta(hours=1))
+        for (time_range, time_delta) in trending_time_ranges.items():
+            session.execute(
+                sqlalchemy.text(refresh_trending_scores_query),
+                {"time_range": time_range, "since": current_hour - time_delta}
+            )
+    logger.info(f"index_listen_counts.py | Updated trending scores as of {current_hour}")
+
+
+######## CELERY TASKS ########
+@celery.task(name="update_listen_counts", bind=True)
+def update_listen_counts_task(self):
+    # Cache custom task class properties
+    # Details regarding custom task context can be found in wiki
+    # Custom Task definition can be found in src/__init__.py
+    db = update_listen_counts_task.db
+    redis = update_listen_counts_task.redis
+    # Define lock acquired boolean
+    have_lock = False
+    # Define redis lock object
+    update_lock = redis.lock("update_listen_counts_lock", timeout=7200)
+    try:
+        # Attempt to acquire lock - do not block if unable to acquire
+        have_lock = update_lock.acquire(blocking=False)
+        if have_lock:
+            update_listen_counts(self, db, redis)
+        else:
+            logger.info("index_listen_counts.py | Failed to acquire update_listen_counts_lock")
+    except Exception as e:
+        logger.error("index_listen_counts.py | Fatal error in main loop", exc_info=True)
+        raise e
+    finally:
+        if have_lock:
+            update_lock.release()
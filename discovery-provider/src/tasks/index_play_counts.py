@@ -0,0 +1,32 @@
+import logging
+from src.tasks.celery_app import celery
+from src.utils.play_count_cache import refresh_hot_play_counts
+
+logger = logging.getLogger(__name__)
+
+
+######## CELERY TASKS ########
+@celery.task(name="update_play_counts", bind=True)
+def update_play_counts_task(self):
+    # Cache custom task class properties
+    # Details regarding custom task context can be found in wiki
+    # Custom Task definition can be found in src/__init__.py
+    redis = update_play_counts_task.redis
+    # Define lock acquired boolean
+    have_lock = False
+    # Define redis lock object
+    update_lock = redis.lock("update_play_counts_lock", timeout=600)
+    try:
+        # Attempt to acquire lock - do not block if unable to acquire
+        have_lock = update_lock.acquire(blocking=False)
+        if have_lock:
+            num_tracks = refresh_hot_play_counts(redis)
+            logger.info(f"index_play_counts.py | Refreshed play counts of {num_tracks} hot tracks")
+        else:
+            logger.info("index_play_counts.py | Failed to acquire update_play_counts_lock")
+    except Exception as e:
+        logger.error("index_play_counts.py | Fatal error in main loop", exc_info=True)
+        raise e
+    finally:
+        if have_lock:
+            update_lock.release()
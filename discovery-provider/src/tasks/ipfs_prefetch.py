@@ -0,0 +1,140 @@
+import logging
+from src import contract_addresses
+from src.models import User, BlacklistedIPLD
+from src.tasks.tracks import track_event_types_lookup
+from src.tasks.metadata import track_metadata_format, user_metadata_format
+from src.utils import helpers, multihash
+from src.utils.user_event_constants import user_event_types_lookup
+from src.utils.playlist_event_constants import playlist_event_types_lookup
+
+logger = logging.getLogger(__name__)
+
+# IPFS data referenced by a block window is resolved ahead of the db transaction that indexes it.
+# update_task is the index task, see src/tasks/index.py
+
+
+def get_ipfs_references(update_task, block_tx_receipts):
+    """Return the IPFS data referenced directly by events in block_tx_receipts, a list of
+    (tx hash, target contract address, tx receipt), as ([track metadata multihash],
+    [(user id, user metadata multihash)], {id of user made a creator}, [image multihash])."""
+    web3 = update_task.web3
+    abi_values = update_task.abi_values
+    track_contract = web3.eth.contract(
+        address=contract_addresses["track_factory"], abi=abi_values["TrackFactory"]["abi"]
+    )
+    user_contract = web3.eth.contract(
+        address=contract_addresses["user_factory"], abi=abi_values["UserFactory"]["abi"]
+    )
+    playlist_contract = web3.eth.contract(
+        address=contract_addresses["playlist_factory"], abi=abi_values["PlaylistFactory"]["abi"]
+    )
+
+    track_multihashes = []
+    user_multihashes = []
+    creator_user_ids = set()
+    image_multihashes = []
+    for (_, tx_target_contract_address, tx_receipt) in block_tx_receipts:
+        if tx_target_contract_address == contract_addresses["track_factory"]:
+            for event_type in (track_event_types_lookup["new_track"], track_event_types_lookup["update_track"]):
+                for entry in getattr(track_contract.events, event_type)().processReceipt(tx_receipt):
+                    buf = multihash.encode(
+                        bytes.fromhex(entry["args"]._multihashDigest.hex()), entry["args"]._multihashHashFn
+                    )
+                    track_multihashes.append(multihash.to_b58_string(buf))
+
+        if tx_target_contract_address == contract_addresses["user_factory"]:
+            event_type = user_event_types_lookup["update_multihash"]
+            for entry in getattr(user_contract.events, event_type)().processReceipt(tx_receipt):
+                metadata_multihash = helpers.multihash_digest_to_cid(entry["args"]._multihashDigest)
+                user_multihashes.append((entry["args"]._userId, metadata_multihash))
+
+            event_type = user_event_types_lookup["update_is_creator"]
+            for entry in getattr(user_contract.events, event_type)().processReceipt(tx_receipt):
+                if entry["args"]._isCreator:
+                    creator_user_ids.add(entry["args"]._userId)
+
+            event_type = user_event_types_lookup["update_profile_photo"]
+            for entry in getattr(user_contract.events, event_type)().processReceipt(tx_receipt):
+                image_multihashes.append(helpers.multihash_digest_to_cid(entry["args"]._profilePhotoDigest))
+
+            event_type = user_event_types_lookup["update_cover_photo"]
+            for entry in getattr(user_contract.events, event_type)().processReceipt(tx_receipt):
+                image_multihashes.append(helpers.multihash_digest_to_cid(entry["args"]._coverPhotoDigest))
+
+        if tx_target_contract_address == contract_addresses["playlist_factory"]:
+            event_type = playlist_event_types_lookup["playlist_cover_photo_updated"]
+            for entry in getattr(playlist_contract.events, event_type)().processReceipt(tx_receipt):
+                image_multihashes.append(
+                    helpers.multihash_digest_to_cid(entry["args"]._playlistImageMultihashDigest)
+                )
+    return track_multihashes, user_multihashes, creator_user_ids, image_multihashes
+
+
+def get_metadata_image_multihashes(metadata):
+    """Return the image CIDs a track or user metadata object will set, as read by
+    populate_track_record_metadata and parse_user_event."""
+    image_multihashes = []
+    for field in ("cover_art", "profile_picture", "cover_photo"):
+        image_multihash = metadata.get(f"{field}_sizes") or metadata.get(field)
+        if image_multihash:
+            image_multihashes.append(image_multihash)
+    return image_multihashes
+
+
+def prefetch_ipfs_data(update_task, block_tx_receipts):
+    """Resolve the IPFS metadata referenced in block_tx_receipts, then whether each image
+    CID they reference is a directory, concurrently and ahead of the db transaction that
+    indexes them, so parse_*_event calls don't wait on the network.
+
+    Only data indexing reads is prefetched: blacklisted CIDs are skipped, and user metadata only
+    for creators with a handle, matching get_metadata_overrides_from_ipfs."""
+    ipfs_client = update_task.ipfs_client
+    num_workers = int(update_task.shared_config["discprov"]["ipfs_metadata_fetch_concurrency"])
+    (track_multihashes, user_multihashes, creator_user_ids, image_multihashes) = \
+        get_ipfs_references(update_task, block_tx_receipts)
+    if not (track_multihashes or user_multihashes or image_multihashes):
+        return
+
+    with update_task.db.scoped_session() as session:
+        # users made a creator within the window are creators by the time their metadata is read,
+        # they may not be in the db yet so their handle is assumed to be set
+        user_ids = {user_id for (user_id, _) in user_multihashes} - creator_user_ids
+        if user_ids:
+            creator_users = (
+                session.query(User.user_id)
+                .filter(
+                    User.is_current == True,
+                    User.is_creator == True,
+                    User.handle != None,
+                    User.user_id.in_(user_ids)
+                )
+                .all()
+            )
+            creator_user_ids.update(user_id for (user_id,) in creator_users)
+
+        multihash_formats = [(track_multihash, track_metadata_format) for track_multihash in track_multihashes]
+        multihash_formats.extend(
+            (user_multihash, user_metadata_format)
+            for (user_id, user_multihash) in user_multihashes if user_id in creator_user_ids
+        )
+
+        cids = [cid for (cid, _) in multihash_formats] + image_multihashes
+        blacklisted_multihashes = set(
+            ipld for (ipld,) in
+            session.query(BlacklistedIPLD.ipld).filter(BlacklistedIPLD.ipld.in_(cids)).all()
+        )
+
+    multihash_formats = [
+        (cid, metadata_format) for (cid, metadata_format) in multihash_formats
+        if cid not in blacklisted_multihashes
+    ]
+    image_multihashes = [
+        image_multihash for image_multihash in image_multihashes
+        if image_multihash not in blacklisted_multihashes
+    ]
+    if multihash_formats:
+        prefetched_metadata = ipfs_client.prefetch_metadata(multihash_formats, num_workers)
+        for metadata in prefetched_metadata.values():
+            image_multihashes.extend(get_metadata_image_multihashes(metadata))
+    if image_multihashes:
+        ipfs_client.prefetch_multihash_types(image_multihashes, num_workers)
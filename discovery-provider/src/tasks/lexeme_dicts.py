@@ -0,0 +1,172 @@
+import logging
+import sqlalchemy
+from src.utils.config import shared_config
+
+logger = logging.getLogger(__name__)
+
+# Search lexeme dictionaries are regular tables kept in sync by the indexer.
+# Each query below mirrors the former materialized view definition, restricted to
+# the entity ids changed in the current transaction, so updates cost O(changed rows)
+# rather than O(catalog) and never take the exclusive lock REFRESH MATERIALIZED VIEW did.
+
+user_lexeme_query = """
+    SELECT * FROM (
+      SELECT
+        u.user_id,
+        unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(u."name", ''), '&', 'and')) ||
+        to_tsvector('audius_ts_config', COALESCE(u."handle", '')))) as word
+      FROM
+          "users" u
+      WHERE u."is_current" = true and u."is_ready" = true {filter}
+      GROUP BY u."user_id", u."name", u."handle"
+    ) AS words
+"""
+
+track_lexeme_query = """
+    SELECT * FROM (
+      SELECT
+        t.track_id,
+        unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(t."title", ''), '&', 'and'))))
+          as word
+      FROM
+          "tracks" t
+      INNER JOIN "users" u ON t."owner_id" = u."user_id"
+      WHERE t."is_current" = true and u."is_ready" = true and u."is_current" = true {filter}
+      GROUP BY t."track_id", t."title", t."tags"
+    ) AS words
+"""
+
+playlist_lexeme_query = """
+    SELECT * FROM (
+      SELECT
+        p.playlist_id,
+        unnest(tsvector_to_array(to_tsvector('audius_ts_config', replace(COALESCE(p."playlist_name", ''), '&', 'and'))))
+          as word
+      FROM
+          "playlists" p
+      WHERE p."is_current" = true and p."is_album" = {is_album} and p."is_private" = false {filter}
+      GROUP BY p."playlist_id", p."playlist_name"
+    ) AS words
+"""
+
+
+def update_user_lexeme_dict(session, user_ids):
+    if not user_ids:
+        return
+    ids = list(user_ids)
+    session.execute(
+        sqlalchemy.text("DELETE FROM user_lexeme_dict WHERE user_id = ANY(:ids)"),
+        {"ids": ids}
+    )
+    session.execute(
+        sqlalchemy.text(
+            "INSERT INTO user_lexeme_dict (user_id, word) " +
+            user_lexeme_query.format(filter='and u."user_id" = ANY(:ids)')
+        ),
+        {"ids": ids}
+    )
+
+
+def update_track_lexeme_dict(session, track_ids, owner_ids):
+    """Recompute words for track_ids and for every track owned by owner_ids, since
+    track search rows depend on the owner being current and ready."""
+    if not track_ids and not owner_ids:
+        return
+    params = {"track_ids": list(track_ids), "owner_ids": list(owner_ids)}
+    session.execute(
+        sqlalchemy.text(
+            """
+            DELETE FROM track_lexeme_dict WHERE track_id = ANY(:track_ids) OR track_id IN (
+                SELECT track_id FROM tracks WHERE owner_id = ANY(:owner_ids)
+            )
+            """
+        ),
+        params
+    )
+    session.execute(
+        sqlalchemy.text(
+            "INSERT INTO track_lexeme_dict (track_id, word) " +
+            track_lexeme_query.format(
+                filter='and (t."track_id" = ANY(:track_ids) or t."owner_id" = ANY(:owner_ids))'
+            )
+        ),
+        params
+    )
+
+
+def update_playlist_lexeme_dicts(session, playlist_ids):
+    """Update both playlist_lexeme_dict and album_lexeme_dict, a playlist may move
+    between them or become private."""
+    if not playlist_ids:
+        return
+    ids = list(playlist_ids)
+    for (table_name, is_album) in (("playlist_lexeme_dict", "false"), ("album_lexeme_dict", "true")):
+        session.execute(
+            sqlalchemy.text(f"DELETE FROM {table_name} WHERE playlist_id = ANY(:ids)"),
+            {"ids": ids}
+        )
+        session.execute(
+            sqlalchemy.text(
+                f"INSERT INTO {table_name} (playlist_id, word) " +
+                playlist_lexeme_query.format(is_album=is_album, filter='and p."playlist_id" = ANY(:ids)')
+            ),
+            {"ids": ids}
+        )
+
+
+# Change feed of the in-process search index (src/utils/search_index.py), written in the same
+# transaction as the lexeme entries it points to. Track entries of owner_ids change along with
+# the owner, so those tracks are recorded too. Changes older than the retention are pruned here.
+record_search_index_changes_query = """
+    INSERT INTO search_index_changes (entity_type, entity_id, created_at)
+    SELECT 'user', user_id, now() FROM unnest(CAST(:user_ids AS integer[])) AS ids(user_id)
+    UNION ALL
+    SELECT DISTINCT 'track', track_id, now() FROM tracks
+    WHERE track_id = ANY(:track_ids) OR owner_id = ANY(:owner_ids)
+    UNION ALL
+    SELECT 'playlist', playlist_id, now() FROM unnest(CAST(:playlist_ids AS integer[])) AS ids(playlist_id);
+
+    DELETE FROM search_index_changes WHERE created_at < now() - :retention_sec * interval '1 second';
+"""
+
+
+def record_search_index_changes(session, user_ids, track_ids, playlist_ids):
+    if not user_ids and not track_ids and not playlist_ids:
+        return
+    session.execute(
+        sqlalchemy.text(record_search_index_changes_query),
+        {
+            "user_ids": list(user_ids),
+            "track_ids": list(track_ids),
+            "owner_ids": list(user_ids),
+            "playlist_ids": list(playlist_ids),
+            "retention_sec": int(shared_config["discprov"]["search_index_change_retention_sec"]),
+        }
+    )
+
+
+def update_lexeme_dicts(session, user_ids, track_ids, playlist_ids):
+    """Bring all lexeme dictionaries up to date for the changed entity ids.
+    Pending changes must be flushed to the session first."""
+    update_user_lexeme_dict(session, user_ids)
+    update_track_lexeme_dict(session, track_ids, user_ids)
+    update_playlist_lexeme_dicts(session, playlist_ids)
+    record_search_index_changes(session, user_ids, track_ids, playlist_ids)
+
+
+def rebuild_lexeme_dicts(session):
+    """Recompute every lexeme dictionary from scratch, used for backfill."""
+    rebuild_queries = [
+        ("user_lexeme_dict", "user_id", user_lexeme_query.format(filter="")),
+        ("track_lexeme_dict", "track_id", track_lexeme_query.format(filter="")),
+        ("playlist_lexeme_dict", "playlist_id", playlist_lexeme_query.format(is_album="false", filter="")),
+        ("album_lexeme_dict", "playlist_id", playlist_lexeme_query.format(is_album="true", filter="")),
+    ]
+    for (table_name, id_column, query) in rebuild_queries:
+        logger.info(f"lexeme_dicts.py | rebuild_lexeme_dicts | rebuilding {table_name}")
+        session.execute(f"DELETE FROM {table_name}")
+        session.execute(f"INSERT INTO {table_name} ({id_column}, word) {query}")
+    # in-process search indexes reload everything
+    session.execute(
+        "INSERT INTO search_index_changes (entity_type, entity_id, created_at) VALUES ('all', 0, now())"
+    )
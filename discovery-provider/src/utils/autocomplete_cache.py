@@ -0,0 +1,155 @@
+import json
+import logging
+from src.utils.config import shared_config
+from src.utils.search_index import get_trigrams, get_lexeme_score
+from src.utils.redis_constants import autocomplete_cache_redis_key_prefix, \
+        autocomplete_cache_generations_redis_key, autocomplete_cache_metrics_redis_key
+
+logger = logging.getLogger(__name__)
+
+# Redis cache of /search/autocomplete result ids, hydrated on every request.
+#
+# Entries are keyed by result kind, limit, offset and the normalized query, and hold the
+# ranked ids. A query missing from the cache may be answered from its longest cached prefix
+# whose results were exhaustive (fewer than limit from offset 0): such entries also keep the
+# name and lexeme words of each result, which are rescored against the query with the
+# pg_trgm similarity the search queries rank by (see get_lexeme_score), dropping results that
+# no longer match.
+#
+# Prefix hits are approximate: trigram similarity does not grow monotonically as a query is
+# extended, so the longer query can match entities that scored below min_similarity for the
+# prefix and are missing from its results. Prefix serving trades those for a db round trip on
+# most keystrokes and is off unless autocomplete_cache_prefix_hits_enabled is set.
+#
+# Each kind has a generation, part of its keys, bumped by the indexer once lexeme changes of
+# that kind are committed, so stale entries are never read again and age out by TTL / LRU.
+# The whole kind is invalidated: at the chain head, where most blocks change some user or
+# track, entries of those kinds are only useful for about one block, the cache mostly pays
+# off while typing within a block interval and for playlists / albums.
+
+# result kind --> (lexeme kind, also the generation of the kind's entries, id field)
+autocomplete_result_kinds = {
+    "tracks": ("track", "track_id"),
+    "users": ("user", "user_id"),
+    "playlists": ("playlist", "playlist_id"),
+    "albums": ("album", "playlist_id"),
+}
+
+# Longest prefixes looked up for a query missing from the cache
+max_prefix_lookups = 16
+
+
+def autocomplete_cache_enabled():
+    return shared_config["discprov"]["autocomplete_cache_enabled"].lower() == "true"
+
+
+def autocomplete_prefix_hits_enabled():
+    return shared_config["discprov"]["autocomplete_cache_prefix_hits_enabled"].lower() == "true"
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+def get_autocomplete_cache_key(generations, result_kind, limit, offset, query):
+    generation = generations.get(autocomplete_result_kinds[result_kind][0], 0)
+    return f"{autocomplete_cache_redis_key_prefix}:{result_kind}:{generation}:{limit}:{offset}:{query}"
+
+
+def get_autocomplete_cache_generations(redis):
+    return {
+        kind.decode("utf-8"): int(generation)
+        for (kind, generation) in redis.hgetall(autocomplete_cache_generations_redis_key).items()
+    }
+
+
+def get_autocomplete_ids(redis, generations, result_kind, query, limit, offset, name_weight, min_similarity):
+    """Return the cached result ids of query, or None on a miss. Prefix hits are ranked with
+    name_weight and min_similarity, as passed to the search queries."""
+    query = normalize_query(query)
+    keys = [get_autocomplete_cache_key(generations, result_kind, limit, offset, query)]
+    if autocomplete_prefix_hits_enabled():
+        # exhaustive prefix results are only ever cached from offset 0
+        prefixes = [query[:i] for i in range(len(query) - 1, 0, -1)][:max_prefix_lookups]
+        keys.extend(get_autocomplete_cache_key(generations, result_kind, limit, 0, prefix) for prefix in prefixes)
+    entries = redis.mget(keys)
+
+    ids = None
+    metric = "misses"
+    if entries[0] is not None:
+        ids = json.loads(entries[0].decode("utf-8"))["ids"]
+        metric = "hits"
+    else:
+        for entry in entries[1:]:
+            if entry is None:
+                continue
+            entry = json.loads(entry.decode("utf-8"))
+            # only exhaustive results are cached with the lexemes to rank from
+            if "lexemes" not in entry:
+                continue
+            ids = rank_prefix_results(entry, query, limit, offset, name_weight, min_similarity)
+            metric = "prefix_hits"
+            break
+    redis.hincrby(autocomplete_cache_metrics_redis_key, metric, 1)
+    return ids
+
+
+def rank_prefix_results(entry, query, limit, offset, name_weight, min_similarity):
+    # rescore the results of an exhaustive prefix entry for query, like TrigramIndex.search
+    query_trigrams = get_trigrams(query)
+    scores = []
+    for (entity_id, (name, words)) in zip(entry["ids"], entry["lexemes"]):
+        score = get_lexeme_score(name, words, query_trigrams, name_weight, min_similarity)
+        if score is not None:
+            scores.append((score, entity_id))
+    scores.sort(reverse=True)
+    return [entity_id for (_, entity_id) in scores[offset:offset + limit]]
+
+
+def is_exhaustive(results, limit, offset):
+    # results holding every match of their query, which its extensions can be ranked from
+    return offset == 0 and len(results) < limit
+
+
+def set_autocomplete_results(redis, generations, result_kind, query, limit, offset, results, lexemes=None):
+    """Cache the ids of results, the hydrated results of query. lexemes is a dict of
+    id --> (name, words) of the results, kept for prefix hits when the results are exhaustive."""
+    id_field = autocomplete_result_kinds[result_kind][1]
+    ids = [result[id_field] for result in results]
+    entry = {"ids": ids}
+    if lexemes is not None and is_exhaustive(results, limit, offset):
+        entry["lexemes"] = [lexemes.get(entity_id, ("", [])) for entity_id in ids]
+    redis.set(
+        get_autocomplete_cache_key(generations, result_kind, limit, offset, normalize_query(query)),
+        json.dumps(entry),
+        int(shared_config["discprov"]["autocomplete_cache_ttl_sec"])
+    )
+
+
+def invalidate_autocomplete_cache(redis, user_ids, track_ids, playlist_ids):
+    """Bump the generations of the kinds whose lexeme entries changed, once committed"""
+    kinds = set()
+    if user_ids:
+        # track entries depend on their owner
+        kinds.update(["user", "track"])
+    if track_ids:
+        kinds.add("track")
+    if playlist_ids:
+        kinds.update(["playlist", "album"])
+    if not kinds:
+        return
+    pipe = redis.pipeline()
+    for kind in kinds:
+        pipe.hincrby(autocomplete_cache_generations_redis_key, kind, 1)
+    pipe.execute()
+
+
+def get_autocomplete_cache_metrics(redis):
+    metrics = {
+        metric.decode("utf-8"): int(count)
+        for (metric, count) in redis.hgetall(autocomplete_cache_metrics_redis_key).items()
+    }
+    lookups = sum(metrics.values())
+    if lookups:
+        metrics["hit_rate"] = (metrics.get("hits", 0) + metrics.get("prefix_hits", 0)) / lookups
+    return metrics
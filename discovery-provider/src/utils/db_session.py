@@ -1,25 +1,42 @@
-import ast
+import os
+import time
+import threading
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
-from flask import current_app, g
+from flask import current_app
 
 
-session_manager = None
+# Process-wide registry of SessionManagers keyed by database url
+# Each gunicorn worker / celery child builds its engine + pool once and reuses it
+_session_managers = {}
+_session_managers_lock = threading.Lock()
 
 
 def get_db():
-    """Connect to the configured database. The connection
-    is unique for each request and will be reused if this is called
-    again.
+    """Return the SessionManager for the configured database. The manager (and
+    its connection pool) is created once per process at create_app time and shared
+    by every request handled in that process.
     """
-    if "db" not in g:
-        g.db = SessionManager(
-            current_app.config["db"]["url"],
-            ast.literal_eval(current_app.config["db"]["engine_args_literal"]),
-        )
+    return current_app.db_session_manager
 
-    return g.db
+
+def get_session_manager(db_url, db_engine_args):
+    """Return the process-wide SessionManager for db_url, creating it if necessary."""
+    with _session_managers_lock:
+        if db_url not in _session_managers:
+            _session_managers[db_url] = SessionManager(db_url, db_engine_args)
+        return _session_managers[db_url]
+
+
+def reset_session_managers():
+    """Dispose every registered SessionManager's pool and clear the registry, so the next
+    get_session_manager call connects afresh. Used by tests that drop and recreate the database.
+    """
+    with _session_managers_lock:
+        for session_manager in _session_managers.values():
+            session_manager.dispose()
+        _session_managers.clear()
 
 
 class SessionManager:
@@ -27,6 +44,76 @@ class SessionManager:
         self._engine = create_engine(db_url, **db_engine_args)
         self._session_factory = sessionmaker(bind=self._engine)
 
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "connects": 0,
+            "checkouts": 0,
+            "checkins": 0,
+            "invalidated_after_fork": 0,
+            "checkout_wait_total_sec": 0.0,
+            "checkout_wait_max_sec": 0.0,
+        }
+        self._register_pool_events()
+
+    def _register_pool_events(self):
+        """ Tag each pooled connection with the pid that opened it so connections
+            inherited across a fork (gunicorn --preload, celery prefork) are never
+            shared between processes, and count pool activity for pool_metrics().
+
+            Fork-safety recipe taken from:
+            https://docs.sqlalchemy.org/en/latest/core/pooling.html#using-connection-pools-with-multiprocessing
+        """
+        @event.listens_for(self._engine, "connect")
+        def on_connect(dbapi_connection, connection_record): # pylint: disable=W0612
+            connection_record.info["pid"] = os.getpid()
+            self._incr_metric("connects")
+
+        @event.listens_for(self._engine, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy): # pylint: disable=W0612
+            pid = os.getpid()
+            if connection_record.info["pid"] != pid:
+                self._incr_metric("invalidated_after_fork")
+                # Drop the inherited connection without closing the parent's socket
+                connection_record.connection = connection_proxy.connection = None
+                raise exc.DisconnectionError(
+                    f"Connection record belongs to pid {connection_record.info['pid']}, "
+                    f"attempting to check out in pid {pid}"
+                )
+            self._incr_metric("checkouts")
+
+        @event.listens_for(self._engine, "checkin")
+        def on_checkin(dbapi_connection, connection_record): # pylint: disable=W0612
+            self._incr_metric("checkins")
+
+    def _incr_metric(self, key, value=1):
+        with self._metrics_lock:
+            self._metrics[key] += value
+
+    def _record_checkout_wait(self, duration):
+        with self._metrics_lock:
+            self._metrics["checkout_wait_total_sec"] += duration
+            if duration > self._metrics["checkout_wait_max_sec"]:
+                self._metrics["checkout_wait_max_sec"] = duration
+
+    def pool_metrics(self):
+        """ Returns a snapshot of connection pool state and cumulative checkout stats """
+        pool = self._engine.pool
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics["pid"] = os.getpid()
+        metrics["status"] = pool.status()
+        # QueuePool specific fields, not present for NullPool / StaticPool
+        for field in ("size", "checkedin", "checkedout", "overflow"):
+            if hasattr(pool, field):
+                metrics[field] = getattr(pool, field)()
+        if metrics["checkouts"]:
+            metrics["checkout_wait_avg_sec"] = metrics["checkout_wait_total_sec"] / metrics["checkouts"]
+        return metrics
+
+    def dispose(self):
+        """ Close every pooled connection, checked out connections are closed on checkin """
+        self._engine.dispose()
+
     def session(self):
         """ Get a session for direct management/use. Use not recommended unless absolutely
             necessary.
@@ -47,6 +134,12 @@ class SessionManager:
         session = self._session_factory()
         session.expire_on_commit = expire_on_commit
         try:
+            # Check out the pooled connection up front so time spent waiting on
+            # an exhausted pool is visible in pool_metrics()
+            checkout_start = time.time()
+            session.connection()
+            self._record_checkout_wait(time.time() - checkout_start)
+
             yield session
             session.commit()
         except:
@@ -0,0 +1,261 @@
+import logging
+from datetime import datetime, timedelta
+from src.models import Follow, Track, Playlist, UserAggregates
+from src.utils.config import shared_config
+from src.utils.redis_constants import feed_timeline_redis_key_prefix
+
+logger = logging.getLogger(__name__)
+
+# Optional fan-out-on-write store for /feed (filter=all).
+#
+# Each follower with a materialized timeline has a Redis sorted set of the tracks and
+# playlists created or reposted by their followees, scored by activity timestamp. The
+# indexer pushes new activity into the timelines of the actor's followers after each
+# commit, /feed reads a page with a single ZREVRANGE and hydrates it.
+#
+# Timelines are materialized lazily: /feed seeds one from the fan-out-on-read query on a
+# miss, and the indexer only pushes into timelines that already exist, so storage is only
+# spent on users that actually read their feed. The timeline key is created before the seed
+# query runs, so activity committed while seeding is pushed into it rather than lost.
+# Timelines expire after feed_timeline_ttl_sec without a read and are dropped when the
+# user's follows change, both fall back to a reseed.
+# Activity of accounts with more than feed_fanout_max_followers followers is not pushed,
+# /feed merges it in at read time instead.
+
+# Scored +inf so it is never trimmed, marks a timeline as materialized even when it is empty
+timeline_sentinel_member = "timeline"
+
+# Marks a timeline whose seed query is still running, reads treat it as not materialized
+timeline_seeding_member = "seeding"
+
+# KEYS: follower timelines
+# ARGV: max length, number of (score, member) pairs to add, the pairs, members to remove
+# Items are added with NX - activity is pushed in block order, so the first push of an item
+# carries its earliest activity timestamp, matching the fan-out-on-read ordering.
+fan_out_script = """
+local max_length = tonumber(ARGV[1])
+local num_adds = tonumber(ARGV[2])
+for _, key in ipairs(KEYS) do
+  if redis.call('EXISTS', key) == 1 then
+    for i = 3, 2 + num_adds * 2, 2 do
+      redis.call('ZADD', key, 'NX', ARGV[i], ARGV[i + 1])
+    end
+    for i = 3 + num_adds * 2, #ARGV do
+      redis.call('ZREM', key, ARGV[i])
+    end
+    redis.call('ZREMRANGEBYRANK', key, 0, -(max_length + 2))
+  end
+end
+return 0
+"""
+
+# KEYS: follower timeline
+# ARGV: ttl, then the (score, member) pairs to add
+# Only seeds timelines still marked as seeding - a timeline dropped while its seed query ran
+# (e.g. the user's follows changed) stays dropped. Items pushed while seeding are kept.
+seed_script = """
+local key = KEYS[1]
+if not redis.call('ZSCORE', key, ARGV[2]) then
+  return 0
+end
+for i = 4, #ARGV, 2 do
+  redis.call('ZADD', key, ARGV[i], ARGV[i + 1])
+end
+redis.call('ZADD', key, 'inf', ARGV[3])
+redis.call('ZREM', key, ARGV[2])
+redis.call('EXPIRE', key, ARGV[1])
+return 1
+"""
+
+# tracks created by a playlist owner up to this long before the playlist are treated as
+# posted in the "same action" as the playlist, the feed only shows the playlist
+track_dedupe_max_minutes = 10
+
+# followers are pushed to in chunks so a single script call never blocks redis for long
+fan_out_chunk_size = 500
+
+
+def feed_timeline_enabled():
+    return shared_config["discprov"]["feed_timeline_enabled"].lower() == "true"
+
+
+def get_feed_timeline_key(user_id):
+    return f"{feed_timeline_redis_key_prefix}:{user_id}"
+
+
+def get_feed_item_member(item_type, item_id):
+    # item_type is "track" or "playlist", albums are playlists
+    return f"{item_type}:{item_id}"
+
+
+def parse_feed_item_member(member):
+    (item_type, item_id) = member.split(":")
+    return (item_type, int(item_id))
+
+
+def datetime_to_score(timestamp):
+    return (timestamp - datetime(1970, 1, 1)).total_seconds()
+
+
+def score_to_datetime(score):
+    return datetime.utcfromtimestamp(score)
+
+
+def get_feed_timeline(redis, user_id, limit):
+    """Return up to limit (member, score) pairs from user_id's timeline, most recent first,
+    or None if the user has no materialized timeline"""
+    key = get_feed_timeline_key(user_id)
+    pipe = redis.pipeline()
+    pipe.zrevrange(key, 0, limit, withscores=True)
+    pipe.expire(key, int(shared_config["discprov"]["feed_timeline_ttl_sec"]))
+    (entries, exists) = pipe.execute()
+    if not exists:
+        return None
+    entries = [(member.decode("utf-8"), score) for (member, score) in entries]
+    if any(member == timeline_seeding_member for (member, _) in entries):
+        return None
+    return [(member, score) for (member, score) in entries if member != timeline_sentinel_member]
+
+
+def start_feed_timeline_seed(redis, user_id):
+    """Create user_id's timeline, marked as seeding, so the indexer pushes activity into it
+    while the seed query runs. Call before querying the items passed to seed_feed_timeline."""
+    key = get_feed_timeline_key(user_id)
+    pipe = redis.pipeline()
+    pipe.zadd(key, {timeline_seeding_member: float("inf")})
+    pipe.expire(key, int(shared_config["discprov"]["feed_timeline_ttl_sec"]))
+    pipe.execute()
+
+
+def seed_feed_timeline(redis, user_id, items):
+    """Materialize user_id's timeline from items, a list of (member, activity datetime),
+    keeping any activity pushed since start_feed_timeline_seed"""
+    args = [int(shared_config["discprov"]["feed_timeline_ttl_sec"]), timeline_seeding_member, timeline_sentinel_member]
+    for (member, timestamp) in items:
+        args.extend([datetime_to_score(timestamp), member])
+    seed = redis.register_script(seed_script)
+    seed(keys=[get_feed_timeline_key(user_id)], args=args)
+
+
+def invalidate_feed_timelines(redis, user_ids):
+    """Drop the timelines of user_ids, e.g. once their follows change, so they are reseeded"""
+    if not user_ids:
+        return
+    redis.delete(*[get_feed_timeline_key(user_id) for user_id in user_ids])
+
+
+def get_celebrity_user_ids(session, user_ids):
+    """Return the subset of user_ids whose activity is not fanned out on write"""
+    if not user_ids:
+        return []
+    celebrity_user_ids = (
+        session.query(UserAggregates.user_id)
+        .filter(
+            UserAggregates.user_id.in_(user_ids),
+            UserAggregates.follower_count > int(shared_config["discprov"]["feed_fanout_max_followers"])
+        )
+        .all()
+    )
+    return [user_id for (user_id,) in celebrity_user_ids]
+
+
+def get_same_action_track_ids(session, playlist_ids):
+    """Return, per playlist owner id, the ids of tracks posted in the same action as one of playlist_ids"""
+    playlists = (
+        session.query(Playlist.playlist_id, Playlist.playlist_owner_id, Playlist.created_at, Playlist.playlist_contents)
+        .filter(Playlist.is_current == True, Playlist.playlist_id.in_(playlist_ids))
+        .all()
+    )
+    playlist_track_ids = set(
+        track["track"] for playlist in playlists for track in playlist.playlist_contents["track_ids"]
+    )
+    if not playlist_track_ids:
+        return {}
+    tracks = (
+        session.query(Track.track_id, Track.owner_id, Track.created_at)
+        .filter(Track.is_current == True, Track.track_id.in_(playlist_track_ids))
+        .all()
+    )
+    tracks_dict = {track_id: (owner_id, created_at) for (track_id, owner_id, created_at) in tracks}
+
+    max_timedelta = timedelta(minutes=track_dedupe_max_minutes)
+    same_action_track_ids = {}
+    for playlist in playlists:
+        for track in playlist.playlist_contents["track_ids"]:
+            (owner_id, created_at) = tracks_dict.get(track["track"], (None, None))
+            if owner_id == playlist.playlist_owner_id and \
+                    created_at <= playlist.created_at <= created_at + max_timedelta:
+                same_action_track_ids.setdefault(owner_id, set()).add(track["track"])
+    return same_action_track_ids
+
+
+def fan_out_feed_activity(session, redis, feed_activity):
+    """ Push feed_activity into the timelines of each actor's followers
+
+        feed_activity is a set of (actor user id, activity, item type, item id, activity datetime)
+        where activity is "create", "repost" or "unrepost", see src/tasks/entity_changes.py.
+        An un-repost removes the item from the reposter's followers' timelines, even if another
+        followee also reposted it, until those timelines are reseeded.
+    """
+    if not feed_activity:
+        return
+
+    adds = {}
+    removes = {}
+    created_playlist_ids = []
+    for (actor_id, activity, item_type, item_id, timestamp) in feed_activity:
+        member = get_feed_item_member(item_type, item_id)
+        if activity == "unrepost":
+            removes.setdefault(actor_id, set()).add(member)
+            continue
+        actor_adds = adds.setdefault(actor_id, {})
+        actor_adds[member] = min(datetime_to_score(timestamp), actor_adds.get(member, float("inf")))
+        if activity == "create" and item_type == "playlist":
+            created_playlist_ids.append(item_id)
+
+    # tracks created in the "same action" as a new playlist are only shown as the playlist
+    if created_playlist_ids:
+        for (owner_id, track_ids) in get_same_action_track_ids(session, created_playlist_ids).items():
+            for track_id in track_ids:
+                member = get_feed_item_member("track", track_id)
+                adds.get(owner_id, {}).pop(member, None)
+                removes.setdefault(owner_id, set()).add(member)
+
+    actor_ids = set(adds.keys()) | set(removes.keys())
+    celebrity_user_ids = set(get_celebrity_user_ids(session, list(actor_ids)))
+    actor_ids = actor_ids - celebrity_user_ids
+    if not actor_ids:
+        return
+
+    followers = (
+        session.query(Follow.followee_user_id, Follow.follower_user_id)
+        .filter(
+            Follow.is_current == True,
+            Follow.is_delete == False,
+            Follow.followee_user_id.in_(actor_ids)
+        )
+        .all()
+    )
+    followers_dict = {}
+    for (followee_user_id, follower_user_id) in followers:
+        followers_dict.setdefault(followee_user_id, []).append(get_feed_timeline_key(follower_user_id))
+
+    push = redis.register_script(fan_out_script)
+    max_length = int(shared_config["discprov"]["feed_timeline_max_length"])
+    num_pushes = 0
+    for actor_id in actor_ids:
+        follower_keys = followers_dict.get(actor_id, [])
+        actor_adds = adds.get(actor_id, {})
+        args = [max_length, len(actor_adds)]
+        for (member, score) in actor_adds.items():
+            args.extend([score, member])
+        args.extend(removes.get(actor_id, set()))
+        for i in range(0, len(follower_keys), fan_out_chunk_size):
+            push(keys=follower_keys[i:i + fan_out_chunk_size], args=args)
+        num_pushes += len(follower_keys)
+
+    logger.info(
+        f"feed_timeline.py | fan_out_feed_activity | {len(feed_activity)} activities from "
+        f"{len(actor_ids)} users pushed to {num_pushes} timelines, "
+        f"skipped {len(celebrity_user_ids)} users over the follower limit"
+    )
@@ -0,0 +1,51 @@
+import json
+import logging
+from redis.exceptions import RedisError
+from src.models import Follow
+from src.utils.config import shared_config
+from src.utils.redis_constants import followee_ids_redis_key_prefix
+
+logger = logging.getLogger(__name__)
+
+# Short-lived Redis cache of each user's followee id set, shared by every web worker.
+# The indexer evicts a user's entry after committing changes to their follows, the TTL
+# only bounds staleness if an eviction is missed.
+
+
+def get_followee_ids_redis_key(user_id):
+    return f"{followee_ids_redis_key_prefix}:{user_id}"
+
+
+def get_followee_ids(session, redis, user_id):
+    """Return the list of user ids followed by user_id, from Redis if cached"""
+    redis_key = get_followee_ids_redis_key(user_id)
+    try:
+        cached_followee_ids = redis.get(redis_key)
+        if cached_followee_ids is not None:
+            return json.loads(cached_followee_ids.decode("utf-8"))
+    except RedisError as e:
+        logger.error(f"followee_cache.py | get_followee_ids | Failed to read {redis_key}: {e}")
+
+    followee_ids = (
+        session.query(Follow.followee_user_id)
+        .filter(
+            Follow.follower_user_id == user_id,
+            Follow.is_current == True,
+            Follow.is_delete == False
+        )
+        .all()
+    )
+    followee_ids = [followee_id for (followee_id,) in followee_ids]
+
+    try:
+        redis.set(redis_key, json.dumps(followee_ids), ex=int(shared_config["redis"]["followee_cache_ttl_sec"]))
+    except RedisError as e:
+        logger.error(f"followee_cache.py | get_followee_ids | Failed to write {redis_key}: {e}")
+    return followee_ids
+
+
+def invalidate_followee_ids(redis, user_ids):
+    """Evict the cached followee ids of user_ids, called once their follow changes are committed"""
+    if not user_ids:
+        return
+    redis.delete(*[get_followee_ids_redis_key(user_id) for user_id in user_ids])
@@ -2,11 +2,12 @@ import logging
 import os
 import json
 import re
+import operator
 import contextlib
 from urllib.parse import urljoin
 from functools import reduce
-import requests
 from src import exceptions
+from src.utils.http_session import get_http_session
 from . import multihash
 
 @contextlib.contextmanager
@@ -27,37 +28,57 @@ def bytes32_to_str(bytes32input):
     return bytes32_stripped.decode("utf8")
 
 
-# relationships_to_include is a list of table names that have relationships to be added
-# and returned in the model_dict
-def query_result_to_list(query_result, relationships_to_include=None):
+# Rows of column queries (e.g. session.query(*entity_columns(Track))) are converted with
+# their column labels as keys, rows of model queries with the model's columns.
+# All rows of query_result must come from the same query, the serializer of the first
+# row is used for every row.
+def query_result_to_list(query_result):
     results = []
+    serialize = None
     for row in query_result:
-        results.append(model_to_dictionary(row, None, relationships_to_include))
+        if serialize is None:
+            serialize = get_result_row_serializer(row)
+        results.append(serialize(row))
     return results
 
 
-# Convert a SQLAlchemy model row to a dictionary object and add any relationships
-# objects inside the return dictionary
-#
-# relationships_to_include is a list of table names that have relationships to be added
-# and returned in the model_dict
-def model_to_dictionary(db_model_obj, exclude_keys=None, relationships_to_include=None):
-    """ Converts the given SQLAlchemy model object into a dictionary. """
-    model_dict = {}
-    if exclude_keys is None:
-        exclude_keys = []
+# Row serializers by (model, excluded column names), built on first use
+_row_serializers = {}
 
-    # make sure exclude_keys are actual fields
-    possible_keys = db_model_obj.__table__.columns.keys()
-    assert set(exclude_keys).issubset(set(possible_keys))
 
-    for column_name in possible_keys:
-        if column_name in exclude_keys:
-            continue
+def get_row_serializer(model, exclude_keys=None):
+    """ Returns a function converting a row of model, a model instance or a row of its
+        columns, into a dictionary of its columns not in exclude_keys. """
+    exclude_keys = frozenset(exclude_keys or ())
+    cached = _row_serializers.get((model, exclude_keys))
+    if cached is None:
+        # make sure exclude_keys are actual fields
+        possible_keys = model.__table__.columns.keys()
+        assert exclude_keys.issubset(set(possible_keys))
+
+        # a single C-level attrgetter call reads every column of a row
+        keys = tuple(key for key in possible_keys if key not in exclude_keys)
+        get_values = operator.attrgetter(*keys) if len(keys) > 1 else lambda row: (getattr(row, keys[0]),)
+
+        def serializer(row):
+            return dict(zip(keys, get_values(row)))
+        cached = serializer
+        _row_serializers[(model, exclude_keys)] = cached
+    return cached
 
-        model_dict[column_name] = getattr(db_model_obj, column_name)
 
-    return model_dict
+def get_result_row_serializer(row):
+    # serializer for the rows of the query row comes from
+    if hasattr(row, "__table__"):
+        return get_row_serializer(type(row))
+    keys = tuple(row.keys())
+    return lambda row: dict(zip(keys, row))
+
+
+# Convert a SQLAlchemy model row to a dictionary object of its columns
+def model_to_dictionary(db_model_obj, exclude_keys=None):
+    """ Converts the given SQLAlchemy model object into a dictionary. """
+    return get_row_serializer(type(db_model_obj), exclude_keys)(db_model_obj)
 
 
 # Configures root logger with custom format and loglevel
@@ -146,7 +167,7 @@ def get_valid_multiaddr_from_id_json(id_json):
 def get_ipfs_info_from_cnode_endpoint(url, self_multiaddr):
     id_url = urljoin(url, 'ipfs_peer_info')
     data = {'caller_ipfs_id' : self_multiaddr}
-    resp = requests.get(
+    resp = get_http_session().get(
         id_url,
         timeout=5,
         params=data
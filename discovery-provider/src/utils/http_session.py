@@ -0,0 +1,73 @@
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from src.utils.config import shared_config
+
+logger = logging.getLogger(__name__)
+
+# Process-wide pooled HTTP sessions keyed by pid, so sockets are never shared across a fork
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return the pooled HTTP session for this process. All outbound HTTP calls
+    (IPFS gateways, creator nodes, identity service) should go through it so
+    connections to each host are kept alive and reused.
+    """
+    pid = os.getpid()
+    with _http_sessions_lock:
+        if pid not in _http_sessions:
+            http_config = shared_config["http"]
+            _http_sessions.clear()
+            _http_sessions[pid] = PooledHTTPSession(
+                int(http_config["pool_connections"]),
+                int(http_config["pool_maxsize"]),
+                float(http_config["timeout_sec"]),
+            )
+        return _http_sessions[pid]
+
+
+class PooledHTTPSession(requests.Session):
+    """ requests.Session with one keep-alive connection pool per host and a default timeout
+
+        pool_connections is the number of per-host pools kept, pool_maxsize the number of
+        idle connections kept per host. Requests beyond pool_maxsize still go out on
+        extra connections that are closed once used, so callers never block on the pool.
+    """
+
+    def __init__(self, pool_connections, pool_maxsize, timeout):
+        super().__init__()
+        self._default_timeout = timeout
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount("http://", self._adapter)
+        self.mount("https://", self._adapter)
+
+    def request(self, method, url, **kwargs):  # pylint: disable=W0221
+        kwargs.setdefault("timeout", self._default_timeout)
+        return super().request(method, url, **kwargs)
+
+    def pool_metrics(self):
+        """ Returns per-host connection counts, reuse is requests served per connection opened """
+        pools = self._adapter.poolmanager.pools
+        metrics = {"pid": os.getpid(), "hosts": {}}
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            host = f"{pool.scheme}://{pool.host}:{pool.port}"
+            metrics["hosts"][host] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                # the pool queue is padded with None placeholders up to pool_maxsize
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool else 0,
+            }
+        metrics["connections_opened"] = sum(
+            host_metrics["connections_opened"] for host_metrics in metrics["hosts"].values()
+        )
+        metrics["requests"] = sum(host_metrics["requests"] for host_metrics in metrics["hosts"].values())
+        if metrics["connections_opened"]:
+            metrics["requests_per_connection"] = metrics["requests"] / metrics["connections_opened"]
+        return metrics
@@ -1,11 +1,14 @@
 import logging
 import json
 import time
+import threading
+import collections
+import concurrent.futures
 from urllib.parse import urlparse
-import requests
 from requests.exceptions import ReadTimeout
 import ipfshttpclient
 from src.utils.helpers import get_valid_multiaddr_from_id_json
+from src.utils.http_session import get_http_session
 
 logger = logging.getLogger(__name__)
 
@@ -13,12 +16,37 @@ logger = logging.getLogger(__name__)
 class IPFSClient:
     """ Helper class for Audius Discovery Provider + IPFS interaction """
 
-    def __init__(self, ipfs_peer_host, ipfs_peer_port, gateway_addresses):
+    def __init__(
+            self, ipfs_peer_host, ipfs_peer_port, gateway_addresses,
+            prefetched_metadata_size=1000, metadata_cache=None,
+            gateway_hedge_count=3, gateway_hedge_delay=0.25, multihash_type_cache=None
+    ):
         self._api = ipfshttpclient.connect(f"/dns/{ipfs_peer_host}/tcp/{ipfs_peer_port}/http")
         self._gateway_addresses = gateway_addresses
         self._cnode_endpoints = None
         self._ipfsid = self._api.id()
         self._multiaddr = get_valid_multiaddr_from_id_json(self._ipfsid)
+        # Metadata resolved ahead of time by prefetch_metadata, keyed by multihash
+        # Oldest entries are dropped past prefetched_metadata_size
+        self._prefetched_metadata = collections.OrderedDict()
+        self._prefetched_metadata_size = prefetched_metadata_size
+        self._prefetched_metadata_lock = threading.Lock()
+        # Optional persistent MetadataCache of raw metadata JSON, consulted before the network
+        self._metadata_cache = metadata_cache
+        # multihash_is_directory results, CIDs are immutable so entries never go stale
+        # Kept in memory (bounded) and optionally in a persistent MetadataCache shared across processes
+        self._multihash_types = collections.OrderedDict()
+        self._multihash_types_size = 100000
+        self._multihash_types_lock = threading.Lock()
+        self._multihash_type_cache = multihash_type_cache
+        # Hedged gateway requests, see get_metadata_from_gateway
+        self._gateway_hedge_count = max(1, gateway_hedge_count)
+        self._gateway_hedge_delay = gateway_hedge_delay
+        # Per-endpoint EWMAs of request latency and success, used to order gateway attempts
+        self._gateway_stats = {}
+        self._gateway_stats_lock = threading.Lock()
+        self._gateway_ewma_alpha = 0.3
+        self._gateway_timeout = 10
 
     def get_metadata_from_json(self, metadata_format, resp_json):
         metadata = {}
@@ -32,6 +60,22 @@ class IPFSClient:
             returning an object with no missing entries
         """
         logger.warning(f"IPFSCLIENT | get_metadata - {multihash}")
+        with self._prefetched_metadata_lock:
+            prefetched = self._prefetched_metadata.get(multihash)
+        if prefetched is not None:
+            logger.info(f"IPFSCLIENT | get_metadata - {multihash} served from prefetch")
+            return prefetched
+
+        if self._metadata_cache:
+            cached_json = self._metadata_cache.get(multihash)
+            cached_metadata = (
+                self.get_metadata_from_json(metadata_format, cached_json) if cached_json is not None else None
+            )
+            # Entries holding only default values are treated as missing, as for network responses
+            if cached_metadata is not None and cached_metadata != metadata_format:
+                logger.info(f"IPFSCLIENT | get_metadata - {multihash} served from metadata cache")
+                return cached_metadata
+
         api_metadata = metadata_format
         retrieved_from_gateway = False
         retrieved_from_local_node = False
@@ -75,9 +119,51 @@ class IPFSClient:
 
         return api_metadata
 
+    def prefetch_metadata(self, multihash_formats, max_workers):
+        """ Resolve [(multihash, metadata_format)] concurrently so later get_metadata
+            calls for the same multihashes return without touching the network.
+            Failures are only logged, get_metadata retries them and raises as usual.
+        """
+        with self._prefetched_metadata_lock:
+            pending = {
+                multihash: metadata_format for (multihash, metadata_format) in multihash_formats
+                if multihash not in self._prefetched_metadata
+            }
+
+        def fetch(multihash):
+            try:
+                metadata = self.get_metadata(multihash, pending[multihash])
+            except Exception:
+                logger.warning(f"IPFSCLIENT | prefetch_metadata - failed to prefetch {multihash}")
+                return
+            with self._prefetched_metadata_lock:
+                self._prefetched_metadata[multihash] = metadata
+                while len(self._prefetched_metadata) > self._prefetched_metadata_size:
+                    self._prefetched_metadata.popitem(last=False)
+
+        if pending:
+            start_time = time.time()
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+                list(executor.map(fetch, pending))
+            logger.info(
+                f"IPFSCLIENT | prefetch_metadata - {len(pending)} CIDs in {time.time() - start_time} seconds"
+            )
+
+        # Return everything resolved so callers can look at the metadata contents
+        with self._prefetched_metadata_lock:
+            return {
+                multihash: self._prefetched_metadata[multihash]
+                for (multihash, _) in multihash_formats if multihash in self._prefetched_metadata
+            }
+
     def get_metadata_from_gateway(self, multihash, metadata_format):
-        # Default return initial metadata format
-        gateway_metadata_json = metadata_format
+        """ Retrieve metadata from gateway and creator node endpoints using hedged requests.
+
+            Endpoints are tried in order of their observed latency / success rate. Up to
+            gateway_hedge_count requests are in flight at once, each new one started
+            gateway_hedge_delay seconds after the previous unless an earlier one failed.
+            The first valid JSON response wins and the remaining requests are abandoned.
+        """
         logger.warning(f"IPFSCLIENT | get_metadata_from_gateway, {multihash}")
         gateway_endpoints = self._gateway_addresses + self._cnode_endpoints
         logger.warning(f"IPFSCLIENT | get_metadata_from_gateway, \
@@ -85,6 +171,7 @@ class IPFSClient:
                 \naddresses: {self._gateway_addresses}, \
                 \ncnode_endpoints: {self._cnode_endpoints}")
 
+        valid_endpoints = []
         for address in gateway_endpoints:
             gateway_query_address = "%s/ipfs/%s" % (address, multihash)
 
@@ -96,42 +183,113 @@ class IPFSClient:
                     f"provided host: {address} CID address:{gateway_query_address}"
                 )
                 continue
+            valid_endpoints.append(address)
 
-            try:
-                logger.warning(f"IPFSCLIENT | Querying {gateway_query_address}")
-                r = requests.get(gateway_query_address, timeout=10)
-
-                # Do not retrieve metadata for error code
-                if r.status_code != 200:
-                    logger.warning(f"IPFSCLIENT | {gateway_query_address} - {r.status_code}")
-                    continue
-
-                # Override with retrieved JSON value
-                gateway_metadata_json = self.get_metadata_from_json(
-                    metadata_format, r.json()
-                )
-                # Exit loop if dict is successfully retrieved
-                logger.warning(
-                    f"IPFSCLIENT | Retrieved {multihash} from {gateway_query_address}"
-                )
-                return gateway_metadata_json
-            except ReadTimeout:
-                logger.error(
-                    f"IPFSCLIENT | Failed to retrieve CID from {gateway_query_address}"
-                )
-                continue
-            except Exception as e:
-                logger.error(
-                    f"IPFSCLIENT | Unknown exception retrieving from {gateway_query_address}",
-                    exc_info=True,
+        ordered_endpoints = self._order_gateway_endpoints(valid_endpoints)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self._gateway_hedge_count)
+        pending = set()
+        next_index = 0
+        try:
+            while pending or next_index < len(ordered_endpoints):
+                timeout = None
+                if next_index < len(ordered_endpoints) and len(pending) < self._gateway_hedge_count:
+                    pending.add(
+                        executor.submit(self._query_gateway, ordered_endpoints[next_index], multihash)
+                    )
+                    next_index += 1
+                    # Hedge with the next endpoint if this attempt is slow to respond
+                    if next_index < len(ordered_endpoints) and len(pending) < self._gateway_hedge_count:
+                        timeout = self._gateway_hedge_delay
+
+                done, pending = concurrent.futures.wait(
+                    pending, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
                 )
-                if "No file found" not in str(e):
-                    raise e
+                for future in done:
+                    resp_json = future.result()
+                    if resp_json is None:
+                        continue
+                    self._cache_metadata(multihash, resp_json)
+                    return self.get_metadata_from_json(metadata_format, resp_json)
+        finally:
+            # Requests still in flight are abandoned, their results are discarded
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
 
         raise Exception(
             f"IPFSCLIENT | Failed to retrieve CID {multihash} from gateway"
         )
 
+    def _query_gateway(self, address, multihash):
+        """ Returns the metadata JSON object for multihash from a single gateway,
+            or None if the gateway failed. Updates the gateway's latency / success stats.
+        """
+        gateway_query_address = "%s/ipfs/%s" % (address, multihash)
+        start_time = time.time()
+        resp_json = None
+        try:
+            logger.warning(f"IPFSCLIENT | Querying {gateway_query_address}")
+            r = get_http_session().get(gateway_query_address, timeout=self._gateway_timeout)
+
+            # Do not retrieve metadata for error code
+            if r.status_code != 200:
+                logger.warning(f"IPFSCLIENT | {gateway_query_address} - {r.status_code}")
+            else:
+                resp_json = r.json()
+                if not isinstance(resp_json, dict):
+                    logger.warning(f"IPFSCLIENT | {gateway_query_address} - expected dict, received {resp_json}")
+                    resp_json = None
+                else:
+                    logger.warning(
+                        f"IPFSCLIENT | Retrieved {multihash} from {gateway_query_address}"
+                    )
+        except ReadTimeout:
+            logger.error(
+                f"IPFSCLIENT | Failed to retrieve CID from {gateway_query_address}"
+            )
+        except Exception:
+            logger.error(
+                f"IPFSCLIENT | Unknown exception retrieving from {gateway_query_address}",
+                exc_info=True,
+            )
+
+        self._record_gateway_result(address, time.time() - start_time, resp_json is not None)
+        return resp_json
+
+    def _record_gateway_result(self, address, duration, success):
+        alpha = self._gateway_ewma_alpha
+        with self._gateway_stats_lock:
+            stats = self._gateway_stats.get(address)
+            if stats is None:
+                self._gateway_stats[address] = {
+                    "latency": duration, "success_rate": 1.0 if success else 0.0, "requests": 1
+                }
+                return
+            stats["latency"] = alpha * duration + (1 - alpha) * stats["latency"]
+            stats["success_rate"] = alpha * (1.0 if success else 0.0) + (1 - alpha) * stats["success_rate"]
+            stats["requests"] += 1
+
+    def _order_gateway_endpoints(self, endpoints):
+        """ Sort endpoints by expected cost, latency plus the request timeout weighted by failure rate.
+            Endpoints without stats keep their configured order, ahead of known slow or failing ones.
+        """
+        default_cost = self._gateway_hedge_delay
+
+        def expected_cost(address):
+            stats = self._gateway_stats.get(address)
+            if stats is None:
+                return default_cost
+            return stats["latency"] + (1 - stats["success_rate"]) * self._gateway_timeout
+
+        with self._gateway_stats_lock:
+            # sorted is stable so ties keep the configured order
+            return sorted(endpoints, key=expected_cost)
+
+    def gateway_stats(self):
+        """ Returns a snapshot of per-endpoint latency / success rate EWMAs """
+        with self._gateway_stats_lock:
+            return {address: dict(stats) for address, stats in self._gateway_stats.items()}
+
     def get_metadata_from_ipfs_node(self, multihash, metadata_format):
 
         try:
@@ -157,7 +315,21 @@ class IPFSClient:
             raise e
 
         logger.info(f"IPFSCLIENT | Retrieved {multihash} from ipfs node")
-        return self.get_metadata_from_json(metadata_format, resp_val)
+        metadata = self.get_metadata_from_json(metadata_format, resp_val)
+        self._cache_metadata(multihash, resp_val)
+        return metadata
+
+    def _cache_metadata(self, multihash, resp_json):
+        # Only JSON objects that produce metadata are cached, matching what get_metadata accepts
+        if not self._metadata_cache or not isinstance(resp_json, dict):
+            return
+        try:
+            self._metadata_cache.put(multihash, resp_json)
+        except Exception:
+            logger.warning(f"IPFSCLIENT | Failed to cache metadata for {multihash}", exc_info=True)
+
+    def metadata_cache_metrics(self):
+        return self._metadata_cache.metrics() if self._metadata_cache else None
 
     def cat(self, multihash):
         try:
@@ -168,6 +340,52 @@ class IPFSClient:
             raise  # error is of type ipfshttpclient.exceptions.TimeoutError
 
     def multihash_is_directory(self, multihash):
+        """ Returns True if multihash is a directory (e.g. an image with multiple sizes),
+            False if it is a single file. Results are cached, only unknown CIDs are probed.
+        """
+        with self._multihash_types_lock:
+            is_directory = self._multihash_types.get(multihash)
+        if is_directory is None and self._multihash_type_cache:
+            cached = self._multihash_type_cache.get(multihash)
+            if cached is not None:
+                is_directory = cached["is_directory"]
+        if is_directory is None:
+            is_directory = self._probe_multihash_is_directory(multihash)
+            if self._multihash_type_cache:
+                try:
+                    self._multihash_type_cache.put(multihash, {"is_directory": is_directory})
+                except Exception:
+                    logger.warning(f"IPFSCLIENT | Failed to cache multihash type for {multihash}", exc_info=True)
+
+        with self._multihash_types_lock:
+            self._multihash_types[multihash] = is_directory
+            while len(self._multihash_types) > self._multihash_types_size:
+                self._multihash_types.popitem(last=False)
+        return is_directory
+
+    def prefetch_multihash_types(self, multihashes, max_workers):
+        """ Determine multihash_is_directory for multihashes concurrently, ahead of indexing.
+            Failures are only logged, multihash_is_directory retries them and raises as usual.
+        """
+        with self._multihash_types_lock:
+            pending = {multihash for multihash in multihashes if multihash not in self._multihash_types}
+        if not pending:
+            return
+
+        def probe(multihash):
+            try:
+                self.multihash_is_directory(multihash)
+            except Exception:
+                logger.warning(f"IPFSCLIENT | prefetch_multihash_types - failed to probe {multihash}")
+
+        start_time = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            list(executor.map(probe, pending))
+        logger.info(
+            f"IPFSCLIENT | prefetch_multihash_types - {len(pending)} CIDs in {time.time() - start_time} seconds"
+        )
+
+    def _probe_multihash_is_directory(self, multihash):
         try:
             # attempt to cat single byte from CID to determine if dir or file
             self._api.cat(multihash, 0, 1)
@@ -184,7 +402,7 @@ class IPFSClient:
             r = None
             try:
                 logger.warning(f"IPFSCLIENT | Querying directory {gateway_query_address}")
-                r = requests.get(gateway_query_address, timeout=20)
+                r = get_http_session().get(gateway_query_address, timeout=20)
             except Exception as e:
                 logger.warning(f'Failed to query {gateway_query_address}, {e}')
 
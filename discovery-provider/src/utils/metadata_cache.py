@@ -0,0 +1,182 @@
+import logging
+import os
+import json
+import fcntl
+import random
+import threading
+import tempfile
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Shard directories sampled per eviction, the least recently used entries among them are evicted
+eviction_sample_shards = 16
+
+
+class MetadataCache:
+    """ Content addressed on-disk cache of IPFS metadata JSON, keyed by multihash.
+
+        CIDs are immutable so entries never need invalidation. Files are sharded by
+        the last two characters of the multihash and evicted least recently used first
+        once the cache grows past max_size_bytes. Reads refresh a file's mtime, which
+        is the LRU order used for eviction.
+
+        Every process sharing cache_dir keeps one running size in encoded bytes, stored
+        next to the shards and updated under a file lock by writes and evictions.
+    """
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self._cache_dir = cache_dir
+        self._max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._lock_path = os.path.join(cache_dir, "cache.lock")
+        self._size_path = os.path.join(cache_dir, "size_bytes")
+        os.makedirs(cache_dir, exist_ok=True)
+        # The cache is only walked in full when no running size has been recorded yet
+        with self._size_lock():
+            if self._read_size_bytes() is None:
+                self._write_size_bytes(sum(
+                    size for shard_path in self._shard_paths() for (_, _, size) in self._shard_entries(shard_path)
+                ))
+
+    def _path(self, multihash):
+        return os.path.join(self._cache_dir, multihash[-2:], f"{multihash}.json")
+
+    def _shard_paths(self):
+        return [entry.path for entry in os.scandir(self._cache_dir) if entry.is_dir()]
+
+    def _shard_entries(self, shard_path):
+        """ Returns [(mtime, path, size)] for every cached file in a shard directory """
+        entries = []
+        try:
+            dir_entries = list(os.scandir(shard_path))
+        except OSError:
+            return entries
+        for dir_entry in dir_entries:
+            if not dir_entry.name.endswith(".json"):
+                continue
+            try:
+                stat = dir_entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, dir_entry.path, stat.st_size))
+        return entries
+
+    @contextmanager
+    def _size_lock(self):
+        """ Serializes size updates and evictions across every process using cache_dir """
+        with open(self._lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_size_bytes(self):
+        try:
+            with open(self._size_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _write_size_bytes(self, size_bytes):
+        with open(self._size_path, "w") as f:
+            f.write(str(size_bytes))
+
+    def _incr_metric(self, key, value=1):
+        with self._lock:
+            self._metrics[key] += value
+
+    def get(self, multihash):
+        """ Returns the cached JSON object for multihash, or None """
+        path = self._path(multihash)
+        try:
+            with open(path) as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._incr_metric("misses")
+            return None
+        self._incr_metric("hits")
+        return value
+
+    def put(self, multihash, value):
+        path = self._path(multihash)
+        if os.path.exists(path):
+            return
+        data = json.dumps(value).encode("utf-8")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and link it in place so readers never see a partial entry.
+        # Linking fails if another process cached multihash meanwhile, so each entry is counted once.
+        (fd, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.link(tmp_path, path)
+        except FileExistsError:
+            return
+        finally:
+            os.remove(tmp_path)
+
+        self._incr_metric("writes")
+        with self._size_lock():
+            size_bytes = (self._read_size_bytes() or 0) + len(data)
+            if size_bytes > self._max_size_bytes:
+                size_bytes = self._evict(size_bytes)
+            self._write_size_bytes(size_bytes)
+
+    def _evict(self, size_bytes):
+        """ Remove least recently used entries until the cache is back under 90% of max size,
+            returns the new size. Must be called with the size lock held.
+
+            LRU order is approximated over a random sample of at least eviction_sample_shards
+            shards holding enough bytes to evict, so an eviction never walks the whole cache.
+        """
+        target_size_bytes = self._max_size_bytes * 0.9
+        shard_paths = self._shard_paths()
+        random.shuffle(shard_paths)
+        entries = []
+        sampled_size_bytes = 0
+        num_sampled_shards = 0
+        for shard_path in shard_paths:
+            if num_sampled_shards >= eviction_sample_shards and \
+                    size_bytes - sampled_size_bytes <= target_size_bytes:
+                break
+            shard_entries = self._shard_entries(shard_path)
+            entries.extend(shard_entries)
+            sampled_size_bytes += sum(size for (_, _, size) in shard_entries)
+            num_sampled_shards += 1
+
+        # With every shard sampled the exact size is known, correct any drift in the running size
+        if num_sampled_shards == len(shard_paths):
+            size_bytes = sampled_size_bytes
+
+        num_evicted = 0
+        for (_, path, size) in sorted(entries):
+            if size_bytes <= target_size_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size_bytes -= size
+            num_evicted += 1
+
+        self._incr_metric("evictions", num_evicted)
+        logger.info(
+            f"metadata_cache.py | Evicted {num_evicted} entries from {num_sampled_shards} shards, "
+            f"size {size_bytes} bytes"
+        )
+        return size_bytes
+
+    def metrics(self):
+        """ Returns a snapshot of cache size and cumulative hit/miss counters """
+        with self._lock:
+            metrics = dict(self._metrics)
+        with self._size_lock():
+            metrics["size_bytes"] = self._read_size_bytes()
+        lookups = metrics["hits"] + metrics["misses"]
+        if lookups:
+            metrics["hit_rate"] = metrics["hits"] / lookups
+        return metrics
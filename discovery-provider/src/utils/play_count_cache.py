@@ -0,0 +1,183 @@
+import logging
+import threading
+import time
+from urllib.parse import urljoin
+from src.utils.config import shared_config
+from src.utils.http_session import get_http_session
+from src.utils.redis_constants import play_count_redis_key_prefix, play_count_hot_tracks_redis_key
+
+logger = logging.getLogger(__name__)
+
+# Track play counts are kept by identity service. Lookups go through three layers:
+#
+# - a per-track Redis key holding the play count for play_count_cache_ttl_sec, per-track
+#   keys rather than a single hash since hash fields can not expire individually
+# - an in-process coalescer merging the cache misses of concurrent requests (gunicorn runs
+#   threaded workers) within play_count_coalesce_window_ms into a single identity call
+# - the update_play_counts task refreshing the tracks looked up within the last
+#   play_count_hot_window_sec before they expire, recorded in a sorted set scored by the
+#   last lookup time, so hot tracks are always served from the cache
+
+# Max track ids sent in a single identity service request, identity service's max page size
+play_counts_batch_size = 500
+
+
+def get_play_count_key(track_id):
+    return f"{play_count_redis_key_prefix}:{track_id}"
+
+
+def fetch_play_counts(track_ids):
+    """ Return a dict of track id --> play count from identity service, or None on failure
+
+        Tracks of a batch missing from a complete response have no plays and are returned with
+        a play count of 0. Tracks missing from a full page, which may have been cut off, are
+        left out so they are not cached as having no plays.
+    """
+    identity_url = shared_config['discprov']['identity_service_url']
+    identity_tracks_endpoint = urljoin(identity_url, 'tracks/listens')
+    timeout = float(shared_config['discprov']['play_count_timeout_sec'])
+
+    play_counts = {}
+    for i in range(0, len(track_ids), play_counts_batch_size):
+        batch = track_ids[i:i + play_counts_batch_size]
+        # identity service pages results, 100 per page unless a limit is given
+        post_body = {'track_ids': batch, 'limit': len(batch)}
+        try:
+            resp = get_http_session().post(identity_tracks_endpoint, json=post_body, timeout=timeout)
+            resp.raise_for_status()
+            json_resp = resp.json()
+        except Exception as e: # pylint: disable=W0703
+            logger.error(f'play_count_cache.py | Error retrieving play count - {identity_tracks_endpoint}, {e}')
+            return None
+
+        # Scenario should never arise, since we don't impose date parameter on initial query
+        if len(json_resp) > 1:
+            raise Exception('Invalid number of keys')
+
+        # Parse listen query results into track listen count dictionary
+        batch_play_counts = {}
+        for listen_count_json in json_resp.values():
+            for listen_info in listen_count_json.get('listenCounts', []):
+                batch_play_counts[listen_info['trackId']] = listen_info['listens']
+
+        # a page shorter than the limit is the whole result, the other tracks have no plays
+        if len(batch_play_counts) < len(batch):
+            play_counts.update({track_id: 0 for track_id in batch})
+        play_counts.update(batch_play_counts)
+    return play_counts
+
+
+class PlayCountCoalescer:
+    """ Merges concurrent play count fetches into one identity service call
+
+        The first caller of a batch waits window_sec for others to add their track ids,
+        then fetches the union for everyone. Callers arriving while a batch is in flight
+        start the next one.
+    """
+
+    class _Batch:
+        def __init__(self):
+            self.track_ids = set()
+            self.play_counts = None
+            self.done = threading.Event()
+
+    def __init__(self, window_sec):
+        self._window_sec = window_sec
+        self._lock = threading.Lock()
+        self._batch = None
+        self._metrics = {"lookups": 0, "fetches": 0}
+
+    def fetch(self, track_ids):
+        """Return a dict of track id --> play count for track_ids, or None on failure"""
+        with self._lock:
+            self._metrics["lookups"] += 1
+            batch = self._batch
+            is_leader = batch is None
+            if is_leader:
+                batch = self._batch = PlayCountCoalescer._Batch()
+            batch.track_ids.update(track_ids)
+
+        if is_leader:
+            time.sleep(self._window_sec)
+            with self._lock:
+                # close the batch, later callers start a new one
+                self._batch = None
+                self._metrics["fetches"] += 1
+            try:
+                batch.play_counts = fetch_play_counts(list(batch.track_ids))
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.play_counts is None:
+            return None
+        return {
+            track_id: batch.play_counts[track_id]
+            for track_id in track_ids if track_id in batch.play_counts
+        }
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+
+play_count_coalescer = PlayCountCoalescer(
+    int(shared_config["discprov"]["play_count_coalesce_window_ms"]) / 1000
+)
+
+
+def set_play_counts(redis, play_counts):
+    """Cache play_counts, a dict of track id --> play count"""
+    ttl = int(shared_config["discprov"]["play_count_cache_ttl_sec"])
+    pipe = redis.pipeline(transaction=False)
+    for (track_id, play_count) in play_counts.items():
+        pipe.set(get_play_count_key(track_id), play_count, ttl)
+    pipe.execute()
+
+
+def get_play_counts(redis, track_ids):
+    """Return a dict of track id --> play count for track_ids, from the cache where possible"""
+    track_ids = list(set(track_ids))
+    if not track_ids:
+        return {}
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.mget([get_play_count_key(track_id) for track_id in track_ids])
+    pipe.zadd(play_count_hot_tracks_redis_key, {track_id: time.time() for track_id in track_ids})
+    (cached_play_counts, _) = pipe.execute()
+
+    play_counts = {}
+    missing_track_ids = []
+    for (track_id, play_count) in zip(track_ids, cached_play_counts):
+        if play_count is None:
+            missing_track_ids.append(track_id)
+        else:
+            play_counts[track_id] = int(play_count)
+
+    if missing_track_ids:
+        fetched_play_counts = play_count_coalescer.fetch(missing_track_ids)
+        if fetched_play_counts is not None:
+            set_play_counts(redis, fetched_play_counts)
+            play_counts.update(fetched_play_counts)
+    return play_counts
+
+
+def refresh_hot_play_counts(redis):
+    """Refetch the play counts of every track looked up within the hot window, returns the count"""
+    hot_window_sec = int(shared_config["discprov"]["play_count_hot_window_sec"])
+    max_tracks = int(shared_config["discprov"]["play_count_hot_max_tracks"])
+    now = time.time()
+    redis.zremrangebyscore(play_count_hot_tracks_redis_key, "-inf", now - hot_window_sec)
+    # most recently looked up first
+    track_ids = [
+        int(track_id) for track_id in
+        redis.zrevrange(play_count_hot_tracks_redis_key, 0, max_tracks - 1)
+    ]
+    if not track_ids:
+        return 0
+    play_counts = fetch_play_counts(track_ids)
+    if play_counts is None:
+        return 0
+    set_play_counts(redis, play_counts)
+    return len(play_counts)
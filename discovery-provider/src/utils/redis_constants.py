@@ -1,3 +1,14 @@
 latest_block_redis_key = 'latest_block_from_chain'
 latest_block_hash_redis_key = 'latest_blockhash_from_chain'
 most_recent_indexed_block_redis_key = 'most_recently_indexed_block_from_db'
+followee_ids_redis_key_prefix = 'followee_ids'
+feed_timeline_redis_key_prefix = 'feed_timeline'
+listen_counts_ingested_until_redis_key = 'listen_counts_ingested_until'
+trending_redis_key_prefix = 'trending'
+trending_computed_at_redis_key_prefix = 'trending_computed_at'
+trending_genres_redis_key_prefix = 'trending_genres'
+play_count_redis_key_prefix = 'play_count'
+play_count_hot_tracks_redis_key = 'play_count_hot_tracks'
+autocomplete_cache_redis_key_prefix = 'autocomplete'
+autocomplete_cache_generations_redis_key = 'autocomplete_cache_generations'
+autocomplete_cache_metrics_redis_key = 'autocomplete_cache_metrics'
@@ -0,0 +1,324 @@
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+import sqlalchemy
+from src.utils.config import shared_config
+
+logger = logging.getLogger(__name__)
+
+# Optional in-process search index answering /search/autocomplete without a db round trip.
+#
+# Each API process loads the search lexeme dictionaries into one TrigramIndex per kind
+# (user, track, playlist, album) and scores queries the way the search queries in
+# src/queries/search.py do with pg_trgm: an entity scores the sum of similarity(word, query)
+# over its words with a similarity of at least min_similarity, plus name_weight times the
+# similarity of its name to the query.
+#
+# The index is kept up to date from search_index_changes, the change feed the indexer writes
+# in the same transaction as the lexeme entries (see src/tasks/lexeme_dicts.py): a background
+# thread polls it every search_index_refresh_sec and reloads the changed entities. The index
+# is rebuilt when the feed was pruned past the last change applied, or after a full rebuild
+# of the lexeme dictionaries.
+
+# (lexeme table, id column, entity table, entity id column, name column, entity filter) per kind,
+# the filters match those of the search queries
+search_index_kinds = {
+    "user": ("user_lexeme_dict", "user_id", "users", "user_id", "name", "e.is_current = true"),
+    "track": (
+        "track_lexeme_dict", "track_id", "tracks", "track_id", "title",
+        "e.is_current = true and e.is_unlisted = false"
+    ),
+    "playlist": (
+        "playlist_lexeme_dict", "playlist_id", "playlists", "playlist_id", "playlist_name",
+        "e.is_current = true and e.is_album = false"
+    ),
+    "album": (
+        "album_lexeme_dict", "playlist_id", "playlists", "playlist_id", "playlist_name",
+        "e.is_current = true and e.is_album = true"
+    ),
+}
+
+# kinds reloaded for each entity type of the change feed
+change_entity_kinds = {"user": ["user"], "track": ["track"], "playlist": ["playlist", "album"]}
+
+lexeme_query = """
+    SELECT d.{id_column}, e.{name_column}, d.word
+    FROM {lexeme_table} d
+    JOIN {entity_table} e ON e.{entity_id_column} = d.{id_column} and {entity_filter}
+    {filter}
+"""
+
+# pg_trgm word characters, trigrams are extracted from each run of them
+word_pattern = re.compile(r"[^\W_]+")
+
+
+def get_trigrams(text):
+    """Return the set of trigrams pg_trgm extracts from text"""
+    trigrams = set()
+    for word in word_pattern.findall(text.lower()):
+        # pg_trgm pads each word with two spaces in front and one behind
+        padded_word = f"  {word} "
+        for i in range(len(padded_word) - 2):
+            trigrams.add(padded_word[i:i + 3])
+    return trigrams
+
+
+def get_similarity(trigrams, other_trigrams):
+    """pg_trgm similarity() of two trigram sets"""
+    num_shared = len(trigrams & other_trigrams)
+    num_total = len(trigrams) + len(other_trigrams) - num_shared
+    return num_shared / num_total if num_total else 0
+
+
+def load_lexemes(session, kind, entity_ids=None):
+    """Return a dict of entity id --> (name, words) for kind, for every entity or entity_ids"""
+    (lexeme_table, id_column, entity_table, entity_id_column, name_column, entity_filter) = \
+        search_index_kinds[kind]
+    query = lexeme_query.format(
+        id_column=id_column,
+        name_column=name_column,
+        lexeme_table=lexeme_table,
+        entity_table=entity_table,
+        entity_id_column=entity_id_column,
+        entity_filter=entity_filter,
+        filter=f"WHERE d.{id_column} = ANY(:ids)" if entity_ids is not None else ""
+    )
+    rows = session.execute(sqlalchemy.text(query), {"ids": list(entity_ids or [])})
+    lexemes = {}
+    for (entity_id, name, word) in rows:
+        lexemes.setdefault(entity_id, (name, []))[1].append(word)
+    return lexemes
+
+
+def get_lexeme_score(name, words, query_trigrams, name_weight, min_similarity):
+    """Score of an entity with name and words for query, as ranked by TrigramIndex.search,
+    or None if none of its words is similar enough to match"""
+    word_similarities = [get_similarity(get_trigrams(word), query_trigrams) for word in words]
+    word_similarities = [similarity for similarity in word_similarities if similarity >= min_similarity]
+    if not word_similarities:
+        return None
+    return sum(word_similarities) + name_weight * get_similarity(get_trigrams(name or ""), query_trigrams)
+
+
+class TrigramIndex:
+    """ Trigram index over the words of one search kind
+
+        Words are interned into ids, each trigram maps to a compact array of the ids of the
+        words containing it and each word to the entities having it. Words are never dropped
+        from the vocabulary, an entity update only changes the entities of its words.
+
+        An index is never updated while it is searched: updates are applied to a copy(), which
+        shares the containers of this index until it changes them, and then swapped in.
+    """
+
+    def __init__(self):
+        self._word_ids = {}
+        self._word_num_trigrams = array("H")
+        self._word_entity_ids = []
+        self._trigram_word_ids = {}
+        # entity id --> (name trigrams, word ids)
+        self._entities = {}
+        # word ids / trigrams whose entity set / word id array was created by this index,
+        # the others are shared with the index this one was copied from and are replaced on write
+        self._owned_word_ids = set()
+        self._owned_trigrams = set()
+
+    def copy(self):
+        """Return a copy of this index to apply updates to while this one is searched"""
+        index = TrigramIndex()
+        index._word_ids = dict(self._word_ids)
+        index._word_num_trigrams = array("H", self._word_num_trigrams)
+        index._word_entity_ids = list(self._word_entity_ids)
+        index._trigram_word_ids = dict(self._trigram_word_ids)
+        index._entities = dict(self._entities)
+        return index
+
+    def _get_word_entity_ids(self, word_id):
+        # the entity set of word_id, owned by this index
+        if word_id not in self._owned_word_ids:
+            self._word_entity_ids[word_id] = set(self._word_entity_ids[word_id])
+            self._owned_word_ids.add(word_id)
+        return self._word_entity_ids[word_id]
+
+    def _add_trigram_word_id(self, trigram, word_id):
+        if trigram not in self._owned_trigrams:
+            self._trigram_word_ids[trigram] = array("I", self._trigram_word_ids.get(trigram, ()))
+            self._owned_trigrams.add(trigram)
+        self._trigram_word_ids[trigram].append(word_id)
+
+    def _get_word_id(self, word):
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = len(self._word_entity_ids)
+            self._word_ids[word] = word_id
+            trigrams = get_trigrams(word)
+            self._word_num_trigrams.append(min(len(trigrams), 65535))
+            self._word_entity_ids.append(set())
+            self._owned_word_ids.add(word_id)
+            for trigram in trigrams:
+                self._add_trigram_word_id(trigram, word_id)
+        return word_id
+
+    def remove(self, entity_id):
+        entity = self._entities.pop(entity_id, None)
+        if entity is not None:
+            for word_id in entity[1]:
+                self._get_word_entity_ids(word_id).discard(entity_id)
+
+    def add(self, entity_id, name, words):
+        self.remove(entity_id)
+        word_ids = tuple(self._get_word_id(word) for word in words)
+        for word_id in word_ids:
+            self._get_word_entity_ids(word_id).add(entity_id)
+        self._entities[entity_id] = (frozenset(get_trigrams(name or "")), word_ids)
+
+    def search(self, query, limit, offset, name_weight, min_similarity):
+        """Return the ids of the entities in [offset, offset + limit) of the ranking for query"""
+        query_trigrams = get_trigrams(query)
+        if not query_trigrams:
+            return []
+
+        # shared trigram counts of every word sharing at least one trigram with the query
+        num_shared = {}
+        for trigram in query_trigrams:
+            for word_id in self._trigram_word_ids.get(trigram, ()):
+                num_shared[word_id] = num_shared.get(word_id, 0) + 1
+
+        scores = {}
+        num_query_trigrams = len(query_trigrams)
+        for (word_id, word_num_shared) in num_shared.items():
+            similarity = word_num_shared / \
+                (self._word_num_trigrams[word_id] + num_query_trigrams - word_num_shared)
+            if similarity < min_similarity:
+                continue
+            for entity_id in self._word_entity_ids[word_id]:
+                scores[entity_id] = scores.get(entity_id, 0) + similarity
+
+        for entity_id in scores:
+            scores[entity_id] += name_weight * get_similarity(self._entities[entity_id][0], query_trigrams)
+
+        top_scores = heapq.nlargest(offset + limit, scores.items(), key=lambda score: (score[1], score[0]))
+        return [entity_id for (entity_id, _) in top_scores[offset:]]
+
+    def __len__(self):
+        return len(self._entities)
+
+
+class SearchIndex:
+    """ The TrigramIndex of each search kind, kept up to date by a background thread
+
+        Searches read the current indexes without locking, the refresh thread builds updated
+        indexes aside and swaps them in under the lock.
+    """
+
+    def __init__(self, db, refresh_sec):
+        self._db = db
+        self._refresh_sec = refresh_sec
+        self._lock = threading.Lock()
+        # kind --> TrigramIndex, replaced as a whole and never updated in place
+        self._indexes = None
+        self._last_change_id = None
+
+    def is_ready(self):
+        return self._indexes is not None
+
+    def search(self, kind, query, limit, offset, name_weight, min_similarity):
+        return self._indexes[kind].search(query, limit, offset, name_weight, min_similarity)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self._refresh()
+            except Exception: # pylint: disable=W0703
+                logger.error("search_index.py | Failed to refresh search index", exc_info=True)
+            time.sleep(self._refresh_sec)
+
+    def _rebuild(self, session):
+        start = time.time()
+        # changes committed while loading are applied again on the next refresh
+        last_change_id = session.execute("SELECT coalesce(max(id), 0) FROM search_index_changes").scalar()
+        indexes = {}
+        for kind in search_index_kinds:
+            indexes[kind] = TrigramIndex()
+            for (entity_id, (name, words)) in load_lexemes(session, kind).items():
+                indexes[kind].add(entity_id, name, words)
+        with self._lock:
+            self._indexes = indexes
+            self._last_change_id = last_change_id
+        num_entities = ", ".join(f"{kind}={len(index)}" for (kind, index) in indexes.items())
+        logger.info(f"search_index.py | Rebuilt search index in {time.time() - start:.2f}s | {num_entities}")
+
+    def _refresh(self):
+        with self._db.scoped_session() as session:
+            if self._indexes is None:
+                self._rebuild(session)
+                return
+
+            changes = session.execute(
+                sqlalchemy.text(
+                    "SELECT id, entity_type, entity_id FROM search_index_changes WHERE id > :id ORDER BY id"
+                ),
+                {"id": self._last_change_id}
+            ).fetchall()
+            if not changes:
+                return
+            oldest_change_id = session.execute("SELECT min(id) FROM search_index_changes").scalar()
+            if oldest_change_id > self._last_change_id + 1 or \
+                    any(entity_type == "all" for (_, entity_type, _) in changes):
+                # changes since the last refresh were pruned, or the dictionaries were rebuilt
+                self._rebuild(session)
+                return
+
+            changed_ids = {}
+            for (_, entity_type, entity_id) in changes:
+                for kind in change_entity_kinds[entity_type]:
+                    changed_ids.setdefault(kind, set()).add(entity_id)
+            changed_lexemes = {
+                kind: load_lexemes(session, kind, entity_ids)
+                for (kind, entity_ids) in changed_ids.items()
+            }
+
+        # only the refresh thread replaces the indexes, no need to lock while updating copies
+        indexes = dict(self._indexes)
+        for (kind, lexemes) in changed_lexemes.items():
+            indexes[kind] = indexes[kind].copy()
+            for entity_id in changed_ids[kind]:
+                if entity_id in lexemes:
+                    (name, words) = lexemes[entity_id]
+                    indexes[kind].add(entity_id, name, words)
+                else:
+                    indexes[kind].remove(entity_id)
+        with self._lock:
+            self._indexes = indexes
+            self._last_change_id = changes[-1][0]
+
+
+# Process-wide search index keyed by pid, its refresh thread does not survive a fork
+_search_indexes = {}
+_search_indexes_lock = threading.Lock()
+
+
+def search_index_enabled():
+    return shared_config["discprov"]["search_index_enabled"].lower() == "true"
+
+
+def get_search_index(db):
+    """Return this process' search index once it is loaded, starting it on first use.
+    Returns None while loading or if the search index is disabled."""
+    if not search_index_enabled():
+        return None
+    pid = os.getpid()
+    with _search_indexes_lock:
+        if pid not in _search_indexes:
+            _search_indexes.clear()
+            _search_indexes[pid] = SearchIndex(db, int(shared_config["discprov"]["search_index_refresh_sec"]))
+            _search_indexes[pid].start()
+        search_index = _search_indexes[pid]
+    return search_index if search_index.is_ready() else None
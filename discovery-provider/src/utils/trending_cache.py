@@ -0,0 +1,91 @@
+import json
+import logging
+import time as time_module
+from src.utils.config import shared_config
+from src.utils.redis_constants import trending_redis_key_prefix, \
+        trending_computed_at_redis_key_prefix, trending_genres_redis_key_prefix
+
+logger = logging.getLogger(__name__)
+
+# Precomputed trending rankings, see update_trending_cache in src/tasks/index_cache.py.
+#
+# Each (time range, genre) ranking is a Redis sorted set of JSON trending entries scored by
+# rank, so /trending/<time> reads any page with a single ZRANGE instead of loading and
+# slicing the whole ranking. Rankings hold the top trending_cache_max_entries tracks, a
+# ranking shorter than that is complete and serves every page, past the end included.
+#
+# Rankings are served stale-while-revalidate: they are kept for trending_cache_ttl_sec and
+# once older than trending_cache_soft_ttl_sec the first reader to take the refresh lock of
+# the time range recomputes them, everyone else keeps reading the previous rankings.
+# The time each time range was computed is kept alongside, along with the set of genres
+# ranked, so a genre missing from a computed time range is known to have no trending tracks.
+
+trending_cache_max_entries = 1000
+
+
+def get_trending_cache_key(time, genre):
+    if genre is None:
+        return f"{trending_redis_key_prefix}:{time}"
+    return f"{trending_redis_key_prefix}:{time}:{genre}"
+
+
+def get_trending_computed_at_key(time):
+    return f"{trending_computed_at_redis_key_prefix}:{time}"
+
+
+def get_trending_genres_key(time):
+    return f"{trending_genres_redis_key_prefix}:{time}"
+
+
+def get_trending_refresh_lock(redis, time):
+    # not thread local, /trending hands the lock over to a background refresh thread
+    return redis.lock(f"trending_cache_refresh_lock:{time}", timeout=600, thread_local=False)
+
+
+def trending_cache_soft_ttl_sec():
+    return int(shared_config["discprov"]["trending_cache_soft_ttl_sec"])
+
+
+def set_trending_rankings(redis, time, rankings):
+    """Replace the cached rankings of time, rankings being a dict of genre --> trending entries"""
+    ttl = int(shared_config["discprov"]["trending_cache_ttl_sec"])
+    genres_key = get_trending_genres_key(time)
+    genres = set(genre for genre in rankings if genre is not None)
+    stale_genres = set(genre.decode("utf-8") for genre in redis.smembers(genres_key)) - genres
+
+    pipe = redis.pipeline()
+    for (genre, entries) in rankings.items():
+        key = get_trending_cache_key(time, genre)
+        pipe.delete(key)
+        if entries:
+            pipe.zadd(key, {json.dumps(entry): rank for (rank, entry) in enumerate(entries)})
+            pipe.expire(key, ttl)
+    # genres that dropped out of trending since the last run
+    for genre in stale_genres:
+        pipe.delete(get_trending_cache_key(time, genre))
+    pipe.delete(genres_key)
+    if genres:
+        pipe.sadd(genres_key, *genres)
+        pipe.expire(genres_key, ttl)
+    pipe.set(get_trending_computed_at_key(time), time_module.time(), ttl)
+    # single MULTI / EXEC, readers never see a partially written set of rankings
+    pipe.execute()
+
+
+def get_trending_page(redis, time, genre, limit, offset):
+    """ Return (entries, age) for the trending entries in [offset, offset + limit) of the
+        cached ranking, age being the seconds since the rankings of time were computed.
+        entries is None if the ranking does not cover the page and both are None if the
+        rankings of time are not cached.
+    """
+    pipe = redis.pipeline()
+    pipe.zrange(get_trending_cache_key(time, genre), offset, offset + limit - 1)
+    pipe.zcard(get_trending_cache_key(time, genre))
+    pipe.get(get_trending_computed_at_key(time))
+    (members, num_entries, computed_at) = pipe.execute()
+    if computed_at is None:
+        return (None, None)
+    age = max(time_module.time() - float(computed_at), 0)
+    if offset + limit > num_entries >= trending_cache_max_entries:
+        return (None, age)
+    return ([json.loads(member.decode("utf-8")) for member in members], age)
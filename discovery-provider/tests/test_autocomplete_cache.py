@@ -0,0 +1,117 @@
+from src.utils import autocomplete_cache
+from src.utils.autocomplete_cache import get_autocomplete_ids, set_autocomplete_results, \
+    invalidate_autocomplete_cache, get_autocomplete_cache_generations, get_autocomplete_cache_metrics
+
+
+class MockRedis:
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def set(self, key, value, ttl):  # pylint: disable=W0613
+        self.values[key] = value.encode("utf-8")
+
+    def mget(self, keys):
+        return [self.values.get(key) for key in keys]
+
+    def hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+
+    def hgetall(self, key):
+        return {
+            field.encode("utf-8"): str(value).encode("utf-8") for (field, value) in self.hashes.get(key, {}).items()
+        }
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+def get_ids(redis, query, limit=10, offset=0):
+    generations = get_autocomplete_cache_generations(redis)
+    return get_autocomplete_ids(redis, generations, "tracks", query, limit, offset, 0.7, 0.1)
+
+
+def set_results(redis, query, track_ids, lexemes=None, limit=10, offset=0):
+    generations = get_autocomplete_cache_generations(redis)
+    results = [{"track_id": track_id} for track_id in track_ids]
+    set_autocomplete_results(redis, generations, "tracks", query, limit, offset, results, lexemes)
+
+
+hel_lexemes = {
+    1: ("Hello World", ["hello", "world"]),
+    2: ("Help", ["help"]),
+    3: ("Rock & Roll", ["rock", "and", "roll"]),
+}
+
+
+def test_autocomplete_exact_hits():
+    """Ensure cached results are returned for the same normalized query, limit and offset only"""
+    redis = MockRedis()
+    assert get_ids(redis, "hello") is None
+
+    set_results(redis, "Hello ", [2, 1])
+    assert get_ids(redis, " hello") == [2, 1]
+    assert get_ids(redis, "hello", limit=5) is None
+    assert get_ids(redis, "hello", offset=10) is None
+
+    metrics = get_autocomplete_cache_metrics(redis)
+    assert (metrics["hits"], metrics["misses"]) == (1, 3)
+    assert metrics["hit_rate"] == 0.25
+
+
+def test_autocomplete_prefix_hits_disabled():
+    """Ensure prefixes are not looked up unless prefix hits are enabled"""
+    redis = MockRedis()
+    set_results(redis, "hel", [1, 2], hel_lexemes)
+    assert get_ids(redis, "hello") is None
+
+
+def test_autocomplete_prefix_hits_rescored(monkeypatch):
+    """Ensure prefix hits rescore the prefix's results by trigram similarity to the query"""
+    monkeypatch.setattr(autocomplete_cache, "autocomplete_prefix_hits_enabled", lambda: True)
+    redis = MockRedis()
+    set_results(redis, "hel", [1, 2], hel_lexemes)
+
+    # a typo still matches: similarity(hello, helo) is 4 / 7, similarity(help, helo) 3 / 7
+    assert get_ids(redis, "helo") == [1, 2]
+    assert get_ids(redis, "helo", limit=10, offset=1) == [2]
+    assert get_ids(redis, "hello") == [1, 2]
+    assert get_ids(redis, "xyz") is None
+    assert get_autocomplete_cache_metrics(redis)["prefix_hits"] == 3
+
+    # '&' is matched through its 'and' lexeme, as substituted in the query by search()
+    set_results(redis, "rock a", [3], hel_lexemes)
+    assert get_ids(redis, "rock and") == [3]
+
+
+def test_autocomplete_prefix_hits_exhaustive_only(monkeypatch):
+    """Ensure only exhaustive prefix results, fewer than limit from offset 0, are served"""
+    monkeypatch.setattr(autocomplete_cache, "autocomplete_prefix_hits_enabled", lambda: True)
+    redis = MockRedis()
+    set_results(redis, "hel", [1, 2], hel_lexemes, limit=2)
+    assert get_ids(redis, "hello", limit=2) is None
+
+    # results cached without lexemes are never rescored
+    set_results(redis, "hel", [1, 2])
+    assert get_ids(redis, "hello") is None
+
+
+def test_invalidate_autocomplete_cache():
+    """Ensure lexeme changes invalidate the entries of their kinds, user changes also tracks"""
+    redis = MockRedis()
+    set_results(redis, "hello", [1])
+
+    invalidate_autocomplete_cache(redis, [], [], [7])
+    assert get_autocomplete_cache_generations(redis) == {"playlist": 1, "album": 1}
+    assert get_ids(redis, "hello") == [1]
+
+    invalidate_autocomplete_cache(redis, [5], [], [])
+    assert get_autocomplete_cache_generations(redis) == {"playlist": 1, "album": 1, "user": 1, "track": 1}
+    assert get_ids(redis, "hello") is None
+
+    invalidate_autocomplete_cache(redis, [], [], [])
+    assert get_autocomplete_cache_generations(redis)["track"] == 1
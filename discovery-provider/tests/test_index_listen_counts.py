@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from src.tasks.index_listen_counts import get_ingestion_windows
+
+
+def test_ingestion_windows_day_and_hour_buckets():
+    """Ensure whole days before the hourly range are ingested a day at a time, later hours hourly"""
+    current_hour = datetime(2020, 1, 10, 12)
+    windows = get_ingestion_windows(datetime(2020, 1, 5), current_hour, 1000)
+
+    assert windows[:3] == [
+        (datetime(2020, 1, 5), datetime(2020, 1, 6)),
+        (datetime(2020, 1, 6), datetime(2020, 1, 7)),
+        (datetime(2020, 1, 7), datetime(2020, 1, 8)),
+    ]
+    # the day of 2020-01-08 ends after the hourly range starts at 2020-01-08 12:00
+    assert windows[3] == (datetime(2020, 1, 8), datetime(2020, 1, 8, 1))
+    assert all(end - start == timedelta(hours=1) for (start, end) in windows[3:])
+    # windows are contiguous
+    assert all(windows[i][1] == windows[i + 1][0] for i in range(len(windows) - 1))
+
+
+def test_ingestion_windows_hourly_until_midnight():
+    """Ensure a backfill starting mid-day is ingested hourly until the next day starts"""
+    windows = get_ingestion_windows(datetime(2020, 1, 5, 5), datetime(2020, 1, 10, 12), 1000)
+
+    assert windows[0] == (datetime(2020, 1, 5, 5), datetime(2020, 1, 5, 6))
+    assert windows[18] == (datetime(2020, 1, 5, 23), datetime(2020, 1, 6))
+    assert windows[19] == (datetime(2020, 1, 6), datetime(2020, 1, 7))
+
+
+def test_ingestion_windows_hourly_boundary():
+    """Ensure a day ending exactly hourly_ingestion_hours ago is still a day bucket"""
+    windows = get_ingestion_windows(datetime(2020, 1, 7), datetime(2020, 1, 10), 1000)
+
+    assert windows[0] == (datetime(2020, 1, 7), datetime(2020, 1, 8))
+    assert windows[1] == (datetime(2020, 1, 8), datetime(2020, 1, 8, 1))
+
+
+def test_ingestion_windows_max_windows():
+    """Ensure at most max_windows windows are returned per run"""
+    windows = get_ingestion_windows(datetime(2020, 1, 1), datetime(2020, 1, 10, 12), 5)
+
+    assert len(windows) == 5
+    assert windows[-1] == (datetime(2020, 1, 5), datetime(2020, 1, 6))
+
+
+def test_ingestion_windows_stop_before_previous_hour():
+    """Ensure ingestion never advances past the previous hour, which is re-read on every run"""
+    current_hour = datetime(2020, 1, 10, 12)
+    windows = get_ingestion_windows(datetime(2020, 1, 10, 8), current_hour, 1000)
+
+    assert windows[-1] == (datetime(2020, 1, 10, 10), datetime(2020, 1, 10, 11))
+    assert get_ingestion_windows(current_hour - timedelta(hours=1), current_hour, 1000) == []
+    assert get_ingestion_windows(current_hour, current_hour, 1000) == []
@@ -0,0 +1,51 @@
+import base64
+from datetime import datetime
+import pytest
+from src import exceptions
+from src.models import Track, Repost, RepostType
+from src.queries.query_helpers import get_keyset_filter, encode_cursor, decode_cursor
+
+
+def compile_clause(clause):
+    return " ".join(str(clause.compile(compile_kwargs={"literal_binds": True})).split())
+
+
+def test_keyset_filter_single_direction():
+    """Ensure single direction sorts compare as a row value"""
+    sort_columns = [(Track.blocknumber, True), (Track.track_id, True)]
+    assert compile_clause(get_keyset_filter(sort_columns, [10, 5])) == \
+        "(tracks.blocknumber, tracks.track_id) < (10, 5)"
+
+    sort_columns = [(Track.blocknumber, False), (Track.track_id, False)]
+    assert compile_clause(get_keyset_filter(sort_columns, [10, 5])) == \
+        "(tracks.blocknumber, tracks.track_id) > (10, 5)"
+
+
+def test_keyset_filter_mixed_directions():
+    """Ensure mixed direction sorts expand to rows after the cursor in each column's direction"""
+    sort_columns = [(Track.blocknumber, True), (Track.track_id, False)]
+    assert compile_clause(get_keyset_filter(sort_columns, [10, 5])) == \
+        "tracks.blocknumber < 10 OR tracks.blocknumber = 10 AND tracks.track_id > 5"
+
+
+def test_cursor_round_trip():
+    """Ensure datetime and enum sort values survive a cursor round trip"""
+    sort_columns = [(Repost.created_at, True), (Repost.repost_item_id, True), (Repost.repost_type, True)]
+    created_at = datetime(2020, 1, 2, 3, 4, 5, 678000)
+    cursor = encode_cursor([created_at, 7, RepostType.track])
+    assert decode_cursor(cursor, sort_columns) == [created_at, 7, "track"]
+
+
+def test_decode_invalid_cursor():
+    """Ensure malformed cursors and cursors of another sort are rejected as argument errors"""
+    sort_columns = [(Track.blocknumber, True), (Track.track_id, False)]
+    invalid_cursors = [
+        encode_cursor([10]),
+        encode_cursor([10, 5, 1]),
+        base64.urlsafe_b64encode(b'{"blocknumber": 10}').decode("utf-8"),
+        base64.urlsafe_b64encode(b"not json").decode("utf-8"),
+        "not base64!",
+    ]
+    for cursor in invalid_cursors:
+        with pytest.raises(exceptions.ArgumentError):
+            decode_cursor(cursor, sort_columns)
@@ -0,0 +1,60 @@
+import os
+import time
+from src.utils.metadata_cache import MetadataCache
+
+
+def test_metadata_cache_get_put(tmpdir):
+    """Ensure cached metadata survives a new cache instance and lookups are counted"""
+    cache = MetadataCache(str(tmpdir), 1024 * 1024)
+    multihash = "QmYVzG8jBhSAHBaU8oSx6kNGR7AaR5PRZW3BHqZXSy7fVh"
+
+    assert cache.get(multihash) is None
+    cache.put(multihash, {"title": "test"})
+    assert cache.get(multihash) == {"title": "test"}
+    assert cache.metrics()["hits"] == 1
+    assert cache.metrics()["misses"] == 1
+
+    reopened_cache = MetadataCache(str(tmpdir), 1024 * 1024)
+    assert reopened_cache.get(multihash) == {"title": "test"}
+    assert reopened_cache.metrics()["size_bytes"] > 0
+
+
+def test_metadata_cache_lru_eviction(tmpdir):
+    """Ensure the least recently read entries are evicted once the cache is full"""
+    cache = MetadataCache(str(tmpdir), 1000)
+    multihashes = [f"Qm{i:044d}" for i in range(20)]
+    for multihash in multihashes[:10]:
+        cache.put(multihash, {"title": "x" * 50})
+        time.sleep(0.01)
+
+    # Read the oldest entry so it becomes the most recently used
+    assert cache.get(multihashes[0]) is not None
+    time.sleep(0.01)
+
+    for multihash in multihashes[10:]:
+        cache.put(multihash, {"title": "x" * 50})
+        time.sleep(0.01)
+
+    assert cache.metrics()["evictions"] > 0
+    assert cache.metrics()["size_bytes"] <= 1000
+    assert cache.get(multihashes[1]) is None
+    assert cache.get(multihashes[-1]) is not None
+    assert sum(len(files) for (_, _, files) in os.walk(str(tmpdir))) < len(multihashes)
+
+
+def test_metadata_cache_shared_size(tmpdir):
+    """Ensure the cache size counts the bytes on disk and is shared by caches on the same directory"""
+    cache = MetadataCache(str(tmpdir), 1024 * 1024)
+    other_cache = MetadataCache(str(tmpdir), 1024 * 1024)
+
+    cache.put("QmYVzG8jBhSAHBaU8oSx6kNGR7AaR5PRZW3BHqZXSy7fVh", {"title": "caf\u00e9"})
+    other_cache.put("QmWmyoMoctfbAaiEs2G46gpeUmhqFRDW6KWo64y5r581Vz", {"title": "test"})
+
+    size_bytes = sum(
+        os.path.getsize(os.path.join(dir_path, file_name))
+        for (dir_path, _, file_names) in os.walk(str(tmpdir))
+        for file_name in file_names
+        if file_name.endswith(".json")
+    )
+    assert cache.metrics()["size_bytes"] == size_bytes
+    assert other_cache.metrics()["size_bytes"] == size_bytes
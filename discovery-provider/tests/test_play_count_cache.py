@@ -0,0 +1,89 @@
+import threading
+from src.utils import play_count_cache
+from src.utils.play_count_cache import PlayCountCoalescer, fetch_play_counts
+
+
+class MockResponse:
+    def __init__(self, listen_counts):
+        self._listen_counts = listen_counts
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"2020-01-01T00:00:00.000Z": {"listenCounts": self._listen_counts}}
+
+
+class MockSession:
+    def __init__(self, play_counts):
+        self.play_counts = play_counts
+        self.post_bodies = []
+
+    def post(self, url, json, timeout):  # pylint: disable=W0613,W0621
+        self.post_bodies.append(json)
+        return MockResponse([
+            {"trackId": track_id, "listens": self.play_counts[track_id]}
+            for track_id in json["track_ids"] if track_id in self.play_counts
+        ][:json["limit"]])
+
+
+def fetch_concurrently(coalescer, track_id_lists):
+    results = [None] * len(track_id_lists)
+
+    def fetch(i):
+        results[i] = coalescer.fetch(track_id_lists[i])
+
+    threads = [threading.Thread(target=fetch, args=(i,)) for i in range(len(track_id_lists))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_coalescer_shares_fetch(monkeypatch):
+    """Ensure concurrent callers within the window share a single fetch of all their tracks"""
+    fetched_track_ids = []
+
+    def mock_fetch_play_counts(track_ids):
+        fetched_track_ids.append(sorted(track_ids))
+        return {track_id: track_id * 10 for track_id in track_ids}
+    monkeypatch.setattr(play_count_cache, "fetch_play_counts", mock_fetch_play_counts)
+
+    coalescer = PlayCountCoalescer(0.2)
+    results = fetch_concurrently(coalescer, [[1, 2], [2, 3], [4]])
+
+    assert fetched_track_ids == [[1, 2, 3, 4]]
+    assert results == [{1: 10, 2: 20}, {2: 20, 3: 30}, {4: 40}]
+    assert coalescer.metrics() == {"lookups": 3, "fetches": 1}
+
+
+def test_coalescer_failed_fetch(monkeypatch):
+    """Ensure a failed fetch returns None to every caller waiting on it"""
+    monkeypatch.setattr(play_count_cache, "fetch_play_counts", lambda track_ids: None)
+
+    coalescer = PlayCountCoalescer(0.2)
+    assert fetch_concurrently(coalescer, [[1], [2], [3]]) == [None, None, None]
+    assert coalescer.metrics()["fetches"] == 1
+
+
+def test_fetch_play_counts_partial_page(monkeypatch):
+    """Ensure only the tracks of a batch answered with a partial page are cached with no plays"""
+    session = MockSession({1: 5, 2: 7, 3: 9})
+    monkeypatch.setattr(play_count_cache, "get_http_session", lambda: session)
+    monkeypatch.setattr(play_count_cache, "play_counts_batch_size", 2)
+
+    play_counts = fetch_play_counts([1, 2, 3, 4, 5, 6])
+    # 1, 2 are a full page, 3, 4 a partial page and 5, 6 an empty one
+    assert [post_body["limit"] for post_body in session.post_bodies] == [2, 2, 2]
+    assert play_counts == {1: 5, 2: 7, 3: 9, 4: 0, 5: 0, 6: 0}
+
+
+def test_fetch_play_counts_failure(monkeypatch):
+    """Ensure a failed identity request fails the whole fetch rather than caching partial results"""
+    class FailingSession:
+        def post(self, url, json, timeout):  # pylint: disable=W0613,W0621
+            raise ConnectionError("identity unavailable")
+    monkeypatch.setattr(play_count_cache, "get_http_session", FailingSession)
+
+    assert fetch_play_counts([1, 2]) is None
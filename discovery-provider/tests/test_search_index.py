@@ -0,0 +1,53 @@
+import pytest
+from src.utils.search_index import TrigramIndex, get_similarity, get_trigrams
+
+
+def test_get_trigrams():
+    """Ensure trigrams match pg_trgm's show_trgm"""
+    assert get_trigrams("cat") == {"  c", " ca", "cat", "at "}
+    # words are lowercased and split on non word characters
+    assert get_trigrams("Hi, Yo") == {"  h", " hi", "hi ", "  y", " yo", "yo "}
+    assert get_trigrams("&") == set()
+
+
+def test_get_similarity():
+    """Ensure similarity matches pg_trgm's similarity()"""
+    assert get_similarity(get_trigrams("word"), get_trigrams("words")) == pytest.approx(0.571429, abs=1e-6)
+    assert get_similarity(get_trigrams("cat"), get_trigrams("cart")) == pytest.approx(0.285714, abs=1e-6)
+    assert get_similarity(get_trigrams("cat"), get_trigrams("dog")) == 0
+    assert get_similarity(set(), set()) == 0
+
+
+def get_test_index():
+    index = TrigramIndex()
+    index.add(1, "Hello World", ["hello", "world"])
+    index.add(2, "Hello", ["hello"])
+    index.add(3, "Goodbye", ["goodbye"])
+    return index
+
+
+def test_trigram_index_ranking():
+    """Ensure entities are ranked by word similarity sum plus weighted name similarity"""
+    index = get_test_index()
+    # 2: 1.0 + 0.7 * 1.0, 1: 1.0 + 0.7 * 0.5, 3 shares no trigram with the query
+    assert index.search("hello", 10, 0, 0.7, 0.1) == [2, 1]
+    assert index.search("hello", 1, 0, 0.7, 0.1) == [2]
+    assert index.search("hello", 1, 1, 0.7, 0.1) == [1]
+    # similarity("hel", "hello") is 3 / 7, below min_similarity
+    assert index.search("hel", 10, 0, 0.7, 0.5) == []
+    assert index.search("hel", 10, 0, 0.7, 0.1) == [2, 1]
+    assert index.search("!", 10, 0, 0.7, 0.1) == []
+
+
+def test_trigram_index_copy():
+    """Ensure updates to a copy leave the original index untouched"""
+    index = get_test_index()
+    updated_index = index.copy()
+    updated_index.remove(2)
+    updated_index.add(3, "Hello Goodbye", ["hello", "goodbye"])
+
+    assert index.search("hello", 10, 0, 0.7, 0.1) == [2, 1]
+    assert len(index) == 3
+    # 1: 1.0 + 0.7 * 0.5, 3: 1.0 + 0.7 * (6 / 14)
+    assert updated_index.search("hello", 10, 0, 0.7, 0.1) == [1, 3]
+    assert len(updated_index) == 2
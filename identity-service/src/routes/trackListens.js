@@ -85,7 +85,8 @@ const getTrackListens = async (
       [models.Sequelize.fn('sum', models.Sequelize.col('listens')), 'listens']
     ],
     group: ['trackId', 'date'],
-    order: [[models.Sequelize.col('listens'), 'DESC']],
+    // trackId breaks ties so limit / offset pages are deterministic
+    order: [[models.Sequelize.col('listens'), 'DESC'], [models.Sequelize.col('trackId'), 'DESC']],
     where: {}
   }
   if (idList && idList.length > 0) {